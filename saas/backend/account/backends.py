@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import hashlib
+import logging
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.db import IntegrityError
+
+from backend.util.cache import LocalLRUCache
+from blueapps.account import get_user_model
+from blueapps.account.components.bk_token.backends import ROLE_TYPE_ADMIN
+from blueapps.account.components.bk_token.backends import TokenBackend as BaseTokenBackend
+from blueapps.account.models import UserProperty
+
+logger = logging.getLogger("component")
+
+# 登录后需要同步到用户属性的字段
+USER_PROPERTY_KEYS = ["qq", "language", "time_zone", "role", "phone", "email", "wx_userid", "chname"]
+
+
+class VerifiedTokenCache:
+    """
+    已校验通过的bk_token缓存(进程内)，key为bk_token的哈希，value为用户名
+
+    在有效期内同一个bk_token无需再请求登录服务校验以及更新用户属性
+    """
+
+    def __init__(self):
+        self._cache = LocalLRUCache(maxsize=settings.BK_TOKEN_VERIFY_CACHE_MAXSIZE)
+
+    @property
+    def enabled(self) -> bool:
+        return settings.BK_TOKEN_VERIFY_CACHE_TTL > 0
+
+    def _key(self, bk_token: str) -> str:
+        return hashlib.sha256(bk_token.encode("utf-8")).hexdigest()
+
+    def get(self, bk_token: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        return self._cache.get(self._key(bk_token))
+
+    def set(self, bk_token: str, username: str):
+        if not self.enabled:
+            return
+        self._cache.set(self._key(bk_token), username, ttl=settings.BK_TOKEN_VERIFY_CACHE_TTL)
+
+    def delete(self, bk_token: str):
+        self._cache.delete(self._key(bk_token))
+
+
+verified_token_cache = VerifiedTokenCache()
+
+# 用户时区的缓存(进程内), key为用户名, 用户属性更新时删除
+user_timezone_cache = LocalLRUCache(maxsize=settings.USER_TIMEZONE_CACHE_MAXSIZE)
+
+
+class TokenBackend(BaseTokenBackend):
+    """
+    在blueapps TokenBackend的基础上:
+    1. 校验通过的bk_token记录到缓存，供LoginMiddleware跳过重复校验
+    2. 用户属性只有变化时才更新，避免每次登录校验都写DB
+    """
+
+    def authenticate(self, request=None, bk_token=None):
+        # 判断是否传入验证所需的bk_token,没传入则返回None
+        if not bk_token:
+            return None
+
+        verify_result, username = self.verify_bk_token(bk_token)
+        # 判断bk_token是否验证通过,不通过则返回None
+        if not verify_result:
+            verified_token_cache.delete(bk_token)
+            return None
+
+        user_model = get_user_model()
+        try:
+            user, _ = user_model.objects.get_or_create(username=username)
+            get_user_info_result, user_info = self.get_user_info(bk_token)
+            # 判断是否获取到用户信息,获取不到则返回None
+            if not get_user_info_result:
+                return None
+
+            self._update_properties(user, {key: user_info.get(key, "") for key in USER_PROPERTY_KEYS})
+
+            # 用户如果不是管理员，则需要判断是否存在平台权限，如果有则需要加上
+            if not user.is_superuser and not user.is_staff:
+                is_admin = str(user_info.get("role", "")) == ROLE_TYPE_ADMIN
+                if is_admin:
+                    user.is_superuser = True
+                    user.is_staff = True
+                    user.save(update_fields=["is_superuser", "is_staff"])
+        except IntegrityError:
+            logger.exception("get_or_create UserModel fail or update_or_create UserProperty")
+            return None
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Auto create & update UserModel fail")
+            return None
+
+        verified_token_cache.set(bk_token, user.username)
+        return user
+
+    def _update_properties(self, user, properties: Dict[str, str]):
+        """只创建不存在的和更新值有变化的用户属性"""
+        exists = {p.key: p for p in UserProperty.objects.filter(user=user, key__in=properties.keys())}
+
+        created = []
+        for key, value in properties.items():
+            # 与set_property保持一致，value存储为字符串
+            value = str(value)
+            p = exists.get(key)
+            if p is None:
+                created.append(UserProperty(user=user, key=key, value=value))
+            elif p.value != value:
+                p.value = value
+                p.save(update_fields=["value"])
+
+        if created:
+            UserProperty.objects.bulk_create(created)
+
+        user_timezone_cache.delete(user.username)
@@ -12,10 +12,12 @@ import logging
 
 import pytz
 from django import forms
+from django.conf import settings
 from django.contrib import auth
 from django.utils import timezone
 
 from . import role_auth
+from .backends import user_timezone_cache, verified_token_cache
 
 logger = logging.getLogger("component")
 
@@ -36,6 +38,10 @@ class LoginMiddleware(object):
         form = AuthenticationForm(request.COOKIES)
         if form.is_valid():
             bk_token = form.cleaned_data["bk_token"]
+            # bk_token近期已校验通过且与session中登录的用户一致，则无需再次校验
+            if verified_token_cache.get(bk_token) == request.user.username:
+                return self.get_response(request)
+
             user = auth.authenticate(request=request, bk_token=bk_token)
             if user:
                 # Succeed to login, recall self to exit process
@@ -68,7 +74,10 @@ class TimezoneMiddleware:
 
     def __call__(self, request):
         if request.user.is_active and hasattr(request.user, "get_property"):
-            tzname = request.user.get_property("time_zone")
+            tzname = user_timezone_cache.get(request.user.username)
+            if tzname is None:
+                tzname = request.user.get_property("time_zone") or ""
+                user_timezone_cache.set(request.user.username, tzname, ttl=settings.USER_TIMEZONE_CACHE_TTL)
             if tzname:
                 timezone.activate(pytz.timezone(tzname))
         return self.get_response(request)
@@ -8,15 +8,68 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
+import copy
 import logging
+from typing import Optional, Union
 
+from django.conf import settings
+from prometheus_client import Counter
+
+from backend.apps.role.managers import role_member_version
 from backend.apps.role.models import AnonymousRole, Role, RoleUser
+from backend.util.cache import LocalLRUCache
 
 logger = logging.getLogger("app")
 ROLE_SESSION_KEY = "_auth_role_id"
 
+# 角色认证缓存统计, 通过django_prometheus的/metrics暴露
+role_auth_cache_counter = Counter(
+    "role_auth_cache_total", "count of role authentication cache lookups, result: hit/miss", ["result"]
+)
+
+
+class RoleAuthCache:
+    """
+    用户角色认证结果的缓存(进程内), key为(username, role_id), value为(角色版本号, 角色快照)
+
+    角色信息或成员变更时递增角色版本号, 缓存读取时版本号不一致则重新查询DB
+    用户不是角色成员时, 角色快照为None, 同样会缓存
+    """
+
+    def __init__(self):
+        self._cache = LocalLRUCache(maxsize=settings.ROLE_AUTH_CACHE_MAXSIZE)
+
+    @property
+    def enabled(self) -> bool:
+        return settings.ROLE_AUTH_CACHE_TTL > 0
+
+    def get_role(self, username: str, role_id: int) -> Optional[Role]:
+        if not self.enabled:
+            return self._query_role(username, role_id)
+
+        version = role_member_version.get(str(role_id))
+        cached = self._cache.get((username, role_id))
+        if cached is not None and cached[0] == version:
+            role_auth_cache_counter.labels("hit").inc()
+            role = cached[1]
+        else:
+            role_auth_cache_counter.labels("miss").inc()
+            role = self._query_role(username, role_id)
+            self._cache.set((username, role_id), (version, role), ttl=settings.ROLE_AUTH_CACHE_TTL)
+
+        # 返回副本, 避免请求中修改了缓存的角色快照
+        return copy.copy(role)
+
+    def _query_role(self, username: str, role_id: int) -> Optional[Role]:
+        if not RoleUser.objects.user_role_exists(username, role_id):
+            return None
+        return Role.objects.filter(id=role_id).first()
+
+
+role_auth_cache = RoleAuthCache()
+
 
-def authenticate(request=None, role_id=0):
+def authenticate(request=None, role_id=0) -> Union[Role, AnonymousRole]:
     """authenticate user's current role"""
     user = getattr(request, "user", None)
     if not getattr(user, "is_authenticated", False):
@@ -26,8 +79,8 @@ def authenticate(request=None, role_id=0):
         return AnonymousRole()
 
     # 2. 用户的角色不存在, 返回staff
-    if role_id == 0 or not RoleUser.objects.user_role_exists(request.user.username, role_id):
+    if role_id == 0:
         return AnonymousRole()
 
     # 3. 对于用户与角色关系认证通过的，返回对应的分级管理员(超级管理员和系统管理员是两类特殊的分级管理员)
-    return Role.objects.get(id=role_id)
+    return role_auth_cache.get_role(request.user.username, role_id) or AnonymousRole()
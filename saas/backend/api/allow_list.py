@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from django.db import transaction
+
+from backend.util.cache import RedisVersion
+
+
+class AllowListIndex:
+    """
+    白名单配置表的进程内索引: {key: {object_id, ...}}，key一般为(type, system_id)，object_id支持配置任意
+
+    配置表数据变更时(post_save/post_delete信号)递增Redis里的版本号，各进程读取时发现版本变化则重新加载整表
+    对于绕过信号的批量操作(bulk_create/update等)，依赖过期时间兜底
+    """
+
+    version = RedisVersion("bk_iam:allow_list_version")
+
+    def __init__(
+        self,
+        name: str,
+        load_func: Callable[[], Iterable[Tuple[Hashable, str]]],
+        wildcard: str,
+        expiration_time: int = 5 * 60,
+    ):
+        self.name = name
+        self.load_func = load_func
+        self.wildcard = wildcard
+        self.expiration_time = expiration_time
+
+        self._lock = threading.Lock()
+        self._index: Dict[Hashable, Set[str]] = {}
+        self._version: Optional[str] = None
+        self._loaded_at = 0.0
+
+    def _is_fresh(self, version: Optional[str]) -> bool:
+        return version == self._version and time.monotonic() - self._loaded_at < self.expiration_time
+
+    def _get_index(self) -> Dict[Hashable, Set[str]]:
+        if self._is_fresh(self.version.get(self.name)):
+            return self._index
+
+        with self._lock:
+            # 等锁期间其他线程可能已经重新加载过，需要在锁内重新读取版本号并检查
+            # 注意: 版本号需要在加载数据前读取，加载过程中的变更会使版本号变化，下次读取时会再次加载
+            version = self.version.get(self.name)
+            if self._is_fresh(version):
+                return self._index
+
+            index: Dict[Hashable, Set[str]] = defaultdict(set)
+            for key, object_id in self.load_func():
+                index[key].add(object_id)
+
+            self._index = dict(index)
+            self._version = version
+            self._loaded_at = time.monotonic()
+            return self._index
+
+    def invalidate(self):
+        """
+        数据变更时调用，使所有进程的索引失效
+
+        在事务提交后才递增版本号，避免其他进程在提交前重新加载到旧数据后，再也感知不到这次变更
+        """
+        transaction.on_commit(lambda: self.version.bump(self.name))
+
+    def list_object_ids(self, key: Hashable) -> Set[str]:
+        return self._get_index().get(key, set())
+
+    def is_allowed(self, key: Hashable, object_id: str) -> bool:
+        object_ids = self.list_object_ids(key)
+        return self.wildcard in object_ids or object_id in object_ids
+
+    def filter_not_allowed(self, key: Hashable, object_ids: List[str]) -> List[str]:
+        """批量判断，返回不允许的object_id列表"""
+        allowed_object_ids = self.list_object_ids(key)
+        if self.wildcard in allowed_object_ids:
+            return []
+        return [_id for _id in object_ids if _id not in allowed_object_ids]
@@ -43,8 +43,11 @@ class AuthorizationAPIAllowListCheckMixin:
         """
         批量Object进行校验
         """
-        for object_id in object_ids:
-            self.verify_api(system_id, object_id, api)
+        not_allowed_object_ids = AuthAPIAllowListConfig.filter_not_allowed(api, system_id, object_ids)
+        if not_allowed_object_ids:
+            raise exceptions.PermissionDenied(
+                detail=f"{api} api don't support the [{not_allowed_object_ids[0]}] of system[{system_id}]"
+            )
 
 
 class AuthViewMixin:
@@ -8,8 +8,13 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
+from typing import List
+
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 
+from backend.api.allow_list import AllowListIndex
 from backend.common.models import BaseModel
 
 from .constants import ALLOW_ANY, AuthorizationAPIEnum
@@ -36,4 +41,24 @@ class AuthAPIAllowListConfig(BaseModel):
         检测是否允许[某类API允许被某个系统的某个操作/Action调用]
         由于支持配置任意，所以判断是需要判断是否包含了任意
         """
-        return cls.objects.filter(type=_type, system_id=system_id, object_id__in=[ALLOW_ANY, object_id]).exists()
+        return auth_api_allow_list_index.is_allowed((_type, system_id), object_id)
+
+    @classmethod
+    def filter_not_allowed(cls, _type: str, system_id: str, object_ids: List[str]) -> List[str]:
+        """批量检测，返回不允许调用的资源类型或操作ID"""
+        return auth_api_allow_list_index.filter_not_allowed((_type, system_id), object_ids)
+
+
+auth_api_allow_list_index = AllowListIndex(
+    "auth_api",
+    lambda: (
+        ((_type, system_id), object_id)
+        for _type, system_id, object_id in AuthAPIAllowListConfig.objects.values_list("type", "system_id", "object_id")
+    ),
+    wildcard=ALLOW_ANY,
+)
+
+
+@receiver([post_save, post_delete], sender=AuthAPIAllowListConfig, dispatch_uid="invalidate_auth_api_allow_list")
+def invalidate_auth_api_allow_list(sender, **kwargs):
+    auth_api_allow_list_index.invalidate()
@@ -45,10 +45,7 @@ class ManagementAPIPermissionCheckMixin(SystemClientCheckMixin):
             return
 
         #  接入系统可管控的系统表[system_id/auth_system_id]来实现管控更多接入系统权限
-        allowed_auth_system = list(
-            SystemAllowAuthSystem.objects.filter(system_id=system_id).values_list("auth_system_id", flat=True)
-        )
-        allowed_system_ids = set(allowed_auth_system)
+        allowed_system_ids = set(SystemAllowAuthSystem.list_auth_system_id(system_id))
         # 任何系统都允许访问自身
         allowed_system_ids.add(system_id)
 
@@ -8,8 +8,13 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
+from typing import Set
+
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 
+from backend.api.allow_list import AllowListIndex
 from backend.common.models import BaseModel
 
 from .constants import ALLOW_ANY, ManagementAPIEnum
@@ -33,7 +38,7 @@ class ManagementAPIAllowListConfig(BaseModel):
         检测某个接入系统是否允许调用某个管理类API
         由于支持配置任意，所以判断是需要判断是否包含了任意
         """
-        return cls.objects.filter(system_id=system_id, api__in=[ALLOW_ANY, api]).exists()
+        return management_api_allow_list_index.is_allowed(system_id, api)
 
 
 class SystemAllowAuthSystem(BaseModel):
@@ -49,3 +54,33 @@ class SystemAllowAuthSystem(BaseModel):
         verbose_name_plural = "系统允许授权的系统"
         ordering = ["-id"]
         index_together = ["system_id", "auth_system_id"]
+
+    @classmethod
+    def list_auth_system_id(cls, system_id: str) -> Set[str]:
+        """查询系统可管控的授权系统"""
+        return system_allow_auth_system_index.list_object_ids(system_id)
+
+
+management_api_allow_list_index = AllowListIndex(
+    "management_api",
+    lambda: ManagementAPIAllowListConfig.objects.values_list("system_id", "api"),
+    wildcard=ALLOW_ANY,
+)
+
+system_allow_auth_system_index = AllowListIndex(
+    "system_allow_auth_system",
+    lambda: SystemAllowAuthSystem.objects.values_list("system_id", "auth_system_id"),
+    wildcard=ALLOW_ANY,
+)
+
+
+@receiver(
+    [post_save, post_delete], sender=ManagementAPIAllowListConfig, dispatch_uid="invalidate_management_api_allow_list"
+)
+def invalidate_management_api_allow_list(sender, **kwargs):
+    management_api_allow_list_index.invalidate()
+
+
+@receiver([post_save, post_delete], sender=SystemAllowAuthSystem, dispatch_uid="invalidate_system_allow_auth_system")
+def invalidate_system_allow_auth_system(sender, **kwargs):
+    system_allow_auth_system_index.invalidate()
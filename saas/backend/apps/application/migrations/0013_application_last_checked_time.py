@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+# Generated by Django 2.2.24 on 2026-10-18 19:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("application", "0012_auto_20210302_1514"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="application",
+            name="last_checked_time",
+            field=models.DateTimeField(blank=True, null=True, verbose_name="最近检查时间"),
+        ),
+        migrations.AlterField(
+            model_name="application",
+            name="status",
+            field=models.CharField(
+                choices=[("pending", "审批中"), ("pass", "通过"), ("reject", "拒绝"), ("cancelled", "已取消")],
+                db_index=True,
+                default="pending",
+                max_length=32,
+                verbose_name="单据状态",
+            ),
+        ),
+    ]
@@ -28,10 +28,16 @@ class Application(BaseModel):
     reason = models.CharField("申请理由", max_length=255, default="")
     _data = models.TextField("申请数据", db_column="data")  # json
     status = models.CharField(
-        "单据状态", max_length=32, choices=ApplicationStatus.get_choices(), default=ApplicationStatus.PENDING.value
+        "单据状态",
+        max_length=32,
+        choices=ApplicationStatus.get_choices(),
+        default=ApplicationStatus.PENDING.value,
+        db_index=True,
     )
 
     callback_id = models.CharField("回调随机数ID", max_length=32, default="")
+    # 周期任务最近一次向审批系统查询单据状态的时间
+    last_checked_time = models.DateTimeField("最近检查时间", null=True, blank=True)
 
     class Meta:
         verbose_name = "权限申请"
@@ -9,40 +9,127 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
 
 from celery import task
+from django.conf import settings
+from django.utils import timezone
 
 from backend.biz.application import ApplicationBiz
 from backend.service.constants import ApplicationStatus
+from backend.util.basic import chunked
+from backend.util.concurrency import map_concurrently
 
 from .models import Application
 
 logger = logging.getLogger("celery")
 
 
-@task(ignore_result=True)
-def check_or_update_application_status():
+class ApplicationStatusReconciler:
     """
-    检查并更新申请单据状态
-    由于对接第三方审批系统后，回调权限中心可能出现极小概率回调失败，所以需要周期任务检查补偿
+    检查并更新审批中的申请单据状态
+
+    按id分页遍历审批中的单据, 只检查距上次检查超过自适应间隔的单据:
+    间隔为单据已创建时长的一定比例, 并限制在[最小间隔, 最大间隔]内, 新单据检查频繁, 长期未审批的单据检查稀疏
+    需检查的单据号按批并发查询审批系统, 状态变更的单据再加载完整数据处理
     """
-    # 查询未结束的申请单据
-    # TODO: 是否需要过滤超过多久没处理才查询，但也有可能导致某些单据无法快速回调
-    applications = Application.objects.filter(status=ApplicationStatus.PENDING.value)
-    if not applications:
-        return
 
-    # 查询状态
     biz = ApplicationBiz()
-    id_status_dict = biz.query_application_approval_status(applications)
 
-    # 遍历每个申请单，进行审批处理
-    for application in applications:
-        try:
-            status = id_status_dict.get(application.id)
-            # 若查询不到，则忽略
-            if status is None:
+    def __init__(self):
+        self.now = timezone.now()
+        self.stats: Dict[str, Any] = {"pending": 0, "checked": 0, "changed": 0, "failed": 0, "query_seconds": 0}
+
+    def run(self) -> Dict[str, Any]:
+        start = time.time()
+
+        qs = (
+            Application.objects.filter(status=ApplicationStatus.PENDING.value)
+            .only("id", "sn", "created_time", "last_checked_time")
+            .order_by("id")
+        )
+        last_id = 0
+        while True:
+            applications = list(qs.filter(id__gt=last_id)[: settings.APPLICATION_STATUS_CHECK_PAGE_SIZE])
+            if not applications:
+                break
+
+            self.stats["pending"] += len(applications)
+            due_applications = [a for a in applications if self._is_due(a)]
+            if due_applications:
+                self._check(due_applications)
+            last_id = applications[-1].id
+
+        self.stats["query_seconds"] = round(self.stats["query_seconds"], 3)
+        self.stats["elapsed"] = round(time.time() - start, 3)
+        logger.info("check or update application status, stats: %s", self.stats)
+        return self.stats
+
+    def _is_due(self, application: Application) -> bool:
+        if application.last_checked_time is None:
+            return True
+
+        age = (self.now - application.created_time).total_seconds()
+        interval = min(
+            max(
+                age * settings.APPLICATION_STATUS_CHECK_INTERVAL_RATIO, settings.APPLICATION_STATUS_CHECK_MIN_INTERVAL
+            ),
+            settings.APPLICATION_STATUS_CHECK_MAX_INTERVAL,
+        )
+        return (self.now - application.last_checked_time).total_seconds() >= interval
+
+    def _check(self, applications: List[Application]):
+        chunks = chunked(applications, settings.APPLICATION_STATUS_CHECK_CHUNK_SIZE)
+        results = map_concurrently(self._query, chunks, settings.APPLICATION_STATUS_CHECK_MAX_CONCURRENCY)
+
+        checked_ids: List[int] = []
+        changed_status: Dict[int, str] = {}
+        for chunk, result in zip(chunks, results):
+            if result is None:
+                self.stats["failed"] += len(chunk)
                 continue
-            biz.handle_application_result(application, status)
-        except Exception as error:  # pylint: disable=broad-except
-            logger.exception(error)
+
+            cost, id_status = result
+            self.stats["query_seconds"] += cost
+            checked_ids.extend(a.id for a in chunk)
+            changed_status.update({_id: s for _id, s in id_status.items() if s != ApplicationStatus.PENDING.value})
+
+        self.stats["checked"] += len(checked_ids)
+        Application.objects.filter(id__in=checked_ids).update(last_checked_time=self.now)
+
+        if not changed_status:
+            return
+
+        # 加载完整的单据处理, 期间已通过回调处理的单据不再处理
+        for application in Application.objects.filter(
+            id__in=list(changed_status.keys()), status=ApplicationStatus.PENDING.value
+        ):
+            try:
+                self.biz.handle_application_result(application, changed_status[application.id])
+            except Exception as error:  # pylint: disable=broad-except
+                logger.exception(error)
+                continue
+
+            self.stats["changed"] += 1
+
+    def _query(self, applications: List[Application]) -> Optional[Tuple[float, Dict[int, str]]]:
+        """返回查询耗时与单据状态, 查询失败返回None"""
+        start = time.perf_counter()
+        try:
+            id_status_dict = self.biz.query_application_approval_status(applications)
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("query application approval status error, sn: %s", [a.sn for a in applications])
+            return None
+
+        cost = time.perf_counter() - start
+        return cost, id_status_dict.data
+
+
+@task(ignore_result=True)
+def check_or_update_application_status():
+    """
+    检查并更新申请单据状态
+    由于对接第三方审批系统后，回调权限中心可能出现极小概率回调失败，所以需要周期任务检查补偿
+    """
+    ApplicationStatusReconciler().run()
@@ -71,6 +71,9 @@ class GroupAuthorizationTask(StepTask):
     template_biz = TemplateBiz()
     policy_biz = PolicyOperationBiz()
 
+    # 同一个用户组的授权可能变更相同系统的策略, 只分块不并发
+    chunk_size = settings.LONG_TASK_GROUP_AUTHORIZATION_CHUNK_SIZE
+
     def __init__(self, subject, key):
         self.subject = Subject.parse_obj(subject)
         self.key = key
@@ -26,8 +26,18 @@ class SyncType(ChoicesEnum, LowerStrEnum):
 
     Full = auto()
     SingleUser = auto()
+    Incremental = auto()
 
-    _choices_labels = skip(((Full, _("全量")), (SingleUser, _("单个用户"))))
+    _choices_labels = skip(((Full, _("全量")), (SingleUser, _("单个用户")), (Incremental, _("增量"))))
+
+
+class SyncDataType(ChoicesEnum, LowerStrEnum):
+    """增量同步的数据类型"""
+
+    User = auto()
+    Department = auto()
+
+    _choices_labels = skip(((User, _("用户")), (Department, _("部门"))))
 
 
 class SyncTaskStatus(ChoicesEnum, StrEnum):
@@ -45,6 +55,7 @@ class SyncTaskLockKey(ChoicesEnum):
 
     Full = f"sync_task_{SyncType.Full.value}"
     SingleUser = f"sync_task_{SyncType.SingleUser.value}"
+    Incremental = f"sync_task_{SyncType.Incremental.value}"
 
 
 SYNC_TASK_DEFAULT_EXECUTOR = "periodic_task"
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+# Generated by Django 2.2.24 on 2026-10-18 19:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("organization", "0005_departmentmember_index_together"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SyncWatermark",
+            fields=[
+                ("id", models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("created_time", models.DateTimeField(auto_now_add=True)),
+                ("updated_time", models.DateTimeField(auto_now=True)),
+                (
+                    "data_type",
+                    models.CharField(
+                        choices=[("user", "用户"), ("department", "部门")], max_length=16, unique=True, verbose_name="数据类型"
+                    ),
+                ),
+                ("watermark", models.DateTimeField(verbose_name="已同步到的更新时间")),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.AlterField(
+            model_name="syncrecord",
+            name="type",
+            field=models.CharField(
+                choices=[("full", "全量"), ("singleuser", "单个用户"), ("incremental", "增量")],
+                default="full",
+                max_length=16,
+                verbose_name="同步任务类型",
+            ),
+        ),
+    ]
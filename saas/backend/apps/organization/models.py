@@ -8,7 +8,6 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
-import json
 import logging
 from typing import Dict, List
 
@@ -16,9 +15,15 @@ from django.db import models
 from mptt.managers import TreeManager
 from mptt.models import MPTTModel, TreeForeignKey
 
-from backend.apps.organization.constants import SYNC_TASK_DEFAULT_EXECUTOR, StaffStatus, SyncTaskStatus, SyncType
+from backend.apps.organization.constants import (
+    SYNC_TASK_DEFAULT_EXECUTOR,
+    StaffStatus,
+    SyncDataType,
+    SyncTaskStatus,
+    SyncType,
+)
 from backend.biz.organization import get_category_name
-from backend.common.models import TimestampedModel
+from backend.common.models import JSONProperty, TimestampedModel
 
 logger = logging.getLogger("app")
 
@@ -106,17 +111,15 @@ class Department(TimestampMPTTModel):
     def __str__(self):
         return f"{self.id}-{self.name}"
 
+    _parsed_ancestors = JSONProperty("ancestors", default=list)
+
     def parse_ancestors(self) -> List[Dict]:
         """解析祖先JSON"""
-        if self.ancestors:
-            try:
-                return json.loads(self.ancestors)
-            except Exception as error:  # pylint: disable=broad-except
-                logger.error(
-                    "parse_ancestors ancestors: %s, department_id: %s, error: %s", self.ancestors, self.id, error
-                )
-                return []
-        return []
+        try:
+            return self._parsed_ancestors
+        except Exception as error:  # pylint: disable=broad-except
+            logger.error("parse_ancestors ancestors: %s, department_id: %s, error: %s", self.ancestors, self.id, error)
+            return []
 
     @property
     def ancestor_ids(self) -> List[int]:
@@ -136,15 +139,18 @@ class Department(TimestampMPTTModel):
     def members(self):
         if self.member_count == 0:
             return []
-        user_ids = list(DepartmentMember.objects.filter(department_id=self.id).values_list("user_id", flat=True))
+        # 使用子查询，一条SQL完成查询
+        user_ids = DepartmentMember.objects.filter(department_id=self.id).values("user_id")
         return User.objects.filter(id__in=user_ids)
 
     @property
     def recursive_members(self):
         if self.recursive_member_count == 0:
             return []
-        ids = list(self.get_descendants(include_self=True).values_list("id", flat=True))
-        user_ids = list(DepartmentMember.objects.filter(department_id__in=ids).values_list("user_id", flat=True))
+        # mptt的(tree_id, lft, rght)即为物化的子孙部门区间，嵌套子查询后只需一条走索引的SQL，
+        # 避免先查出所有子孙部门ID和成员ID再拼接超大的IN查询
+        dept_ids = self.get_descendants(include_self=True).values("id")
+        user_ids = DepartmentMember.objects.filter(department_id__in=dept_ids).values("user_id")
         return User.objects.filter(id__in=user_ids)
 
 
@@ -154,6 +160,10 @@ class DepartmentMember(models.Model):
     department_id = models.IntegerField("部门ID", db_index=True)
     user_id = models.IntegerField("用户AutoID", db_index=True)
 
+    class Meta:
+        # 联合索引覆盖部门与用户的双向关联查询，子查询里无需回表
+        index_together = [("department_id", "user_id"), ("user_id", "department_id")]
+
 
 class UserLeader(models.Model):
     """部门Leader表"""
@@ -170,3 +180,10 @@ class SyncRecord(TimestampedModel):
     status = models.CharField(
         "任务状态", choices=SyncTaskStatus.get_choices(), default=SyncTaskStatus.Running.value, max_length=16
     )
+
+
+class SyncWatermark(TimestampedModel):
+    """增量同步的高水位，记录每类数据已从用户管理同步到的更新时间"""
+
+    data_type = models.CharField("数据类型", choices=SyncDataType.get_choices(), max_length=16, unique=True)
+    watermark = models.DateTimeField("已同步到的更新时间")
@@ -8,6 +8,7 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
+import datetime
 import logging
 
 from celery import task
@@ -43,6 +44,8 @@ def sync_organization(executor: str = SYNC_TASK_DEFAULT_EXECUTOR):
                 executor=executor, type=SyncType.Full.value, status=SyncTaskStatus.Running.value
             )
             record_id = record.id
+            # 以开始同步的时间作为增量同步的高水位
+            started_time = timezone.now()
     except Exception:  # pylint: disable=broad-except
         logger.exception("sync_organization cache lock error")
         # 获取分布式锁失败时，需要创建一条失败记录
@@ -87,6 +90,9 @@ def sync_organization(executor: str = SYNC_TASK_DEFAULT_EXECUTOR):
         for iam_service in iam_services:
             iam_service.sync_to_iam_backend()
 
+        # 3. 全量同步后，增量同步从本次全量同步开始的时间继续
+        Syncer().set_watermarks(started_time)
+
         status = SyncTaskStatus.Succeed.value
     except Exception:  # pylint: disable=broad-except
         logger.exception("sync_organization error")
@@ -95,6 +101,45 @@ def sync_organization(executor: str = SYNC_TASK_DEFAULT_EXECUTOR):
     SyncRecord.objects.filter(id=record_id).update(status=status, updated_time=timezone.now())
 
 
+@task(ignore_result=True)
+def sync_organization_incremental(executor: str = SYNC_TASK_DEFAULT_EXECUTOR):
+    """
+    定时增量同步组织架构，需要全量同步兜底时则转为执行全量同步
+    """
+    # 已有全量任务在执行，则无需再执行增量同步
+    if SyncRecord.objects.filter(type=SyncType.Full.value, status=SyncTaskStatus.Running.value).exists():
+        return
+
+    syncer = Syncer()
+    if syncer.need_full_sync():
+        sync_organization.delay(executor)
+        return
+
+    try:
+        with cache.lock(SyncTaskLockKey.Incremental.value, timeout=10):  # type: ignore[attr-defined]
+            # 只判断近期正在运行的任务，避免Worker异常退出后遗留的Running记录导致增量同步一直无法执行
+            if SyncRecord.objects.filter(
+                type=SyncType.Incremental.value,
+                status=SyncTaskStatus.Running.value,
+                created_time__gt=timezone.now() - datetime.timedelta(hours=1),
+            ).exists():
+                return
+            record = SyncRecord.objects.create(
+                executor=executor, type=SyncType.Incremental.value, status=SyncTaskStatus.Running.value
+            )
+    except Exception:  # pylint: disable=broad-except
+        logger.exception("sync_organization_incremental cache lock error")
+        return
+
+    try:
+        syncer.sync_incremental()
+        status = SyncTaskStatus.Succeed.value
+    except Exception:  # pylint: disable=broad-except
+        logger.exception("sync_organization_incremental error")
+        status = SyncTaskStatus.Failed.value
+    SyncRecord.objects.filter(id=record.id).update(status=status, updated_time=timezone.now())
+
+
 @task(ignore_result=True)
 def sync_new_users():
     """
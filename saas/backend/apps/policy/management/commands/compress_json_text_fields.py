@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from backend.apps.policy.models import Policy
+from backend.apps.role.models import RoleScope
+from backend.apps.template.models import PermTemplatePolicyAuthorized
+from backend.util.compress import compress_text, decompress_text, is_compressed_text
+
+# 需要压缩存储的JSON文本字段
+FIELDS = {
+    "policy": (Policy, "_resources"),
+    "template_authorized": (PermTemplatePolicyAuthorized, "_data"),
+    "role_scope": (RoleScope, "content"),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "compress the legacy uncompressed json text fields online, rows are rewritten by id in batches, "
+        "interrupted runs can be resumed by --start-id, use --decompress to rollback"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--field", action="append", choices=list(FIELDS), dest="fields", help="default all")
+        parser.add_argument("--batch-size", action="store", type=int, dest="batch_size", default=1000)
+        parser.add_argument("--start-id", action="store", type=int, dest="start_id", default=0)
+        parser.add_argument("--sleep", action="store", type=float, dest="sleep", default=0, help="seconds per batch")
+        parser.add_argument("--decompress", action="store_true", dest="decompress", help="rewrite to uncompressed")
+        parser.add_argument("--dry-run", action="store_true", dest="dry_run", help="only count the rows to rewrite")
+
+    def handle(self, *args, **options):
+        # 压缩已有数据前需要所有进程都已升级(能读取压缩的数据)并开启压缩, 见JSON_TEXT_COMPRESS_ENABLED
+        if not options["decompress"] and not options["dry_run"] and not settings.JSON_TEXT_COMPRESS_ENABLED:
+            raise CommandError("JSON_TEXT_COMPRESS_ENABLED is off, enable it after all processes are upgraded")
+
+        for name in options["fields"] or list(FIELDS):
+            model, field_name = FIELDS[name]
+            self._rewrite(name, model, field_name, options)
+
+    def _rewrite(self, name, model, field_name, options):
+        table = connection.ops.quote_name(model._meta.db_table)
+        column = connection.ops.quote_name(model._meta.get_field(field_name).column)
+        select_sql = f"SELECT id, {column} FROM {table} WHERE id > %s ORDER BY id LIMIT %s"
+        # 只更新读取后未被修改的数据, 避免覆盖并发写入的新数据
+        update_sql = f"UPDATE {table} SET {column} = %s WHERE id = %s AND {column} = %s"
+
+        last_id, total, rewritten, raw_size, new_size = options["start_id"], 0, 0, 0, 0
+        while True:
+            with connection.cursor() as cursor:
+                cursor.execute(select_sql, [last_id, options["batch_size"]])
+                rows = cursor.fetchall()
+            if not rows:
+                break
+
+            params = []
+            for row_id, value in rows:
+                new_value = self._convert(value or "", options["decompress"])
+                if new_value is not None:
+                    params.append((new_value, row_id, value))
+                    raw_size += len(value)
+                    new_size += len(new_value)
+
+            if params and not options["dry_run"]:
+                with transaction.atomic(), connection.cursor() as cursor:
+                    cursor.executemany(update_sql, params)
+
+            last_id = rows[-1][0]
+            total += len(rows)
+            rewritten += len(params)
+            self.stdout.write(f"{name}: last id {last_id}, scanned {total}, rewritten {rewritten}")
+
+            if options["sleep"]:
+                time.sleep(options["sleep"])
+
+        self.stdout.write(
+            self.style.SUCCESS(f"{name}: done, scanned {total}, rewritten {rewritten}, size {raw_size} -> {new_size}")
+        )
+
+    def _convert(self, value: str, decompress: bool):
+        """返回需要重新写入的值, 无需修改时返回None"""
+        if decompress:
+            return decompress_text(value) if is_compressed_text(value) else None
+
+        if is_compressed_text(value) or len(value) < settings.JSON_TEXT_COMPRESS_MIN_LENGTH:
+            return None
+        return compress_text(value, settings.JSON_TEXT_COMPRESS_CODEC)
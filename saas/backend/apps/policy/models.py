@@ -8,12 +8,9 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
-import json
-
 from django.db import models
 
-from backend.common.models import BaseModel
-from backend.util.json import json_dumps
+from backend.common.models import BaseModel, CompressedJSONTextField, JSONProperty
 
 
 class Policy(BaseModel):
@@ -33,7 +30,7 @@ class Policy(BaseModel):
     action_id = models.CharField("操作ID", max_length=64)
 
     # policy
-    _resources = models.TextField("资源策略", db_column="resources")  # json
+    _resources = CompressedJSONTextField("资源策略", db_column="resources")  # json
     _environment = models.TextField("可用条件", db_column="environment")  # json
     policy_id = models.BigIntegerField("后端policy_id", default=0)
 
@@ -43,18 +40,5 @@ class Policy(BaseModel):
 
         index_together = ["subject_id", "subject_type", "system_id"]
 
-    @property
-    def resources(self):
-        return json.loads(self._resources)
-
-    @resources.setter
-    def resources(self, resources):
-        self._resources = json_dumps(resources)
-
-    @property
-    def environment(self):
-        return json.loads(self._environment)
-
-    @environment.setter
-    def environment(self, environment):
-        self._environment = json_dumps(environment)
+    resources = JSONProperty("_resources")
+    environment = JSONProperty("_environment")
@@ -22,6 +22,7 @@ from backend.apps.role.models import RoleScope
 from backend.apps.template.models import PermTemplate, PermTemplatePolicyAuthorized
 from backend.component import iam
 from backend.service.constants import RoleScopeType
+from backend.util.cache import system_model_version
 from backend.util.enum import ChoicesEnum
 from backend.util.json import json_dumps
 
@@ -68,6 +69,8 @@ def execute_model_change_event():
             delete_action(system_id, action_id)
         # 执行完事件后，更新事件状态
         iam.update_model_change_event(event["pk"], ModelChangeEventStatusEnum.Finished.value)
+        # 模型已变更，使各进程缓存的系统模型失效
+        system_model_version.bump(system_id)
 
 
 def delete_action_policies(system_id: str, action_id: str):
@@ -158,8 +161,9 @@ def _delete_action_from_role_scope(system_id: str, action_id: str):
             break
         if is_updated:
             role_scope.content = json_dumps(content)
+            role_scope.version += 1
             updated_role_scopes.append(role_scope)
 
     # 批量更新分级管理员授权范围
     if len(updated_role_scopes) > 0:
-        RoleScope.objects.bulk_update(updated_role_scopes, fields=["content"], batch_size=10)
+        RoleScope.objects.bulk_update(updated_role_scopes, fields=["content", "version"], batch_size=10)
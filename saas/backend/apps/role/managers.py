@@ -10,9 +10,13 @@ specific language governing permissions and limitations under the License.
 """
 from typing import List
 
-from django.db import models
+from django.db import models, transaction
 
 from backend.service.constants import RoleRelatedObjectType
+from backend.util.cache import RedisVersion
+
+# 角色信息及成员的版本号, 角色成员变更时递增, 用于使各进程中缓存的用户角色认证结果失效
+role_member_version = RedisVersion("bk_iam:role_member_version")
 
 
 class RoleUserManager(models.Manager):
@@ -25,6 +29,13 @@ class RoleUserManager(models.Manager):
         特别注意：不可用于超级管理员和系统管理员
         """
         self.filter(role_id=role_id, username__in=usernames).delete()
+        self.invalidate_role(role_id)
+
+    def invalidate_role(self, role_id: int):
+        """
+        角色信息或成员变更后调用, 在事务提交后使缓存的角色认证结果失效
+        """
+        transaction.on_commit(lambda: role_member_version.bump(str(role_id)))
 
 
 class RoleRelatedObjectManager(models.Manager):
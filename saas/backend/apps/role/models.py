@@ -8,13 +8,11 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
-import json
-from typing import Dict, List, Union
+from typing import List
 
 from django.db import models
-from django.utils.functional import cached_property
 
-from backend.common.models import BaseModel
+from backend.common.models import BaseModel, CompressedJSONTextField, JSONProperty
 from backend.service.constants import RoleRelatedObjectType, RoleScopeType, RoleSourceTypeEnum, RoleType, SubjectType
 from backend.util.json import json_dumps
 
@@ -77,9 +75,7 @@ class RoleUserSystemPermission(BaseModel):
     role_id = models.IntegerField("角色ID")
     content = models.TextField("限制内容", default='{"enabled_users": [], "global_enabled": false}')
 
-    @cached_property
-    def enabled_detail(self) -> Dict[str, Union[List[str], bool]]:
-        return json.loads(self.content)
+    enabled_detail = JSONProperty("content")
 
     @property
     def enabled_users(self) -> List[str]:
@@ -149,7 +145,9 @@ class RoleScope(models.Model):
 
     role_id = models.IntegerField("角色ID")
     type = models.CharField("限制类型", max_length=32, choices=RoleScopeType.get_choices())
-    content = models.TextField("限制内容")
+    content = CompressedJSONTextField("限制内容")  # json
+    # 每次修改content时递增, 用于校验进程内解析后的限制范围缓存
+    version = models.IntegerField("限制内容版本号", default=0)
 
     class Meta:
         verbose_name = "角色的限制范围"
@@ -206,13 +204,7 @@ class RoleCommonAction(BaseModel):
         ordering = ["id"]
         index_together = ["role_id", "system_id"]
 
-    @property
-    def action_ids(self):
-        return json.loads(self._action_ids)
-
-    @action_ids.setter
-    def action_ids(self, action_ids):
-        self._action_ids = json_dumps(action_ids)
+    action_ids = JSONProperty("_action_ids")
 
 
 class RoleSource(BaseModel):
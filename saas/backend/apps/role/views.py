@@ -636,14 +636,15 @@ class RoleGroupRenewViewSet(mixins.ListModelMixin, GenericViewSet):
             raise error_codes.FORBIDDEN.format(message=_("非分级管理员({})的用户组，无权限续期").format(role.name), replace=True)
 
         sorted_members = sorted(members, key=lambda m: m["parent_id"])
-        for group_id, per_members in groupby(sorted_members, key=lambda m: m["parent_id"]):
-            self.group_biz.update_members_expired_at(
-                int(group_id),
-                [
+        self.group_biz.update_groups_members_expired_at(
+            {
+                int(group_id): [
                     GroupMemberExpiredAtBean(type=m["type"], id=m["id"], policy_expired_at=m["expired_at"])
                     for m in per_members
-                ],
-            )
+                ]
+                for group_id, per_members in groupby(sorted_members, key=lambda m: m["parent_id"])
+            }
+        )
 
         audit_context_setter(role=request.role, members=members)
 
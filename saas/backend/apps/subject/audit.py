@@ -8,12 +8,13 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
-from typing import List
+from typing import List, Tuple
 
 from backend.apps.organization.models import Department, User
 from backend.audit.audit import DataProvider, NoNeedAuditException, audit_context_getter
 from backend.audit.constants import AuditObjectType, AuditSourceType, AuditType
 from backend.audit.models import get_event_model
+from backend.audit.writer import audit_event_writer
 from backend.service.constants import SubjectType
 from backend.service.models import Subject
 
@@ -88,24 +89,26 @@ class SubjectPolicyDeleteAuditProvider(BaseSubjectProvider):
         return audit_context_getter(self.request, "system_id")
 
 
-# TODO: [重构] log_user_cleanup_policy_audit_event 放到 apps.user.audit里
-def log_user_cleanup_policy_audit_event(task_id: str, user: User, system_id: str, policies: List):
+# TODO: [重构] log_user_cleanup_policy_audit_events 放到 apps.user.audit里
+def log_user_cleanup_policy_audit_events(task_id: str, deletions: List[Tuple[User, str, List]]):
     """
-    用户清理长时间过期策略记录审计
+    用户清理长时间过期策略记录审计, deletions: [(用户, 系统ID, 删除的策略)], 批量写入
     """
     Event = get_event_model()
 
-    event = Event(
-        source_type=AuditSourceType.TASK.value,
-        type=AuditType.USER_POLICY_UPDATE.value,
-        source_data_task_id=task_id,
-        username="admin",
-        system_id=system_id,
-        object_type=AuditObjectType.USER.value,
-        object_id=user.username,
-        object_name=user.display_name,
-    )
-
-    event.extra = {"system_id": system_id, "policies": [p.dict() for p in policies]}
-
-    event.save(force_insert=True)
+    events = []
+    for user, system_id, policies in deletions:
+        event = Event(
+            source_type=AuditSourceType.TASK.value,
+            type=AuditType.USER_POLICY_UPDATE.value,
+            source_data_task_id=task_id,
+            username="admin",
+            system_id=system_id,
+            object_type=AuditObjectType.USER.value,
+            object_id=user.username,
+            object_name=user.display_name,
+        )
+        event.extra = {"system_id": system_id, "policies": [p.dict() for p in policies]}
+        events.append(event)
+
+    audit_event_writer.write_many(events)
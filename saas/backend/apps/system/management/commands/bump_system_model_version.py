@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from django.core.management.base import BaseCommand
+
+from backend.util.cache import system_model_version
+
+
+class Command(BaseCommand):
+    help = "bump the model version of systems, so the cached model(actions, instance selections etc.) will be reloaded"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-s", action="store", dest="system_ids", help="system ids, separated by commas", required=True
+        )
+
+    def handle(self, *args, **options):
+        system_ids = [s.strip() for s in options["system_ids"].split(",") if s.strip()]
+        for system_id in system_ids:
+            system_model_version.bump(system_id)
+            self.stdout.write(self.style.SUCCESS(f"bump model version of system({system_id}) success"))
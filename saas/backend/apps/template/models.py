@@ -8,13 +8,10 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
-import json
-
 from django.db import models
 
-from backend.common.models import BaseModel, CompressedJSONField
+from backend.common.models import BaseModel, CompressedJSONField, CompressedJSONTextField, JSONProperty
 from backend.service.constants import SubjectType, TemplatePreUpdateStatus
-from backend.util.json import json_dumps
 
 from .managers import PermTemplateManager, PermTemplatePolicyAuthorizedManager, PermTemplatePreGroupSyncManager
 
@@ -38,13 +35,7 @@ class PermTemplate(BaseModel):
         ordering = ["-created_time"]
         index_together = ["system_id"]
 
-    @property
-    def action_ids(self):
-        return json.loads(self._action_ids)
-
-    @action_ids.setter
-    def action_ids(self, data):
-        self._action_ids = json_dumps(data)
+    action_ids = JSONProperty("_action_ids")
 
 
 class PermTemplatePolicyAuthorized(BaseModel):
@@ -56,7 +47,7 @@ class PermTemplatePolicyAuthorized(BaseModel):
     subject_type = models.CharField("授权对象类型", max_length=32, choices=SubjectType.get_choices())
     subject_id = models.CharField("授权对象ID", max_length=64)
     system_id = models.CharField("系统ID", max_length=32)
-    _data = models.TextField("授权数据", db_column="data")  # 调研压缩的json字段
+    _data = CompressedJSONTextField("授权数据", db_column="data")  # json
 
     objects = PermTemplatePolicyAuthorizedManager()
 
@@ -69,13 +60,7 @@ class PermTemplatePolicyAuthorized(BaseModel):
         unique_together = ["template_id", "subject_type", "subject_id"]
         ordering = ["-updated_time"]
 
-    @property
-    def data(self):
-        return json.loads(self._data)
-
-    @data.setter
-    def data(self, data):
-        self._data = json_dumps(data)
+    data = JSONProperty("_data")
 
 
 class PermTemplatePreUpdateLock(BaseModel):
@@ -10,6 +10,8 @@ specific language governing permissions and limitations under the License.
 """
 from typing import Any, List
 
+from django.conf import settings
+
 from backend.apps.template.models import PermTemplatePolicyAuthorized
 from backend.biz.template import TemplateBiz
 from backend.long_task.constants import TaskType
@@ -26,6 +28,10 @@ class TemplateUpdateTask(StepTask):
 
     template_biz = TemplateBiz()
 
+    # 每个用户组的同步互不影响, 可以分块并发执行
+    chunk_size = settings.LONG_TASK_TEMPLATE_UPDATE_CHUNK_SIZE
+    parallelism = settings.LONG_TASK_TEMPLATE_UPDATE_PARALLELISM
+
     def __init__(self, template_id: int):
         self.template_id = template_id
 
@@ -37,6 +37,7 @@ from backend.biz.template import (
     TemplatePolicyCloneBiz,
 )
 from backend.common.error_codes import error_codes
+from backend.common.renderers import streaming_list_response
 from backend.common.swagger import PaginatedResponseSwaggerAutoSchema, ResponseSwaggerAutoSchema
 from backend.long_task.constants import TaskType
 from backend.long_task.models import TaskDetail
@@ -465,11 +466,11 @@ class TemplateGenerateCloneGroupPolicyViewSet(TemplatePermissionMixin, GenericVi
         slz.is_valid(raise_exception=True)
         data = slz.validated_data
 
-        # 生成每个用户组对应的策略
-        group_policies = self.biz.generate_template_groups_clone_policy(
+        # 生成每个用户组对应的策略, 用户组可能很多, 流式返回
+        group_policies = self.biz.iter_template_groups_clone_policy(
             template, data["group_ids"], data["action_id"], data["clone_from_action_id"], request.role
         )
-        return Response([one.dict() for one in group_policies])
+        return streaming_list_response(one.dict() for one in group_policies)
 
 
 class TemplateGroupSyncPreviewViewSet(TemplatePermissionMixin, GenericViewSet):
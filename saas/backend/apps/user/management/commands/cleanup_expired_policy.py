@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from backend.apps.user.tasks import ExpiredPolicyCleanup
+from backend.audit.writer import audit_event_writer
+from backend.common.time import db_time
+
+
+class Command(BaseCommand):
+    help = "cleanup the user policies expired for a long time, use --dry-run to only report the counts and timing"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", dest="dry_run", help="only report, do not delete")
+
+    def handle(self, *args, **options):
+        expired_at = int(db_time()) - settings.MAX_EXPIRED_POLICY_DELETE_TIME
+        stats = ExpiredPolicyCleanup(expired_at, uuid.uuid4().hex, options["dry_run"]).run()
+        audit_event_writer.flush()
+
+        for key, value in stats.items():
+            self.stdout.write(f"{key}: {value}")
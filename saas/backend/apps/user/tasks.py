@@ -9,102 +9,298 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 import logging
+import time
 from itertools import groupby
+from typing import Any, Dict, List, Optional, Set, Tuple
 from urllib.parse import urlencode
 
 from celery import task
 from django.conf import settings
-from django.core.paginator import Paginator
+from django.core.cache import cache
+from django.db.models import Q, QuerySet
 from django.template.loader import render_to_string
 
+from backend.apps.group.models import Group
 from backend.apps.organization.constants import StaffStatus
 from backend.apps.organization.models import User
-from backend.apps.subject.audit import log_user_cleanup_policy_audit_event
+from backend.apps.policy.models import Policy
+from backend.apps.subject.audit import log_user_cleanup_policy_audit_events
+from backend.apps.template.models import PermTemplatePolicyAuthorized
+from backend.audit.writer import audit_event_writer
 from backend.biz.group import GroupBiz
-from backend.biz.policy import PolicyOperationBiz, PolicyQueryBiz
+from backend.biz.policy import ExpiredPolicy, PolicyOperationBiz, PolicyQueryBiz
 from backend.common.time import db_time, get_soon_expire_ts
 from backend.component import esb
 from backend.service.constants import SubjectType
+from backend.service.group import GroupService
 from backend.service.models import Subject
+from backend.util.concurrency import map_concurrently
 
 logger = logging.getLogger("celery")
 
 
-@task(ignore_result=True)
-def user_group_policy_expire_remind():
+def filter_users_with_policy(qs: QuerySet) -> QuerySet:
     """
-    用户的用户组, 自定义权限过期检查
+    筛选出在SaaS DB里有自定义权限或模板授权的用户
+
+    所有自定义权限与模板授权都会保存在SaaS DB里, 没有权限的用户无需请求后台查询过期的权限
     """
+    policy_usernames = Policy.objects.filter(subject_type=SubjectType.USER.value).values("subject_id")
+    template_usernames = PermTemplatePolicyAuthorized.objects.filter(subject_type=SubjectType.USER.value).values(
+        "subject_id"
+    )
+    return qs.filter(Q(username__in=policy_usernames) | Q(username__in=template_usernames))
+
+
+class ExpireRemindCheckpoint:
+    """
+    用户过期提醒的执行进度, 按天记录
+
+    任务中断后重新执行, 从上次处理完成的用户继续, 已发送过邮件的用户不再发送
+    """
+
+    timeout = 24 * 60 * 60
+
+    def __init__(self, day: str):
+        self._prefix = f"bk_iam:user_expire_remind:{day}"
+
+    def get_last_user_id(self) -> int:
+        return cache.get(f"{self._prefix}:last_user_id", 0)
+
+    def set_last_user_id(self, user_id: int):
+        cache.set(f"{self._prefix}:last_user_id", user_id, timeout=self.timeout)
+
+    def list_mailed_usernames(self, usernames: List[str]) -> Set[str]:
+        keys = {self._mailed_key(username): username for username in usernames}
+        return {keys[key] for key in cache.get_many(list(keys.keys()))}
+
+    def add_mailed_username(self, username: str):
+        cache.set(self._mailed_key(username), 1, timeout=self.timeout)
+
+    def _mailed_key(self, username: str) -> str:
+        return f"{self._prefix}:mailed:{username}"
+
+
+class UserExpireRemind:
+    """
+    用户的用户组, 自定义权限过期提醒
+
+    先筛选出可能有权限即将过期的用户, 其他用户无需请求后台:
+        - 用户组: 从用户组出发批量查询, 先筛选出有成员即将过期的用户组, 再查询这些用户组即将过期的用户成员
+        - 自定义权限: 在SaaS DB里有自定义权限或模板授权的用户
+    按用户id分批处理, 每批: 过滤已发送的用户 -> 并发查询即将过期的权限 -> 并发发送邮件 -> 记录进度
+    """
+
     policy_biz = PolicyQueryBiz()
     group_biz = GroupBiz()
+    group_svc = GroupService()
 
-    # 分页遍历所有的用户
-    qs = User.objects.filter(staff_status=StaffStatus.IN.value)
-    paginator = Paginator(qs, 100)
+    def __init__(self, expired_at: int, checkpoint: ExpireRemindCheckpoint):
+        self.expired_at = expired_at
+        self.checkpoint = checkpoint
+        self.base_url = f"{settings.APP_URL}/perm-renewal"
+        # 用户组成员即将过期的用户名
+        self.group_usernames: Set[str] = set()
 
-    base_url = f"{settings.APP_URL}/perm-renewal"
+    def run(self):
+        qs = User.objects.filter(staff_status=StaffStatus.IN.value).order_by("id")
+        self.group_usernames = self._list_group_expiring_usernames()
 
-    if not paginator.count:
-        return
+        last_user_id = self.checkpoint.get_last_user_id()
+        while True:
+            users = list(qs.filter(id__gt=last_user_id)[: settings.USER_EXPIRE_REMIND_BATCH_SIZE])
+            if not users:
+                break
 
-    expired_at = get_soon_expire_ts()
-    for i in paginator.page_range:
-        for user in paginator.page(i):
-            subject = Subject(type=SubjectType.USER.value, id=user.username)
+            self._remind(users)
 
-            groups = group_biz.list_subject_group_before_expired_at(subject, expired_at)
+            last_user_id = users[-1].id
+            self.checkpoint.set_last_user_id(last_user_id)
 
-            policies = policy_biz.list_expired(subject, expired_at)
+    def _list_group_expiring_usernames(self) -> Set[str]:
+        group_ids = list(Group.objects.values_list("id", flat=True))
+        if not group_ids:
+            return set()
 
-            if not groups and not policies:
-                continue
-
-            params = {"tab": "group", "source": "email"}
-            if not groups:
-                params["tab"] = "custom"
-            url = base_url + "?" + urlencode(params)
+        usernames: Set[str] = set()
+        limit = 1000
+        for group_id in self.group_svc.list_exist_groups_before_expired_at(group_ids, self.expired_at):
+            offset = 0
+            while True:
+                count, members = self.group_svc.list_paging_members_before_expired_at(
+                    group_id, self.expired_at, limit, offset
+                )
+                usernames.update(m.id for m in members if m.type == SubjectType.USER.value)
+                offset += limit
+                if not members or offset >= count:
+                    break
+        return usernames
 
-            mail_content = render_to_string(
-                "user_expired_mail.html", {"groups": groups, "policies": policies, "url": url, "user": user}
+    def _remind(self, users: List[User]):
+        mailed_usernames = self.checkpoint.list_mailed_usernames([u.username for u in users])
+        policy_usernames = set(
+            filter_users_with_policy(User.objects.filter(id__in=[u.id for u in users])).values_list(
+                "username", flat=True
             )
-            try:
-                esb.send_mail(user.username, "蓝鲸权限中心续期提醒", mail_content)
-            except Exception:  # pylint: disable=broad-except
-                logger.exception("send email error")
+        )
+        candidates = [
+            (u, u.username in self.group_usernames, u.username in policy_usernames)
+            for u in users
+            if u.username not in mailed_usernames
+            and (u.username in self.group_usernames or u.username in policy_usernames)
+        ]
+
+        max_workers = settings.USER_EXPIRE_REMIND_MAX_CONCURRENCY
+        mails = [m for m in map_concurrently(self._render_mail, candidates, max_workers) if m is not None]
+        map_concurrently(self._send_mail, mails, max_workers)
+
+    def _render_mail(self, candidate: Tuple[User, bool, bool]) -> Optional[Tuple[User, str]]:
+        user, has_group, has_policy = candidate
+        subject = Subject(type=SubjectType.USER.value, id=user.username)
+        try:
+            groups = self.group_biz.list_subject_group_before_expired_at(subject, self.expired_at) if has_group else []
+            policies = self.policy_biz.list_expired(subject, self.expired_at) if has_policy else []
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("query user %s expired groups and policies error", user.username)
+            return None
+
+        if not groups and not policies:
+            return None
+
+        params = {"tab": "group", "source": "email"}
+        if not groups:
+            params["tab"] = "custom"
+        url = self.base_url + "?" + urlencode(params)
+
+        mail_content = render_to_string(
+            "user_expired_mail.html", {"groups": groups, "policies": policies, "url": url, "user": user}
+        )
+        return user, mail_content
+
+    def _send_mail(self, mail: Tuple[User, str]):
+        user, mail_content = mail
+        try:
+            esb.send_mail(user.username, "蓝鲸权限中心续期提醒", mail_content)
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("send email error")
+            return
+
+        self.checkpoint.add_mailed_username(user.username)
 
 
 @task(ignore_result=True)
-def user_cleanup_expired_policy():
+def user_group_policy_expire_remind():
     """
-    清理用户的长时间过期策略
+    用户的用户组, 自定义权限过期检查
+    """
+    checkpoint = ExpireRemindCheckpoint(time.strftime("%Y%m%d"))
+    UserExpireRemind(get_soon_expire_ts(), checkpoint).run()
+
+
+class ExpiredPolicyCleanup:
+    """
+    清理用户长时间过期的自定义权限
+
+    后台没有批量查询"哪些subject有过期策略"的接口(list_exist_subjects_before_expired_at查询的是用户组成员的过期),
+    所以只处理在SaaS DB里有权限的在职用户(filter_users_with_policy)
+    按用户id分批处理, 每批: 并发查询过期策略 -> 并发分系统删除 -> 删除成功的审计事件一起批量写入
+
+    dry_run: 只查询统计, 不删除
     """
+
     policy_query_biz = PolicyQueryBiz()
     policy_operation_biz = PolicyOperationBiz()
 
-    expired_at = int(db_time()) - settings.MAX_EXPIRED_POLICY_DELETE_TIME
-    task_id = user_cleanup_expired_policy.request.id
+    def __init__(self, expired_at: int, task_id: str, dry_run: bool = False):
+        self.expired_at = expired_at
+        self.task_id = task_id
+        self.dry_run = dry_run
+        self.stats: Dict[str, Any] = {
+            "candidate_users": 0,
+            "expired_users": 0,
+            "expired_policies": 0,
+            "failed_users": 0,
+        }
+
+    def run(self) -> Dict[str, Any]:
+        start = time.time()
 
-    # 分页遍历所有的用户
-    qs = User.objects.filter(staff_status=StaffStatus.IN.value)
-    paginator = Paginator(qs, 100)
+        qs = self._list_candidate_users()
+        last_user_id = 0
+        while True:
+            users = list(qs.filter(id__gt=last_user_id)[: settings.POLICY_CLEANUP_BATCH_SIZE])
+            if not users:
+                break
 
-    if not paginator.count:
-        return
+            self._cleanup(users)
+            last_user_id = users[-1].id
 
-    for i in paginator.page_range:
-        for user in paginator.page(i):
-            subject = Subject(type=SubjectType.USER.value, id=user.username)
+        self.stats["elapsed"] = round(time.time() - start, 3)
+        logger.info("cleanup expired policy, dry_run: %s, stats: %s", self.dry_run, self.stats)
+        return self.stats
 
-            # 查询用户指定过期时间之前的所有策略
-            policies = policy_query_biz.list_expired(subject, expired_at)
+    def _list_candidate_users(self) -> QuerySet:
+        """在SaaS DB里有自定义权限或模板授权的在职用户"""
+        return filter_users_with_policy(User.objects.filter(staff_status=StaffStatus.IN.value)).order_by("id")
+
+    def _cleanup(self, users: List[User]):
+        self.stats["candidate_users"] += len(users)
+        max_workers = settings.POLICY_CLEANUP_MAX_CONCURRENCY
+
+        # 分系统删除过期的策略
+        deletions = []
+        for user, policies in zip(users, map_concurrently(self._list_expired, users, max_workers)):
+            if policies is None:
+                self.stats["failed_users"] += 1
+                continue
             if not policies:
                 continue
 
-            # 分系统删除过期的策略
-            sorted_policies = sorted(policies, key=lambda p: p.system)
-            for system_id, per_policies in groupby(sorted_policies, lambda p: p.system):
-                per_policies = list(per_policies)
-                policy_operation_biz.delete_by_ids(system_id, subject, [p.id for p in per_policies])
+            self.stats["expired_users"] += 1
+            self.stats["expired_policies"] += len(policies)
+            # 系统已不存在时无法得知系统ID, 不做处理
+            sorted_policies = sorted([p for p in policies if p.system.id], key=lambda p: p.system.id)
+            for system_id, per_policies in groupby(sorted_policies, lambda p: p.system.id):
+                deletions.append((user, system_id, list(per_policies)))
+
+        if self.dry_run or not deletions:
+            return
+
+        results = map_concurrently(self._delete, deletions, max_workers)
+        failed_usernames = {d[0].username for d, success in zip(deletions, results) if not success}
+        self.stats["failed_users"] += len(failed_usernames)
+
+        # 记审计信息, 每批删除成功的一起写入
+        succeeded_deletions = [d for d, success in zip(deletions, results) if success]
+        if succeeded_deletions:
+            log_user_cleanup_policy_audit_events(self.task_id, succeeded_deletions)
+
+    def _list_expired(self, user: User) -> Optional[List[ExpiredPolicy]]:
+        subject = Subject(type=SubjectType.USER.value, id=user.username)
+        try:
+            return self.policy_query_biz.list_expired(subject, self.expired_at)
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("query user %s expired policies error", user.username)
+            return None
 
-                # 记审计信息
-                log_user_cleanup_policy_audit_event(task_id, user, system_id, per_policies)
+    def _delete(self, deletion: Tuple[User, str, List[ExpiredPolicy]]) -> bool:
+        """返回是否删除成功"""
+        user, system_id, policies = deletion
+        subject = Subject(type=SubjectType.USER.value, id=user.username)
+        try:
+            self.policy_operation_biz.delete_by_ids(system_id, subject, [p.id for p in policies])
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("delete user %s expired policies of system %s error", user.username, system_id)
+            return False
+        return True
+
+
+@task(ignore_result=True)
+def user_cleanup_expired_policy(dry_run: bool = False):
+    """
+    清理用户的长时间过期策略
+    """
+    expired_at = int(db_time()) - settings.MAX_EXPIRED_POLICY_DELETE_TIME
+    ExpiredPolicyCleanup(expired_at, user_cleanup_expired_policy.request.id, dry_run).run()
+    # 等待审计事件写入
+    audit_event_writer.flush()
@@ -19,6 +19,7 @@ from backend.audit.models import get_event_model
 from backend.common.local import local
 
 from .constants import AuditSourceType
+from .writer import audit_event_writer
 
 logger = logging.getLogger("app")
 
@@ -115,7 +116,7 @@ def log_api_event(request, provider: DataProvider):
 
     event.source_type, event.source_data_app_code = _parse_request_audit_type(request)
 
-    event.save(force_insert=True)
+    audit_event_writer.write(event)
 
 
 def _parse_request_audit_type(request):
@@ -8,7 +8,7 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
-from aenum import LowerStrEnum, StrEnum, auto
+from aenum import LowerStrEnum, StrEnum, auto, skip
 
 from backend.util.enum import ChoicesEnum
 
@@ -86,3 +86,13 @@ class AuditType(ChoicesEnum, StrEnum):
     APPROVAL_GROUP_UPDATE = auto()
 
     EVENT_ROLLBACK = auto()
+
+
+class AuditEventWriteMode(ChoicesEnum, LowerStrEnum):
+    """审计事件的写入方式"""
+
+    SYNC = auto()
+    MEMORY = auto()
+    REDIS = auto()
+
+    _choices_labels = skip(((SYNC, "同步写入DB"), (MEMORY, "进程内队列异步批量写入"), (REDIS, "Redis队列异步批量写入")))
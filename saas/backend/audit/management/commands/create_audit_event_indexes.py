@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import re
+
+from django.core.management.base import BaseCommand
+
+from backend.audit.models import _get_connection, get_event_model
+
+
+class Command(BaseCommand):
+    help = "create missing indexes for the existing monthly audit event tables"
+
+    def handle(self, *args, **options):
+        connection = _get_connection()
+        pattern = re.compile(r"^audit_event_(\d{6})$")
+        months = sorted(
+            m.group(1) for m in (pattern.match(name) for name in connection.introspection.table_names()) if m
+        )
+
+        for month in months:
+            Event = get_event_model(month, create=False)
+            index_together = [tuple(fields) for fields in Event._meta.index_together]
+            columns = {f: Event._meta.get_field(f).column for fields in index_together for f in fields}
+
+            with connection.cursor() as cursor:
+                constraints = connection.introspection.get_constraints(cursor, Event._meta.db_table)
+            exists_columns = {tuple(c["columns"]) for c in constraints.values() if c["index"]}
+            exists = [fields for fields in index_together if tuple(columns[f] for f in fields) in exists_columns]
+
+            if len(exists) == len(index_together):
+                continue
+
+            # 只会创建不存在的索引
+            with connection.schema_editor() as schema_editor:
+                schema_editor.alter_index_together(Event, exists, index_together)
+            self.stdout.write(self.style.SUCCESS(f"create indexes of {Event._meta.db_table} success"))
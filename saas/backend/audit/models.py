@@ -10,6 +10,7 @@ specific language governing permissions and limitations under the License.
 """
 import json
 import uuid
+from typing import Set
 
 from django.apps import apps
 from django.db import connections, models
@@ -29,7 +30,7 @@ class Event(BaseModel):
     source_data_request_id = models.CharField("事件来源请求ID", max_length=32, default="")
     source_data_app_code = models.CharField("事件来源请求app code", max_length=128, default="")
     source_data_task_id = models.CharField("事件来源任务ID", max_length=36, default="")
-    time = models.DateTimeField(auto_now_add=True)
+    time = models.DateTimeField(default=timezone.now)  # 异步批量写入时保留事件发生的时间
     type = models.CharField("事件类型", max_length=64, choices=AuditType.get_choices())
     username = models.CharField("用户名", max_length=64)
     role_type = models.CharField("角色类型", max_length=32, default=RoleType.STAFF.value, choices=RoleType.get_choices())
@@ -55,6 +56,13 @@ class Event(BaseModel):
 
     class Meta:
         abstract = True
+        # 按月分表的审计表的索引, 用于按(created_time, id)的游标分页及常用的过滤条件
+        index_together = [
+            ["created_time", "id"],
+            ["role_id", "created_time"],
+            ["type", "created_time"],
+            ["username", "created_time"],
+        ]
 
 
 class EventForMeta(Event):
@@ -80,8 +88,8 @@ def _get_sub_model(base_cls, suffix: str):
         def exists():
             return table_name in _get_connection().introspection.table_names()
 
-        class Meta:
-            db_table = table_name
+        # 继承基类Meta中的索引等配置, base_cls是变量, 动态创建以便类型检查
+        Meta = type("Meta", (base_cls.Meta,), {"db_table": table_name})
 
     return AuditModel
 
@@ -97,7 +105,14 @@ def _get_connection():
     return connections[get_audit_db()]
 
 
-def _get_model(name: str, suffix: str = ""):
+# 当前进程已确认存在的审计表
+_exist_table_names: Set[str] = set()
+
+
+def _get_model(name: str, suffix: str = "", create: bool = True):
+    """
+    获取按月分表的审计Model, 表不存在时创建, create为False时表不存在返回None
+    """
     if not suffix:
         suffix = timezone.now().strftime("%Y%m")
 
@@ -107,13 +122,26 @@ def _get_model(name: str, suffix: str = ""):
         base_cls = globals()[name]
         cls = _get_sub_model(base_cls, suffix)
 
-    if not cls.exists():
-        # NOTE 并发时, 可能会raise
-        with _get_connection().schema_editor() as schema_editor:
-            schema_editor.create_model(cls)
+    # 表已确认存在的不再查询, 避免每次记录审计都查询所有的表名
+    table_name = cls._meta.db_table
+    if table_name in _exist_table_names:
+        return cls
 
+    if not cls.exists():
+        if not create:
+            return None
+
+        try:
+            with _get_connection().schema_editor() as schema_editor:
+                schema_editor.create_model(cls)
+        except Exception:  # pylint: disable=broad-except
+            # 并发时其它进程可能已创建, 确认表存在即可
+            if not cls.exists():
+                raise
+
+    _exist_table_names.add(table_name)
     return cls
 
 
-def get_event_model(suffix: str = ""):
-    return _get_model("Event", suffix)
+def get_event_model(suffix: str = "", create: bool = True):
+    return _get_model("Event", suffix, create)
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import base64
+import json
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Tuple
+
+from django.db.models import Model, Q, QuerySet
+from django.utils.dateparse import parse_datetime
+
+from backend.common.error_codes import error_codes
+
+
+def previous_month(month: str) -> str:
+    return (datetime.strptime(month, "%Y%m") - timedelta(days=1)).strftime("%Y%m")
+
+
+class EventCursor:
+    """
+    审计事件游标, 记录上一页最后一条事件所在的月份及其(created_time, id)
+    """
+
+    def __init__(self, month: str, created_time: datetime, id: str):
+        self.month = month
+        self.created_time = created_time
+        self.id = id
+
+    def encode(self) -> str:
+        data = json.dumps([self.month, self.created_time.isoformat(), self.id])
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    @classmethod
+    def decode(cls, cursor: str) -> "EventCursor":
+        try:
+            month, created_time, id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return cls(month, parse_datetime(created_time), id)
+        except Exception:  # pylint: disable=broad-except
+            raise error_codes.INVALID_ARGS.format("cursor is invalid")
+
+
+class EventKeysetPaginator:
+    """
+    审计事件的游标分页, 按(created_time, id)倒序
+
+    与limit/offset分页不同, 翻页的耗时与页码无关, 依赖审计表的(created_time, id)索引
+    跨月查询时, 当月的事件取完后继续查询上一个月的表, 直到取满一页或查询了max_months个月
+    """
+
+    def __init__(self, get_queryset: Callable[[str], Optional[QuerySet]], limit: int, max_months: int = 1):
+        """
+        get_queryset: 根据月份返回过滤后的查询集, 该月的审计表不存在时返回None
+        """
+        self.get_queryset = get_queryset
+        self.limit = limit
+        self.max_months = max_months
+
+    def paginate(self, month: str, cursor: str = "") -> Tuple[List[Model], str]:
+        """
+        返回一页的事件及下一页的游标, 没有下一页时游标为空
+        """
+        last = EventCursor.decode(cursor) if cursor else None
+        if last:
+            month = last.month
+
+        events: List[Tuple[str, Model]] = []
+        for _ in range(self.max_months):
+            queryset = self.get_queryset(month)
+            if queryset is None:
+                break
+
+            if last:
+                queryset = queryset.filter(
+                    Q(created_time__lt=last.created_time) | Q(created_time=last.created_time, id__lt=last.id)
+                )
+
+            # 多取一条, 用于判断是否还有下一页
+            size = self.limit + 1 - len(events)
+            events.extend((month, e) for e in queryset.order_by("-created_time", "-id")[:size])
+            if len(events) > self.limit:
+                events = events[: self.limit]
+                month, event = events[-1]
+                return [e for _, e in events], EventCursor(month, event.created_time, str(event.id)).encode()
+
+            month, last = previous_month(month), None
+
+        return [e for _, e in events], ""
@@ -141,3 +141,14 @@ class EventQuerySLZ(serializers.Serializer):
                 raise serializers.ValidationError("format error")
 
         return value
+
+
+class EventCursorQuerySLZ(EventQuerySLZ):
+    cursor = serializers.CharField(label="游标, 第一页为空", required=False, allow_blank=True, default="")
+    limit = serializers.IntegerField(label="数量", required=False, min_value=1, max_value=1000, default=10)
+    cross_month = serializers.BooleanField(label="是否跨月查询", required=False, default=False)
+
+
+class EventCursorListSchemaSLZ(serializers.Serializer):
+    next = serializers.CharField(label="下一页游标, 为空表示没有下一页")
+    results = EventListSchemaSLZ(label="事件", many=True)
@@ -14,6 +14,7 @@ from celery import task
 from django.utils import timezone
 
 from backend.audit.models import get_event_model
+from backend.audit.writer import flush_redis_events
 
 
 @task(ignore_result=True)
@@ -23,3 +24,11 @@ def pre_create_audit_model():
     """
     next_month = (timezone.now() + timedelta(days=15)).strftime("%Y%m")
     get_event_model(next_month)
+
+
+@task(ignore_result=True)
+def flush_audit_event():
+    """
+    将Redis队列中的审计事件批量写入DB
+    """
+    flush_redis_events()
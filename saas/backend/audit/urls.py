@@ -14,5 +14,6 @@ from . import views
 
 urlpatterns = [
     path("", views.EventViewSet.as_view({"get": "list"}), name="audit.audit"),
+    path("cursor/", views.EventViewSet.as_view({"get": "cursor_list"}), name="audit.audit_cursor"),
     path("<uuid:id>/", views.EventViewSet.as_view({"get": "retrieve"}), name="audit.detail"),
 ]
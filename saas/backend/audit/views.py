@@ -8,6 +8,8 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
+from django.conf import settings
+from django.utils import timezone
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status
 from rest_framework.response import Response
@@ -20,7 +22,16 @@ from backend.common.swagger import PaginatedResponseSwaggerAutoSchema, ResponseS
 from backend.service.constants import PermissionCodeEnum, RoleType
 
 from .filters import EventFilter
-from .serializers import EventDetailSchemaSLZ, EventDetailSLZ, EventListSchemaSLZ, EventListSLZ, EventQuerySLZ
+from .pagination import EventKeysetPaginator
+from .serializers import (
+    EventCursorListSchemaSLZ,
+    EventCursorQuerySLZ,
+    EventDetailSchemaSLZ,
+    EventDetailSLZ,
+    EventListSchemaSLZ,
+    EventListSLZ,
+    EventQuerySLZ,
+)
 
 
 class EventViewSet(mixins.ListModelMixin, GenericViewSet):
@@ -35,8 +46,19 @@ class EventViewSet(mixins.ListModelMixin, GenericViewSet):
     def get_queryset(self):
         month = self.request.query_params.get("month", "")
         Event = get_event_model(month)
-        queryset = Event.objects.order_by("-created_time")
+        return self._filter_by_role(Event.objects.order_by("-created_time"))
 
+    def _get_month_queryset(self, month: str):
+        """
+        游标分页时每个月份的查询集, 不会创建不存在的审计表
+        """
+        Event = get_event_model(month, create=False)
+        if Event is None:
+            return None
+
+        return self.filter_queryset(self._filter_by_role(Event.objects.all()))
+
+    def _filter_by_role(self, queryset):
         role = self.request.role
         if role.type == RoleType.SUPER_MANAGER.value:
             return queryset
@@ -57,6 +79,27 @@ class EventViewSet(mixins.ListModelMixin, GenericViewSet):
 
         return super().list(request, *args, **kwargs)
 
+    @swagger_auto_schema(
+        operation_description="审计事件列表(游标分页)",
+        auto_schema=ResponseSwaggerAutoSchema,
+        query_serializer=EventCursorQuerySLZ(),
+        responses={status.HTTP_200_OK: EventCursorListSchemaSLZ(label="事件")},
+        tags=["audit"],
+    )
+    def cursor_list(self, request, *args, **kwargs):
+        slz = EventCursorQuerySLZ(data=request.query_params)
+        slz.is_valid(raise_exception=True)
+        data = slz.validated_data
+
+        paginator = EventKeysetPaginator(
+            self._get_month_queryset,
+            data["limit"],
+            max_months=settings.AUDIT_EVENT_CROSS_MONTH_MAX if data["cross_month"] else 1,
+        )
+        events, next_cursor = paginator.paginate(data.get("month") or timezone.now().strftime("%Y%m"), data["cursor"])
+
+        return Response({"next": next_cursor, "results": EventListSLZ(events, many=True).data})
+
     @swagger_auto_schema(
         operation_description="审计事件详情",
         auto_schema=ResponseSwaggerAutoSchema,
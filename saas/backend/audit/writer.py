@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import atexit
+import datetime
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Type
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, close_old_connections, transaction
+from redis.exceptions import LockError, RedisError
+
+from backend.util.cache import redis_region
+
+from .constants import AuditEventWriteMode
+from .models import Event, get_event_model
+
+logger = logging.getLogger("app")
+
+REDIS_EVENT_QUEUE_KEY = "bk_iam:audit:event_queue"
+REDIS_EVENT_FLUSH_LOCK_KEY = "bk_iam:lock:audit_event_flush"
+
+
+class _EventJSONEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder会将时间截断到毫秒, 审计事件需要保留完整的时间"""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def _bulk_create(events: List[Event]) -> List[Event]:
+    """
+    按月份表批量写入, 批量写入失败时逐个写入, 避免单个事件异常导致整批丢失, 返回写入失败的事件
+
+    重复写入的事件(id已存在)视为写入成功
+    """
+    model_events: Dict[Type[Event], List[Event]] = defaultdict(list)
+    for event in events:
+        model_events[type(event)].append(event)
+
+    failed_events = []
+    for model, per_events in model_events.items():
+        # 写入失败时只回滚到savepoint, 调用方在事务中时不影响后续的逐个写入
+        using = model.objects.db
+        try:
+            with transaction.atomic(using=using):
+                model.objects.bulk_create(per_events, batch_size=settings.AUDIT_EVENT_FLUSH_BATCH_SIZE)
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("bulk create audit events error, fallback to create one by one")
+            for event in per_events:
+                try:
+                    with transaction.atomic(using=using):
+                        event.save(force_insert=True)
+                except IntegrityError:
+                    logger.warning("audit event %s already exists", event.id)
+                except Exception:  # pylint: disable=broad-except
+                    logger.exception("create audit event %s error", event.id)
+                    failed_events.append(event)
+
+    return failed_events
+
+
+class AuditEventWriter:
+    """
+    审计事件写入, 写入方式由AUDIT_EVENT_WRITE_MODE配置
+
+    sync: 在请求线程中直接写入DB(默认)
+    memory: 放入进程内的有界队列, 由后台线程批量写入DB, 进程异常退出时会丢失未写入的事件
+    redis: 放入Redis队列, 由定时任务flush_audit_event批量写入DB, 进程退出不会丢失, 写入DB后才从队列中移除
+
+    队列已满时(背压)等待AUDIT_EVENT_QUEUE_PUT_TIMEOUT秒, 仍无法放入队列则同步写入DB, 不丢弃事件
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queue: Optional[queue.Queue] = None
+        self._pid = 0
+
+    def write(self, event: Event):
+        mode = settings.AUDIT_EVENT_WRITE_MODE
+        if mode == AuditEventWriteMode.MEMORY.value:
+            self._put_memory(event)
+        elif mode == AuditEventWriteMode.REDIS.value:
+            self._put_redis(event)
+        else:
+            event.save(force_insert=True)
+
+    def write_many(self, events: List[Event]):
+        """
+        写入多个事件, sync方式下批量写入DB
+        """
+        if settings.AUDIT_EVENT_WRITE_MODE in (AuditEventWriteMode.MEMORY.value, AuditEventWriteMode.REDIS.value):
+            for event in events:
+                self.write(event)
+            return
+
+        _bulk_create(events)
+
+    # memory
+    def _get_queue(self) -> queue.Queue:
+        # fork后的子进程需要重新创建队列与后台线程
+        if self._queue is not None and self._pid == os.getpid():
+            return self._queue
+
+        with self._lock:
+            if self._queue is None or self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=settings.AUDIT_EVENT_QUEUE_MAXSIZE)
+                self._pid = os.getpid()
+                threading.Thread(target=self._run, args=(self._queue,), name="audit-event-writer", daemon=True).start()
+                atexit.register(self._drain, self._queue)
+
+            return self._queue
+
+    def _put_memory(self, event: Event):
+        try:
+            self._get_queue().put(event, timeout=settings.AUDIT_EVENT_QUEUE_PUT_TIMEOUT)
+        except queue.Full:
+            logger.warning("audit event queue is full, write event %s synchronously", event.id)
+            event.save(force_insert=True)
+
+    def _run(self, event_queue: queue.Queue):
+        while True:
+            events = self._get_batch(event_queue)
+            try:
+                close_old_connections()
+                _bulk_create(events)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("flush audit events error")
+            finally:
+                for _ in events:
+                    event_queue.task_done()
+
+    def _get_batch(self, event_queue: queue.Queue) -> List[Event]:
+        """
+        阻塞等待第一个事件, 之后在AUDIT_EVENT_FLUSH_INTERVAL秒内凑满一批
+        """
+        events = [event_queue.get()]
+        deadline = time.monotonic() + settings.AUDIT_EVENT_FLUSH_INTERVAL
+        while len(events) < settings.AUDIT_EVENT_FLUSH_BATCH_SIZE:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                events.append(event_queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return events
+
+    def _drain(self, event_queue: queue.Queue):
+        """
+        进程退出时写入队列中剩余的事件
+        """
+        events = []
+        while True:
+            try:
+                events.append(event_queue.get_nowait())
+            except queue.Empty:
+                break
+
+        if events:
+            _bulk_create(events)
+
+    def flush(self):
+        """
+        等待进程内队列中的事件全部写入
+        """
+        if self._queue is not None and self._pid == os.getpid():
+            self._queue.join()
+
+    # redis
+    def _put_redis(self, event: Event):
+        data = json.dumps(
+            {
+                "suffix": event._meta.db_table.rsplit("_", 1)[-1],
+                "event": {f.attname: getattr(event, f.attname) for f in event._meta.concrete_fields},
+            },
+            cls=_EventJSONEncoder,
+        )
+        try:
+            client = redis_region.backend.client
+            if client.llen(REDIS_EVENT_QUEUE_KEY) < settings.AUDIT_EVENT_QUEUE_MAXSIZE:
+                client.rpush(REDIS_EVENT_QUEUE_KEY, data)
+                return
+
+            logger.warning("audit event redis queue is full, write event %s synchronously", event.id)
+        except RedisError:
+            logger.exception("put audit event %s to redis error, write synchronously", event.id)
+
+        event.save(force_insert=True)
+
+
+def _parse_redis_events(items: List[bytes]) -> List[Event]:
+    events = []
+    for item in items:
+        try:
+            data = json.loads(item)
+            events.append(get_event_model(data["suffix"])(**data["event"]))
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("parse audit event from redis error: %s", item)
+    return events
+
+
+def flush_redis_events(max_batches: int = 100) -> int:
+    """
+    将Redis队列中的事件批量写入DB, 返回写入的数量
+
+    事件写入DB后才从队列头部移除, 写入过程中进程退出的, 下次会重新写入(按事件id去重)
+    通过锁保证同一时间只有一个flush, 队列头部的事件在移除前不会被其他flush重复处理
+    """
+    client = redis_region.backend.client
+    lock = client.lock(REDIS_EVENT_FLUSH_LOCK_KEY, timeout=5 * 60)
+    if not lock.acquire(blocking=False):
+        logger.info("another audit event flush is running, skip")
+        return 0
+
+    count = 0
+    try:
+        for _ in range(max_batches):
+            items = client.lrange(REDIS_EVENT_QUEUE_KEY, 0, settings.AUDIT_EVENT_FLUSH_BATCH_SIZE - 1)
+            if not items:
+                break
+
+            events = _parse_redis_events(items)
+            failed_events = _bulk_create(events)
+            # 整批都写入失败(比如DB不可用), 保留在队列中等待下次重试; 部分失败的与其他写入方式一致, 记录日志后丢弃
+            if events and len(failed_events) == len(events):
+                logger.error("flush %d audit events from redis fail, retry next time", len(events))
+                break
+
+            client.ltrim(REDIS_EVENT_QUEUE_KEY, len(items), -1)
+            count += len(events) - len(failed_events)
+    finally:
+        try:
+            lock.release()
+        except LockError:
+            logger.warning("release audit event flush lock error, the lock may have expired")
+
+    return count
+
+
+audit_event_writer = AuditEventWriter()
@@ -173,11 +173,14 @@ class ApprovedPassApplicationBiz:
 
     def _renew_group(self, subject: Subject, data: Dict):
         """用户组续期"""
-        for group in data["groups"]:
-            self.group_biz.update_members_expired_at(
-                group["id"],
-                [GroupMemberExpiredAtBean(type=subject.type, id=subject.id, policy_expired_at=group["expired_at"])],
-            )
+        # 同一用户组重复出现时以最后一个过期时间为准，与逐个更新的结果一致
+        group_expired_at = {group["id"]: group["expired_at"] for group in data["groups"]}
+        self.group_biz.update_groups_members_expired_at(
+            {
+                group_id: [GroupMemberExpiredAtBean(type=subject.type, id=subject.id, policy_expired_at=expired_at)]
+                for group_id, expired_at in group_expired_at.items()
+            }
+        )
 
     def _gen_role_info_bean(self, data: Dict) -> RoleInfoBean:
         """处理分级管理员数据"""
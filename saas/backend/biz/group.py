@@ -10,6 +10,7 @@ specific language governing permissions and limitations under the License.
 """
 from datetime import datetime
 from itertools import groupby
+from operator import itemgetter
 from typing import Any, Dict, List, Optional, Tuple
 
 from django.conf import settings
@@ -41,6 +42,7 @@ from backend.service.policy.query import PolicyQueryService
 from backend.service.role import RoleService, UserRole
 from backend.service.system import SystemService
 from backend.service.template import TemplateService
+from backend.util.concurrency import map_concurrently
 from backend.util.time import utc_string_to_local
 from backend.util.uuid import gen_uuid
 
@@ -284,6 +286,17 @@ class GroupBiz:
         """
         self.group_svc.update_members_expired_at(group_id, parse_obj_as(List[GroupMemberExpiredAt], members))
 
+    def update_groups_members_expired_at(self, group_members: Dict[int, List[GroupMemberExpiredAtBean]]):
+        """
+        批量更新多个用户组成员的过期时间
+        """
+        self.group_svc.update_groups_members_expired_at(
+            {
+                group_id: parse_obj_as(List[GroupMemberExpiredAt], members)
+                for group_id, members in group_members.items()
+            }
+        )
+
     def delete(self, group_id: int):
         """
         删除用户组
@@ -383,8 +396,15 @@ class GroupBiz:
         if not need_fetch_resources:
             return
 
-        for key, parts in groupby(need_fetch_resources, key=lambda resource: (resource["system"], resource["type"])):
-            self._exec_fill_resources_attribute(key[0], key[1], list(parts))
+        groups = [(key, list(parts)) for key, parts in groupby(need_fetch_resources, key=itemgetter("system", "type"))]
+        # 不同资源类型并发查询属性，单个接入系统的并发数有限制
+        map_concurrently(
+            lambda group: self._exec_fill_resources_attribute(group[0][0], group[0][1], group[1]),
+            groups,
+            max_workers=settings.RESOURCE_PROVIDER_MAX_CONCURRENCY,
+            key_func=lambda group: group[0][0],
+            key_max_workers=settings.RESOURCE_PROVIDER_SYSTEM_MAX_CONCURRENCY,
+        )
 
     def _exec_fill_resources_attribute(self, system_id, resource_type_id, resources):
         # 查询属性
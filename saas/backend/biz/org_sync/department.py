@@ -13,11 +13,15 @@ import logging
 from collections import defaultdict
 from typing import Dict, List, Set, Tuple
 
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count
+
 from backend.apps.organization.models import Department, DepartmentMember
 from backend.component import usermgr
 
 from .base import BaseSyncDBService
-from .util import convert_list_for_mptt
+from .util import calculate_mptt_fields, convert_list_for_mptt
 
 organization_logger = logging.getLogger("organization")
 
@@ -29,6 +33,8 @@ class DBDepartmentSyncService(BaseSyncDBService):
         """初始数据"""
         self.new_departments = usermgr.list_department()
         self.old_departments = list(Department.objects.all())
+        # 是否批量写入部门后一次性重建mptt树，在sync_to_db时根据拓扑变更的数量决定
+        self.bulk_rebuild = False
 
     def created_handler(self):
         """关于新建部门，DB的处理"""
@@ -53,6 +59,16 @@ class DBDepartmentSyncService(BaseSyncDBService):
         id_parent_ids = [(i.id, i.parent_id) for i in created_departments]
         sorted_departments = convert_list_for_mptt(id_parent_ids)
 
+        if self.bulk_rebuild:
+            # 批量模式下按BFS顺序插入，保证parent先于孩子写入，mptt字段先占位，最后统一重建
+            created_department_dict = {i.id: i for i in created_departments}
+            for dept in created_departments:
+                dept.tree_id, dept.lft, dept.rght, dept.level = 0, 0, 0, 0
+            Department.objects.bulk_create(
+                [created_department_dict[dept_id] for dept_id in sorted_departments], batch_size=1000
+            )
+            return
+
         # 2. 以mptt方式添加部门，不可批量添加，因为存在依赖，添加时parent可能未存在
         created_department_dict = {i.id: i for i in created_departments}
         for dept_id in sorted_departments:
@@ -78,6 +94,11 @@ class DBDepartmentSyncService(BaseSyncDBService):
         if not deleted_departments:
             return
 
+        if self.bulk_rebuild:
+            # 批量模式下直接删除(子部门由外键级联删除)，最后统一重建mptt树
+            Department.objects.filter(id__in=[i.id for i in deleted_departments]).delete()
+            return
+
         # 1. 使用BFS转换出可顺序删除的列表，使用mptt进行删除
         id_parent_ids = [(i.id, i.parent_id) for i in deleted_departments]
         sorted_departments = convert_list_for_mptt(id_parent_ids, reverse=True)
@@ -106,6 +127,11 @@ class DBDepartmentSyncService(BaseSyncDBService):
         if not updated_parent_departments:
             return
 
+        if self.bulk_rebuild:
+            # 批量模式下只更新parent，最后统一重建mptt树
+            Department.objects.bulk_update(updated_parent_departments, ["parent"], batch_size=1000)
+            return
+
         # SaaS使用mptt进行更新parent
         for dept in updated_parent_departments:
             dept.parent = Department.objects.get(id=dept.parent_id) if dept.parent_id else None
@@ -136,18 +162,94 @@ class DBDepartmentSyncService(BaseSyncDBService):
 
         Department.objects.bulk_update(updated_departments, ["name", "order", "category_id"], batch_size=1000)
 
+    def count_tree_changes(self) -> int:
+        """统计新增与变更了parent的部门数量"""
+        old_department_parent_dict = {i.id: i.parent_id for i in self.old_departments}
+        return sum(
+            1
+            for dept in self.new_departments
+            if dept["id"] not in old_department_parent_dict or old_department_parent_dict[dept["id"]] != dept["parent"]
+        )
+
+    def rebuild_tree(self):
+        """根据DB里所有部门的parent关系，在内存里一次计算出mptt的树字段后批量写回"""
+        departments = list(Department.objects.values_list("id", "parent_id", "tree_id", "lft", "rght", "level"))
+        mptt_fields_map = calculate_mptt_fields([(i[0], i[1]) for i in sorted(departments)])
+
+        # 只更新mptt字段有变化的部门
+        updated_rows = [
+            mptt_fields_map[dept[0]] + (dept[0],) for dept in departments if dept[2:] != mptt_fields_map[dept[0]]
+        ]
+        if not updated_rows:
+            return
+
+        # 按主键逐行更新，bulk_update对每批都会拼接出超大的CASE WHEN语句，更新大量部门时反而更慢
+        quote_name = connection.ops.quote_name
+        sql = "UPDATE {} SET {} = %s, {} = %s, {} = %s, {} = %s WHERE {} = %s".format(
+            quote_name(Department._meta.db_table),
+            *[quote_name(Department._meta.get_field(f).column) for f in ["tree_id", "lft", "rght", "level", "id"]],
+        )
+        with connection.cursor() as cursor:
+            for i in range(0, len(updated_rows), 1000):
+                cursor.executemany(sql, updated_rows[i : i + 1000])
+
     def sync_to_db(self):
         """SaaS DB 相关变更"""
+        # 拓扑变更的部门较多时(比如初次导入)，逐个以mptt方式变更，每次都会查询parent并更新大量节点的mptt字段，
+        # 整体为O(n^2)，此时改为批量写入，然后一次性重建mptt树
+        self.bulk_rebuild = self.count_tree_changes() >= settings.ORG_SYNC_DEPARTMENT_BULK_THRESHOLD
+
         # 新增部门
         self.created_handler()
         # 更新部门拓扑
         self.updated_parent_handler()
         # 删除部门
         self.deleted_handler()
+        # 重建mptt树
+        if self.bulk_rebuild:
+            self.rebuild_tree()
         # 更新部门基本信息
         self.updated_handler()
 
 
+class DBDepartmentIncrementalSyncService(DBDepartmentSyncService):
+    """部门增量同步服务，只处理用户管理里有变更的部门"""
+
+    def __init__(self, new_departments: List[Dict]):
+        """初始数据"""
+        # 新数据为用户管理里有变更的部门
+        self.new_departments = new_departments
+        # 老数据只需要从DB获取对应的部门
+        self.old_departments = list(Department.objects.filter(id__in=[i["id"] for i in new_departments]))
+        self.bulk_rebuild = False
+
+        # 记录变更前的状态，用于同步后只重新计算受影响部门的冗余数据
+        old_department_dict = {i.id: i for i in self.old_departments}
+        # 新增或变更了parent的部门
+        self.tree_changed_ids = {
+            i["id"]
+            for i in new_departments
+            if i["id"] not in old_department_dict or old_department_dict[i["id"]].parent_id != i["parent"]
+        }
+        # 改名的部门，子孙部门的祖先里记录了部门名称
+        self.renamed_ids = {
+            i["id"]
+            for i in new_departments
+            if i["id"] in old_department_dict and old_department_dict[i["id"]].name != i["name"]
+        }
+        # 变更parent前的祖先
+        self.old_ancestor_ids = {
+            ancestor_id
+            for dept_id in self.tree_changed_ids
+            if dept_id in old_department_dict
+            for ancestor_id in old_department_dict[dept_id].ancestor_ids
+        }
+
+    def deleted_handler(self):
+        """增量数据里无法得知被删除的部门，由全量同步处理"""
+        return
+
+
 class DBDepartmentSyncExactInfo(BaseSyncDBService):
     """部门额外数据"""
 
@@ -315,3 +417,111 @@ class DBDepartmentSyncExactInfo(BaseSyncDBService):
         """SaaS DB 相关变更"""
         # 更新部门
         self.updated_exact_info_handle()
+
+
+class DBDepartmentIncrementalSyncExactInfo(BaseSyncDBService):
+    """
+    增量同步的部门额外数据，只重新计算受影响的部门，不加载所有部门与部门成员
+
+    1. 新增、变更parent、改名的部门，其子树内部门的祖先需要重新计算，改名的叶子部门不影响其他部门
+    2. 新增、变更parent的部门及其新老祖先，子部门数、用户数、递归用户数需要重新计算，递归用户数使用mptt的左右值范围在DB里统计
+    """
+
+    def __init__(self, tree_changed_ids: Set[int], renamed_ids: Set[int], old_ancestor_ids: Set[int]):
+        """初始数据"""
+        self.tree_changed_ids = tree_changed_ids
+        self.renamed_ids = renamed_ids
+        self.old_ancestor_ids = old_ancestor_ids
+
+    def _calculate_ancestors(self) -> Dict[int, str]:
+        """按层级从上往下遍历受影响的子树，当前部门祖先=直接上级的祖先+直接上级"""
+        ancestors_map: Dict[int, str] = {}
+        roots = Department.objects.filter(id__in=self.tree_changed_ids | self.renamed_ids).order_by("level")
+        for root in roots:
+            # 已在上层部门的子树里计算过
+            if root.id in ancestors_map:
+                continue
+            # 只改名的叶子部门，没有子孙部门的祖先需要更新
+            if root.id not in self.tree_changed_ids and root.is_leaf_node():
+                continue
+
+            nodes = root.get_descendants(include_self=True).order_by("level").values_list("id", "parent_id", "name")
+            id_name_map = {}
+            ancestor_list_map = {root.id: [{"id": i.id, "name": i.name} for i in root.get_ancestors()]}
+            for dept_id, parent_id, name in nodes:
+                id_name_map[dept_id] = name
+                if dept_id != root.id:
+                    ancestor_list_map[dept_id] = ancestor_list_map[parent_id] + [
+                        {"id": parent_id, "name": id_name_map[parent_id]}
+                    ]
+                ancestor_list = ancestor_list_map[dept_id]
+                ancestors_map[dept_id] = json.dumps(ancestor_list) if ancestor_list else ""
+
+        return ancestors_map
+
+    def _calculate_counts(self, departments: List[Department]) -> Dict[int, Tuple[int, int, int]]:
+        """计算部门的子部门数、用户数、递归用户数"""
+        dept_ids = [i.id for i in departments]
+        child_count_map = dict(
+            Department.objects.filter(parent_id__in=dept_ids)
+            .values("parent_id")
+            .annotate(count=Count("id"))
+            .values_list("parent_id", "count")
+        )
+        member_count_map = dict(
+            DepartmentMember.objects.filter(department_id__in=dept_ids)
+            .values("department_id")
+            .annotate(count=Count("id"))
+            .values_list("department_id", "count")
+        )
+
+        counts_map = {}
+        for dept in departments:
+            # 子树内的部门在mptt的左右值范围内，用户可能属于子树内的多个部门，需去重
+            subtree_ids = Department.objects.filter(
+                tree_id=dept.tree_id, lft__gte=dept.lft, rght__lte=dept.rght
+            ).values("id")
+            recursive_member_count = (
+                DepartmentMember.objects.filter(department_id__in=subtree_ids).values("user_id").distinct().count()
+            )
+            counts_map[dept.id] = (
+                child_count_map.get(dept.id, 0),
+                member_count_map.get(dept.id, 0),
+                recursive_member_count,
+            )
+        return counts_map
+
+    def sync_to_db(self):
+        """SaaS DB 相关变更"""
+        # 更新子树内部门的祖先
+        ancestors_map = self._calculate_ancestors()
+        updated_ancestors = [
+            Department(id=dept_id, ancestors=ancestors_map[dept_id])
+            for dept_id, ancestors in Department.objects.filter(id__in=ancestors_map.keys()).values_list(
+                "id", "ancestors"
+            )
+            if ancestors != ancestors_map[dept_id]
+        ]
+        if updated_ancestors:
+            Department.objects.bulk_update(updated_ancestors, ["ancestors"], batch_size=1000)
+
+        if not self.tree_changed_ids:
+            return
+
+        # 更新拓扑变更的部门及其新老祖先的计数
+        dept_ids = set(self.tree_changed_ids) | self.old_ancestor_ids
+        for dept in Department.objects.filter(id__in=self.tree_changed_ids):
+            dept_ids.update(dept.get_ancestors().values_list("id", flat=True))
+
+        departments = list(Department.objects.filter(id__in=dept_ids))
+        counts_map = self._calculate_counts(departments)
+        updated_counts = []
+        for dept in departments:
+            counts = counts_map[dept.id]
+            if (dept.child_count, dept.member_count, dept.recursive_member_count) != counts:
+                dept.child_count, dept.member_count, dept.recursive_member_count = counts
+                updated_counts.append(dept)
+        if updated_counts:
+            Department.objects.bulk_update(
+                updated_counts, ["child_count", "member_count", "recursive_member_count"], batch_size=1000
+            )
@@ -19,17 +19,19 @@ class DBDepartmentMemberSyncService(BaseSyncDBService):
 
     def __init__(self):
         """初始数据"""
-        # 初始化数据
-        self.new_department_members = usermgr.list_department_profile()
+        # 初始化数据，关系数据量较大，流式获取并只保留(部门ID, 用户ID)
+        self.new_department_member_set = {
+            (i["department_id"], i["profile_id"]) for i in usermgr.iter_department_profile()
+        }
         self.old_department_members = list(DepartmentMember.objects.all())
 
     def created_handler(self):
         """关于新建部门成员，DB的处理"""
         old_department_member_set = {(i.department_id, i.user_id) for i in self.old_department_members}
         created_department_members = [
-            DepartmentMember(department_id=i["department_id"], user_id=i["profile_id"])
-            for i in self.new_department_members
-            if (i["department_id"], i["profile_id"]) not in old_department_member_set
+            DepartmentMember(department_id=department_id, user_id=user_id)
+            for department_id, user_id in self.new_department_member_set
+            if (department_id, user_id) not in old_department_member_set
         ]
 
         if not created_department_members:
@@ -39,9 +41,10 @@ class DBDepartmentMemberSyncService(BaseSyncDBService):
 
     def deleted_handler(self):
         """关于删除部门成员，DB的处理"""
-        new_department_member_set = {(i["department_id"], i["profile_id"]) for i in self.new_department_members}
         deleted_ids = [
-            i.id for i in self.old_department_members if (i.department_id, i.user_id) not in new_department_member_set
+            i.id
+            for i in self.old_department_members
+            if (i.department_id, i.user_id) not in self.new_department_member_set
         ]
 
         if not deleted_ids:
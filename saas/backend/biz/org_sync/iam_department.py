@@ -38,7 +38,8 @@ class IAMBackendDepartmentSyncService(BaseSyncIAMBackendService):
         if not created_depts:
             return
 
-        iam.create_subjects_by_auto_paging(created_depts)
+        # 有数据推送失败时抛出异常，本次全量同步失败，下次全量同步与后台数据对比后会重新推送
+        iam.create_subjects_by_auto_paging(created_depts).raise_first_error()
 
         organization_logger.info(
             f"create departments by sync task, the length of departments: {len(created_depts)} "
@@ -55,7 +56,7 @@ class IAMBackendDepartmentSyncService(BaseSyncIAMBackendService):
         if not deleted_depts:
             return
 
-        iam.delete_subjects_by_auto_paging(deleted_depts)
+        iam.delete_subjects_by_auto_paging(deleted_depts).raise_first_error()
 
         organization_logger.info(
             f"delete departments by sync task, the length of departments: {len(deleted_depts)} "
@@ -38,7 +38,8 @@ class IAMBackendUserSyncService(BaseSyncIAMBackendService):
         if not created_users:
             return
 
-        iam.create_subjects_by_auto_paging(created_users)
+        # 有数据推送失败时抛出异常，本次全量同步失败，下次全量同步与后台数据对比后会重新推送
+        iam.create_subjects_by_auto_paging(created_users).raise_first_error()
 
         organization_logger.info(
             f"create users by sync task, the length of users: {len(created_users)} "
@@ -53,7 +54,7 @@ class IAMBackendUserSyncService(BaseSyncIAMBackendService):
         if not deleted_users:
             return
 
-        iam.delete_subjects_by_auto_paging(deleted_users)
+        iam.delete_subjects_by_auto_paging(deleted_users).raise_first_error()
 
         organization_logger.info(
             f"delete users by sync task, the length of users: {len(deleted_users)} "
@@ -60,7 +60,8 @@ class IAMBackendUserDepartmentSyncService(BaseSyncIAMBackendService):
         if not created_user_depts:
             return
 
-        iam.create_subject_departments_by_auto_paging(created_user_depts)
+        # 有数据推送失败时抛出异常，本次全量同步失败，下次全量同步与后台数据对比后会重新推送
+        iam.create_subject_departments_by_auto_paging(created_user_depts).raise_first_error()
 
     def deleted_handler(self):
         """后台需要删除的用户部门处理"""
@@ -70,7 +71,7 @@ class IAMBackendUserDepartmentSyncService(BaseSyncIAMBackendService):
         if not deleted_user_depts:
             return
 
-        iam.delete_subject_departments_by_auto_paging(deleted_user_depts)
+        iam.delete_subject_departments_by_auto_paging(deleted_user_depts).raise_first_error()
 
     def updated_handler(self):
         """后台需要更新的用户部门处理"""
@@ -89,7 +90,7 @@ class IAMBackendUserDepartmentSyncService(BaseSyncIAMBackendService):
         if not updated_user_depts:
             return
 
-        iam.update_subject_departments_by_auto_paging(updated_user_depts)
+        iam.update_subject_departments_by_auto_paging(updated_user_depts).raise_first_error()
 
     def sync_to_iam_backend(self):
         """同步IAM后台 相关变更"""
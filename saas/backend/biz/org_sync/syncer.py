@@ -11,11 +11,19 @@ specific language governing permissions and limitations under the License.
 所有组织架构同步操作 统一处理
 """
 import datetime
+from typing import Dict, List, Optional
 
-from backend.apps.organization.constants import NEW_USER_AUTO_SYNC_COUNT_LIMIT
-from backend.apps.organization.models import User
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from backend.apps.organization.constants import NEW_USER_AUTO_SYNC_COUNT_LIMIT, SyncDataType, SyncTaskStatus, SyncType
+from backend.apps.organization.models import Department, SyncRecord, SyncWatermark, User
 from backend.component import iam, usermgr
 
+from .department import DBDepartmentIncrementalSyncExactInfo, DBDepartmentIncrementalSyncService
+from .user import DBUserIncrementalSyncService
+
 
 class Syncer:
     """
@@ -92,6 +100,105 @@ class Syncer:
         # 后台新建
         iam.create_subjects([{"type": "user", "id": user["username"], "name": user["display_name"]} for user in users])
 
+    def get_watermark(self, data_type: str) -> Optional[datetime.datetime]:
+        """查询数据类型的高水位"""
+        watermark = SyncWatermark.objects.filter(data_type=data_type).first()
+        return watermark.watermark if watermark else None
+
+    def set_watermarks(self, watermark: datetime.datetime, *data_types: str):
+        """更新高水位，不指定数据类型时更新所有类型(全量同步后)"""
+        for data_type in data_types or [i.value for i in SyncDataType]:
+            SyncWatermark.objects.update_or_create(data_type=data_type, defaults={"watermark": watermark})
+
+    def need_full_sync(self) -> bool:
+        """高水位缺失，或距离上次成功的全量同步已超过配置的间隔时，需要以全量同步兜底"""
+        if SyncWatermark.objects.count() < len(SyncDataType):
+            return True
+
+        last_full_sync = (
+            SyncRecord.objects.filter(type=SyncType.Full.value, status=SyncTaskStatus.Succeed.value)
+            .order_by("-id")
+            .first()
+        )
+        reconcile_interval = datetime.timedelta(hours=settings.ORG_SYNC_FULL_RECONCILE_INTERVAL)
+        return not last_full_sync or last_full_sync.created_time < timezone.now() - reconcile_interval
+
+    def sync_incremental(self):
+        """
+        增量同步
+        1. 按每类数据的高水位，从用户管理查询这段时间内新增或更新的用户和部门
+        2. 用户按批次写DB，每批一个小事务，避免长时间锁表；部门由于需要维护树结构，变更后只重新计算受影响部门的冗余数据
+        3. 新增的用户和部门同步到IAM后台，然后推进高水位
+        NOTE: 用户管理查询不到被删除的数据，部门与用户、用户与Leader的关系也没有更新时间，这些都由定时的全量同步处理
+        """
+        # 以查询开始的时间作为新的高水位，查询时包含高水位所在的分钟，重叠部分的数据重复写入也不影响
+        end_time = timezone.now()
+        self._sync_updated_users(end_time)
+        self._sync_updated_departments(end_time)
+
+    def _sync_updated_users(self, end_time: datetime.datetime):
+        start_time = self.get_watermark(SyncDataType.User.value)
+        users = usermgr.list_updated_profile(start_time, end_time)
+        # 去重，避免同一用户出现在同一批次里
+        users = list({u["id"]: u for u in users}.values())
+
+        batch_size = settings.ORG_SYNC_INCREMENTAL_BATCH_SIZE
+        for i in range(0, len(users), batch_size):
+            batch_users = users[i : i + batch_size]
+            exist_user_ids = set(
+                User.objects.filter(id__in=[u["id"] for u in batch_users]).values_list("id", flat=True)
+            )
+            with transaction.atomic():
+                DBUserIncrementalSyncService(batch_users).sync_to_db()
+
+            created_users = [
+                {"type": "user", "id": u["username"], "name": u["display_name"] or u["username"]}
+                for u in batch_users
+                if u["id"] not in exist_user_ids
+            ]
+            if created_users:
+                self._create_subjects(created_users)
+
+        self.set_watermarks(end_time, SyncDataType.User.value)
+
+    def _sync_updated_departments(self, end_time: datetime.datetime):
+        start_time = self.get_watermark(SyncDataType.Department.value)
+        departments = usermgr.list_updated_department(start_time, end_time)
+        departments = list({d["id"]: d for d in departments}.values())
+
+        if departments:
+            exist_department_ids = set(
+                Department.objects.filter(id__in=[d["id"] for d in departments]).values_list("id", flat=True)
+            )
+            service = DBDepartmentIncrementalSyncService(departments)
+            with transaction.atomic():
+                service.sync_to_db()
+                # 部门拓扑变更与改名会影响祖先、子部门数、递归成员数等冗余数据，只重新计算受影响的部门
+                DBDepartmentIncrementalSyncExactInfo(
+                    service.tree_changed_ids, service.renamed_ids, service.old_ancestor_ids
+                ).sync_to_db()
+
+            created_departments = [
+                {"type": "department", "id": str(d["id"]), "name": d["name"] or str(d["id"])}
+                for d in departments
+                if d["id"] not in exist_department_ids
+            ]
+            if created_departments:
+                self._create_subjects(created_departments)
+
+        self.set_watermarks(end_time, SyncDataType.Department.value)
+
+    def _create_subjects(self, subjects: List[Dict[str, str]]):
+        """
+        新增的用户和部门同步到IAM后台
+        数据已写入DB，之后的增量同步无法再识别出需要新增到后台，所以有数据推送失败时清除高水位，
+        下次同步时以全量同步兜底，对比后台数据后重新推送
+        """
+        summary = iam.create_subjects_by_auto_paging(subjects)
+        if summary.failed_results:
+            SyncWatermark.objects.all().delete()
+            summary.raise_first_error()
+
     # def sync_full_organization(self):
     #     # TODO: 重构时将 backend.apps.organization.tasks里的全量同步迁移到这里
     #     pass
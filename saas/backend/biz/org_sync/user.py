@@ -8,6 +8,8 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
+from typing import Dict, List
+
 from backend.apps.organization.models import User
 from backend.component import usermgr
 
@@ -104,3 +106,22 @@ class DBUserSyncService(BaseSyncDBService):
 
         # TODO: 离职用户如何处理 (1) 管理员确认？（2）SaaS 除用户表和关系表外，其他都删除用户相关的（2）后台除Subject表外其他都删除
         # TODO: 用户名更新的用户 => (1)仅通知管理员和记录日志等，不做变更
+
+
+class DBUserIncrementalSyncService(DBUserSyncService):
+    """DB用户增量同步服务，只处理用户管理里有变更的用户"""
+
+    def __init__(self, new_users: List[Dict]):
+        """初始化数据"""
+        # 新数据为用户管理里有变更的用户
+        self.new_users = new_users
+        # 老数据只需要从DB获取对应的用户
+        self.old_users = list(User.objects.filter(id__in=[i["id"] for i in new_users]))
+
+    def sync_to_db(self):
+        """SaaS DB 相关变更"""
+        # 新增用户
+        self.created_handler()
+        # 更新用户
+        self.updated_handler()
+        # NOTE: 增量数据里无法得知被删除的用户，由全量同步处理
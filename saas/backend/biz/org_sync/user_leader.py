@@ -19,16 +19,17 @@ class DBUserLeaderSyncService(BaseSyncDBService):
 
     def __init__(self):
         """初始数据"""
-        self.new_user_leaders = usermgr.list_profile_leader()
+        # 流式获取并只保留(用户ID, LeaderID)
+        self.new_user_leader_set = {(i["from_profile_id"], i["to_profile_id"]) for i in usermgr.iter_profile_leader()}
         self.old_user_leaders = list(UserLeader.objects.all())
 
     def created_handler(self):
         """关于新建用户Leader，DB的处理"""
         old_user_leader_set = {(i.user_id, i.leader_id) for i in self.old_user_leaders}
         created_user_leader = [
-            UserLeader(user_id=i["from_profile_id"], leader_id=i["to_profile_id"])
-            for i in self.new_user_leaders
-            if (i["from_profile_id"], i["to_profile_id"]) not in old_user_leader_set
+            UserLeader(user_id=user_id, leader_id=leader_id)
+            for user_id, leader_id in self.new_user_leader_set
+            if (user_id, leader_id) not in old_user_leader_set
         ]
 
         if not created_user_leader:
@@ -38,8 +39,7 @@ class DBUserLeaderSyncService(BaseSyncDBService):
 
     def deleted_handler(self):
         """关于删除用户Leader，DB的处理"""
-        new_user_leader_set = {(i["from_profile_id"], i["to_profile_id"]) for i in self.new_user_leaders}
-        deleted_ids = [i.id for i in self.old_user_leaders if (i.user_id, i.leader_id) not in new_user_leader_set]
+        deleted_ids = [i.id for i in self.old_user_leaders if (i.user_id, i.leader_id) not in self.new_user_leader_set]
 
         if not deleted_ids:
             return
@@ -9,19 +9,19 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 from collections import defaultdict
-from typing import List, Tuple
+from typing import Dict, List, Tuple
 
 
 def convert_list_for_mptt(data: List[Tuple[int, int]], reverse: bool = False) -> List[int]:
     """转换为按顺序变更的数据"""
     node_set = {i[0] for i in data}
-    # 由于存在parent=None或parent不在新增的列表里，可能形成多棵Tree即森林
-    root = set()
+    # 由于存在parent=None或parent不在新增的列表里，可能形成多棵Tree即森林，按数据原有顺序记录每棵树的根节点
+    root = []
     children_map = defaultdict(list)
     for i, parent in data:
         # 如果parent为None或0,或者在新增列表列不存在，则为单独的树root
         if not parent or parent not in node_set:
-            root.add(i)
+            root.append(i)
             continue
         # 作为其他树的孩子
         children_map[parent].append(i)
@@ -52,3 +52,45 @@ def convert_list_for_mptt(data: List[Tuple[int, int]], reverse: bool = False) ->
     if reverse:
         queue.reverse()
     return queue
+
+
+def calculate_mptt_fields(data: List[Tuple[int, int]]) -> Dict[int, Tuple[int, int, int, int]]:
+    """
+    根据ID与parentID，一次计算出每个节点mptt的(tree_id, lft, rght, level)
+    1. 使用convert_list_for_mptt得到从根到叶子的BFS顺序
+    2. 逆序(从叶子到根)计算每个节点的子树节点数(包括自身)，子树的区间宽度即为 2 * 节点数
+    3. 顺序(从根到叶子)为每个节点的孩子依次分配区间，每个根节点为单独的一棵树
+    """
+    node_set = {i[0] for i in data}
+    parent_map = {i: parent for i, parent in data if parent and parent in node_set}
+    sorted_nodes = convert_list_for_mptt(data)
+    # 存在环时，环上的节点无法从根遍历到
+    if len(sorted_nodes) != len(node_set):
+        raise Exception(f"tree has cycle, nodes: {sorted(node_set - set(sorted_nodes))}")
+
+    children_map = defaultdict(list)
+    for node in sorted_nodes:
+        if node in parent_map:
+            children_map[parent_map[node]].append(node)
+
+    # 逆序，计算子树节点数
+    size_map: Dict[int, int] = {}
+    for node in reversed(sorted_nodes):
+        size_map[node] = 1 + sum(size_map[child] for child in children_map[node])
+
+    # 顺序，分配每个孩子的区间
+    fields_map: Dict[int, Tuple[int, int, int, int]] = {}
+    tree_id = 0
+    for node in sorted_nodes:
+        if node not in parent_map:
+            tree_id += 1
+            fields_map[node] = (tree_id, 1, 2 * size_map[node], 0)
+
+        node_tree_id, left, _, level = fields_map[node]
+        next_left = left + 1
+        for child in children_map[node]:
+            right = next_left + 2 * size_map[child] - 1
+            fields_map[child] = (node_tree_id, next_left, right, level + 1)
+            next_left = right + 1
+
+    return fields_map
@@ -82,6 +82,25 @@ class PathNodeBeanList:
     def to_path_string(self):
         return translate_path(self.dict())
 
+    def to_path_key(self) -> Tuple[str, ...]:
+        """
+        路径的token序列, 与to_path_string一一对应, 用于去重与前缀树匹配
+        """
+        key: List[str] = []
+        for node in self.nodes:
+            key.append(node.type)
+            key.append(node.id)
+        return tuple(key)
+
+    def to_scope_key(self) -> Tuple[str, ...]:
+        """
+        作为授权范围路径时的token序列, 末尾节点为任意时只匹配该层的资源类型
+        """
+        key = self.to_path_key()
+        if key and key[-1] == ANY_ID:
+            return key[:-1]
+        return key
+
     def _to_path_resource_types(self) -> List[PathResourceType]:
         return [one.to_path_resource_type() for one in self.nodes]
 
@@ -143,9 +162,11 @@ class InstanceBean(Instance):
         """
         path_set = self._get_path_set()
         for path in paths:
-            if PathNodeBeanList(path).to_path_string() in path_set:
+            key = PathNodeBeanList(path).to_path_key()
+            if key in path_set:
                 continue
 
+            path_set.add(key)
             self.path.append(path)
 
         return self
@@ -154,12 +175,12 @@ class InstanceBean(Instance):
         """
         裁剪
         """
-        path_set = {PathNodeBeanList(path).to_path_string() for path in paths}
-        self.path = [path for path in self.path if PathNodeBeanList(path).to_path_string() not in path_set]
+        path_set = {PathNodeBeanList(path).to_path_key() for path in paths}
+        self.path = [path for path in self.path if PathNodeBeanList(path).to_path_key() not in path_set]
         return self
 
-    def _get_path_set(self):
-        return {PathNodeBeanList(path).to_path_string() for path in self.path}
+    def _get_path_set(self) -> Set[Tuple[str, ...]]:
+        return {PathNodeBeanList(path).to_path_key() for path in self.path}
 
     @property
     def is_empty(self) -> bool:
@@ -12,6 +12,7 @@ import logging
 from collections import defaultdict
 from typing import Any, Dict, List, Tuple
 
+from django.conf import settings
 from django.utils.translation import gettext as _
 from pydantic import BaseModel
 from pydantic.tools import parse_obj_as
@@ -24,6 +25,7 @@ from backend.service.models import (
     ResourceInstanceInfo,
 )
 from backend.service.resource import ResourceProvider
+from backend.util.concurrency import map_concurrently
 
 logger = logging.getLogger(__name__)
 
@@ -185,12 +187,21 @@ class ResourceBiz:
             # 需要查询的实例，添加到对应资源类型分组里
             resource_ids_dict[(r.system_id, r.type)].append(r.id)
 
-        # 查询
-        for k, ids in resource_ids_dict.items():
-            system_id, resource_type_id = k
-            # 接口查询
+        # 查询: 不同资源类型并发请求，单个接入系统的并发数有限制
+        def fetch_instance_name(key: Tuple[str, str]) -> List[ResourceInstanceBaseInfo]:
+            system_id, resource_type_id = key
             rp = self.new_resource_provider(system_id, resource_type_id)
-            resource_instance_base_infos = rp.fetch_instance_name(ids)
+            return rp.fetch_instance_name(resource_ids_dict[key])
+
+        keys = list(resource_ids_dict.keys())
+        results = map_concurrently(
+            fetch_instance_name,
+            keys,
+            max_workers=settings.RESOURCE_PROVIDER_MAX_CONCURRENCY,
+            key_func=lambda key: key[0],
+            key_max_workers=settings.RESOURCE_PROVIDER_SYSTEM_MAX_CONCURRENCY,
+        )
+        for (system_id, resource_type_id), resource_instance_base_infos in zip(keys, results):
             # 遍历返回的数据
             for r in resource_instance_base_infos:
                 resource_node = ResourceNodeBean(system_id=system_id, type=resource_type_id, id=r.id)
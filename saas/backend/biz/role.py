@@ -9,8 +9,7 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 import logging
-from collections import defaultdict
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from django.db.models import Q
 from django.utils.functional import cached_property
@@ -47,6 +46,7 @@ from backend.service.constants import (
 from backend.service.models import Attribute, Subject, System
 from backend.service.role import AuthScopeAction, AuthScopeSystem, RoleInfo, RoleService
 from backend.service.system import SystemService
+from backend.util.trie import PrefixTrie
 
 logger = logging.getLogger("app")
 
@@ -267,8 +267,7 @@ class RoleListQuery:
         if self.role.type == RoleType.STAFF.value:
             return systems
 
-        scopes = self.role_svc.list_auth_scope(self.role.id)
-        system_set = {s.system_id for s in scopes}
+        system_set = self.role_svc.get_auth_scope_system_actions(self.role.id)
         if SYSTEM_ALL in system_set:
             return systems
         return [s for s in systems if s.id in system_set]
@@ -280,8 +279,7 @@ class RoleListQuery:
         if self.role.type == RoleType.STAFF.value:
             return [ACTION_ALL]
 
-        scopes = self.role_svc.list_auth_scope(self.role.id)
-        systems = {s.system_id: {a.id for a in s.actions} for s in scopes}
+        systems = self.role_svc.get_auth_scope_system_actions(self.role.id)
         if system_id not in systems and SYSTEM_ALL not in systems:
             return []
 
@@ -409,10 +407,11 @@ class RoleAuthorizationScopeChecker:
         if self.role.type == RoleType.STAFF.value:
             raise error_codes.FORBIDDEN  # 普通用户不能授权
 
+        self._scope_tries: Dict[Tuple[str, str], List[PrefixTrie]] = {}
+
     @cached_property
     def system_action_scope(self):
-        scopes = self.svc.list_auth_scope(self.role.id)
-        return {s.system_id: {a.id: a for a in s.actions} for s in scopes}
+        return self.svc.get_auth_scope_system_actions(self.role.id)
 
     def _check_system_in_scope(self, system_id):
         system_action_scope = self.system_action_scope
@@ -441,32 +440,24 @@ class RoleAuthorizationScopeChecker:
         if self._check_action_in_scope(system_id, action_id) == ACTION_ALL:
             return paths
 
-        policy_scope = PolicyBean.parse_obj(self.system_action_scope[system_id][action_id])
-        for rrt in policy_scope.related_resource_types:
-            scope_str_paths = []
-            inside_paths = []
-            for path_list in rrt.iter_path_list(ignore_attribute=True):
-                sp = path_list.to_path_string()
-                # 处理路径中存在*的情况
-                if sp.endswith(",*/"):
-                    sp = sp[:-2]
-
-                scope_str_paths.append(sp)
-
-            for path in paths:
-                if self._is_path_match_scope_paths(path, scope_str_paths):
-                    inside_paths.append(path)
-
-            paths = inside_paths
+        for scope_trie in self._get_scope_tries(system_id, action_id):
+            paths = [path for path in paths if scope_trie.has_prefix_of(PathNodeBeanList(path).to_path_key())]
 
         return paths
 
-    def _is_path_match_scope_paths(self, path: List[PathNodeBean], scope_str_paths: List[str]):
-        tp = PathNodeBeanList(path).to_path_string()
-        for sp in scope_str_paths:
-            if tp.startswith(sp):
-                return True
-        return False
+    def _get_scope_tries(self, system_id: str, action_id: str) -> List[PrefixTrie]:
+        """
+        操作授权范围中每个关联资源类型的路径前缀树, 同一个checker中每个操作只构建一次
+        """
+        key = (system_id, action_id)
+        if key not in self._scope_tries:
+            policy_scope = PolicyBean.parse_obj(self.system_action_scope[system_id][action_id])
+            self._scope_tries[key] = [
+                PrefixTrie(path_list.to_scope_key() for path_list in rrt.iter_path_list(ignore_attribute=True))
+                for rrt in policy_scope.related_resource_types
+            ]
+
+        return self._scope_tries[key]
 
     def check_policies(self, system_id: str, policies: List[PolicyBean]):
         """
@@ -554,63 +545,49 @@ class RoleSubjectScopeChecker:
             return subjects
 
         # 剩下需要的校验的subject，若是用户则需要其所有所在部门(包括祖先部门)在scope部门里，若是部门则需要其祖先部门在scope部门里
+        # 反过来即：部门需要在scope部门的子孙(包括自身)里，用户需要直接加入了scope部门子孙(包括自身)中的任一部门
         department_scopes = {int(s.id) for s in scopes if s.type == SubjectType.DEPARTMENT.value}
+        need_check_departments = {int(s.id) for s in need_check_subject if s.type == SubjectType.DEPARTMENT.value}
+        need_check_usernames = {s.id for s in need_check_subject if s.type == SubjectType.USER.value}
 
-        # 【对于部门】则需要查询其祖先是否在department_scopes里，
-        # 【对于用户】则需要查询用户在的所有部门的祖先是否在department_scopes里
-        # 所有需要查询祖先的部门，为了减少DB查询，会先获取用户和部门需要查询祖先的所有部门，然后再一次性查询DB
-        need_query_ancestor_departments = set()
-        # 需要查询的用户
-        need_query_users = set()
-        for s in need_check_subject:
-            if s.type == SubjectType.DEPARTMENT.value:
-                need_query_ancestor_departments.add(int(s.id))
-            elif s.type == SubjectType.USER.value:
-                need_query_users.add(s.id)
-
-        # DB查询用户，需要知道用户的所有在的部门，不包含部门的祖先 username 对应的 set(DepartmentIDs)
-        user_direct_department = defaultdict(set)
-        if need_query_users:
-            users = User.objects.filter(username__in=need_query_users)
-            # 查询用户直接加入的部门
-            department_members = DepartmentMember.objects.filter(user_id__in=[i.id for i in users])
-            # 这里是记录user_id与其直接部门ID的集合, user_id 对应的 set(DepartmentIDs)
-            user_id_direct_departments = defaultdict(set)
-            for dm in department_members:
-                user_id_direct_departments[dm.user_id].add(dm.department_id)
-            # 遍历每个用户，获得其所有所在的部门
-            for u in users:
-                # 将user_id_direct_departments转换为user_direct_department
-                user_direct_department[u.username] = user_id_direct_departments[u.id]
-                # 每个部门也是需要查询其祖先部门的
-                need_query_ancestor_departments.update(user_id_direct_departments[u.id])
-
-        # DB查询所有部门的祖先部门，包括部门本身
-        department_ancestors = defaultdict(set)
-        if need_query_ancestor_departments:
-            departments = Department.objects.filter(id__in=need_query_ancestor_departments)
-            for d in departments:
-                department_ancestors[d.id] = set(d.ancestor_ids)
-                department_ancestors[d.id].add(d.id)
+        # mptt的(tree_id, lft, rght)即为同步时维护的子孙部门区间，scope部门的所有子孙部门只需按区间过滤，
+        # 无需再逐个解析部门祖先后在内存里求交集
+        scope_departments = Department.tree_objects.get_queryset_descendants(
+            Department.objects.filter(id__in=department_scopes), include_self=True
+        )
+
+        # 【对于部门】一条SQL查询出在scope部门子孙里的部门
+        in_scope_departments = set()
+        if need_check_departments:
+            in_scope_departments = set(
+                scope_departments.filter(id__in=need_check_departments).values_list("id", flat=True)
+            )
+
+        # 【对于用户】一条SQL查询出直接加入了scope部门子孙里的部门的用户
+        in_scope_usernames = set()
+        if need_check_usernames:
+            member_user_ids = DepartmentMember.objects.filter(department_id__in=scope_departments.values("id")).values(
+                "user_id"
+            )
+            in_scope_usernames = set(
+                User.objects.filter(username__in=need_check_usernames, id__in=member_user_ids).values_list(
+                    "username", flat=True
+                )
+            )
 
         need_delete_set = set()
 
         # 开始校验
         for s in need_check_subject:
-            # 【对于部门】则需要查询其祖先是否在department_scopes里，
             if s.type == SubjectType.DEPARTMENT.value:
-                if len(department_ancestors[int(s.id)] & department_scopes) == 0:
+                if int(s.id) not in in_scope_departments:
                     if raise_exception:
                         raise error_codes.FORBIDDEN.format(message=_("部门({})不满足角色的授权范围").format(s.id), replace=True)
 
                     need_delete_set.add((s.type, s.id))
 
             elif s.type == SubjectType.USER.value:
-                # 校验用户，需要查询遍历用户的每个直接部门，然后再去每个直接部门的祖先，所有祖先和直接部门的集合即为用户所有所在的部门
-                department_set = set()
-                for d in user_direct_department[s.id]:
-                    department_set.update(department_ancestors[d])
-                if len(department_set & department_scopes) == 0:
+                if s.id not in in_scope_usernames:
                     if raise_exception:
                         raise error_codes.FORBIDDEN.format(message=_("用户({})不满足角色的授权范围").format(s.id), replace=True)
 
@@ -639,24 +616,11 @@ class ActionScopeDiffer:
         return True
 
     def _diff_instances(self, template_instances: List[InstanceBean], scope_instances: List[InstanceBean]) -> bool:
-        scope_paths = []
-        for i in scope_instances:
-            for p in i.path:
-                sp = PathNodeBeanList(p).to_path_string()
-
-                # 处理路径中存在*的情况
-                if sp.endswith(",*/"):
-                    sp = sp[:-2]
-
-                scope_paths.append(sp)
+        scope_trie = PrefixTrie(PathNodeBeanList(p).to_scope_key() for i in scope_instances for p in i.path)
 
         for i in template_instances:
             for p in i.path:
-                path = PathNodeBeanList(p).to_path_string()
-                for sp in scope_paths:
-                    if path.startswith(sp):
-                        break
-                else:
+                if not scope_trie.has_prefix_of(PathNodeBeanList(p).to_path_key()):
                     return False  # 模板中的某个路径, 不能满足任意一个范围中的路径
 
         return True
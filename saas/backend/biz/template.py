@@ -8,8 +8,9 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
+from django.conf import settings
 from django.db import transaction
 from django.http import Http404
 from django.utils.translation import gettext as _
@@ -41,6 +42,8 @@ from backend.service.action import ActionList, ActionService
 from backend.service.constants import RoleRelatedObjectType, SubjectType, TemplatePreUpdateStatus
 from backend.service.models import Action, ChainNode, Policy, Subject
 from backend.service.template import TemplateGroupPreCommit, TemplateService
+from backend.util.basic import iter_chunked
+from backend.util.trie import PrefixTrie
 
 
 class TemplateCreateBean(BaseModel):
@@ -369,6 +372,9 @@ class ChainNodeList:
     def length(self) -> int:
         return len(self.nodes)
 
+    def to_key(self) -> Tuple[Tuple[str, str], ...]:
+        return tuple((node.system_id, node.id) for node in self.nodes)
+
     def is_match_path(self, path: List[PathNodeBean]) -> bool:
         if len(path) > self.length:
             return False
@@ -380,6 +386,25 @@ class ChainNodeList:
         return True
 
 
+class ChainPathMatcher:
+    """
+    路径与链的前缀匹配, 预先将所有链编译为前缀树, 匹配的复杂度只与路径长度相关, 与链的数量无关
+
+    等价于逐个链调用ChainNodeList.is_match_path, 路径节点system_id为空时(兼容逻辑)退化为逐个链匹配
+    """
+
+    def __init__(self, chain_list: "ChainList") -> None:
+        self.chain_list = chain_list
+        self._trie = chain_list.to_prefix_trie()
+
+    def is_match_path(self, path: List[PathNodeBean]) -> bool:
+        if any(node.system_id == "" for node in path):
+            return any(chain.is_match_path(path) for chain in self.chain_list.chains)
+
+        key = tuple((node.system_id, node.type) for node in path)
+        return next(self._trie.iter_extension_values(key), None) is not None
+
+
 class ChainList:
     def __init__(self, chains: List[ChainNodeList]) -> None:
         self.chains = chains
@@ -413,19 +438,31 @@ class ChainList:
         """
         匹配chain的前缀，返回所有结果的集合，并去重
         """
+        source_trie = chain_list.to_prefix_trie()
+
         new_chain_list = ChainList([])
         for target_chain in self.chains:
-            for source_chain in chain_list.chains:
-                prefix = target_chain.match_prefix(source_chain)
-                if not prefix:
-                    continue
-                new_chain_list.append(prefix)
+            key = target_chain.to_key()
+            # 源链是目标链的前缀时取源链, 目标链是源链的前缀时取目标链, 按源链的顺序合并
+            prefixes = {index: chain_list.chains[index] for index in source_trie.iter_prefix_values(key)}
+            prefixes.update({index: target_chain for index in source_trie.iter_extension_values(key)})
+            for index in sorted(prefixes):
+                new_chain_list.append(prefixes[index])
 
-        return new_chain_list if new_chain_list.length != 0 else None
+        return new_chain_list if new_chain_list.length() != 0 else None
 
     def length(self) -> int:
         return len(self.chains)
 
+    def to_prefix_trie(self) -> PrefixTrie:
+        """
+        所有链的前缀树, value为链的索引
+        """
+        trie = PrefixTrie()
+        for index, chain in enumerate(self.chains):
+            trie.add(chain.to_key(), index)
+        return trie
+
 
 class TemplatePolicyCloneBiz:
     """
@@ -446,55 +483,87 @@ class TemplatePolicyCloneBiz:
         """
         生成模板更新时用户组的clone Policy
         """
+        return list(self.iter_template_groups_clone_policy(template, group_ids, action_id, source_action_id, role))
+
+    def iter_template_groups_clone_policy(
+        self, template: PermTemplate, group_ids: List[str], action_id: str, source_action_id: str, role
+    ) -> Iterator[GroupClonePolicy]:
+        """
+        流式生成模板更新时用户组的clone Policy
+
+        模板授权数据按批读取, 每批生成后即返回, 内存占用只与批大小相关, 与用户组数量无关
+        Note: clone配置的生成与检查在调用时执行, 策略的生成在迭代时执行
+        """
         old_action_ids = template.action_ids
         if source_action_id not in old_action_ids:
-            return []
+            return iter([])
 
         action_list = self.action_svc.new_action_list(template.system_id)
         config_dict = self._gen_action_clone_config_dict(action_list, [action_id], [source_action_id])
 
         # 配置不存在
         if action_id not in config_dict or source_action_id not in config_dict[action_id]:
-            return []
-        chain_list = config_dict[action_id][source_action_id]
+            return iter([])
+        matcher = ChainPathMatcher(config_dict[action_id][source_action_id])
 
         new_action = action_list.get(action_id)
         if new_action is None:
-            return []
+            return iter([])
 
         scope_check = RoleAuthorizationScopeChecker(role=role)
-        authorized_templates = PermTemplatePolicyAuthorized.objects.filter_by_template(template.id).filter(
-            subject_type=SubjectType.GROUP.value, subject_id__in=group_ids
+        return self._iter_groups_clone_policy(template, group_ids, new_action, source_action_id, matcher, scope_check)
+
+    def _iter_groups_clone_policy(
+        self,
+        template: PermTemplate,
+        group_ids: List[str],
+        new_action: Action,
+        source_action_id: str,
+        matcher: ChainPathMatcher,
+        scope_check: RoleAuthorizationScopeChecker,
+    ) -> Iterator[GroupClonePolicy]:
+        chunk_size = settings.TEMPLATE_CLONE_POLICY_CHUNK_SIZE
+        authorized_templates = (
+            PermTemplatePolicyAuthorized.objects.filter_by_template(template.id)
+            .filter(subject_type=SubjectType.GROUP.value, subject_id__in=group_ids)
+            .only("subject_id", "_data")
+            .iterator(chunk_size=chunk_size)
         )
 
-        group_policies = []
-        for authorized_template in authorized_templates:
-            policy_list = PolicyBeanList(
-                template.system_id,
-                [PolicyBean.parse_obj(one) for one in authorized_template.data["actions"]],
-            )
-            source_policy = policy_list.get(source_action_id)
-            if source_policy is None:
-                continue
+        for chunk in iter_chunked(authorized_templates, chunk_size):
+            group_policies = []
+            for authorized_template in chunk:
+                # 只解析源操作的策略
+                source_policy = next(
+                    (
+                        PolicyBean.parse_obj(one)
+                        for one in authorized_template.data["actions"]
+                        if one["id"] == source_action_id
+                    ),
+                    None,
+                )
+                if source_policy is None:
+                    continue
 
-            policy = self._gen_clone_policy(template.system_id, new_action, source_policy, chain_list, scope_check)
-            if not policy:
-                continue
+                policy = self._gen_clone_policy(template.system_id, new_action, source_policy, matcher, scope_check)
+                if not policy:
+                    continue
 
-            # 填充名称
-            clone_policy_list = PolicyBeanList(template.system_id, [policy], need_fill_empty_fields=True)
-            group_policies.append(
-                GroupClonePolicy(group_id=int(authorized_template.subject_id), policy=clone_policy_list.policies[0])
-            )
+                group_policies.append(GroupClonePolicy(group_id=int(authorized_template.subject_id), policy=policy))
 
-        return group_policies
+            if not group_policies:
+                continue
+
+            # 填充名称, 每批只查询一次资源类型
+            PolicyBeanList(template.system_id, [one.policy for one in group_policies], need_fill_empty_fields=True)
+            yield from group_policies
 
     def _gen_clone_policy(
         self,
         system_id: str,
         action: Action,
         source_policy: PolicyBean,
-        chain_list: ChainList,
+        matcher: ChainPathMatcher,
         scope_checker: RoleAuthorizationScopeChecker,
     ) -> Optional[PolicyBean]:
         """
@@ -503,17 +572,15 @@ class TemplatePolicyCloneBiz:
         match_paths = []  # 能匹配实例视图前缀的资源路径
         match_path_hash_set = set()  # 用于去重
         for path_list in source_policy.related_resource_types[0].iter_path_list():
-            for chain in chain_list.chains:
-                if not chain.is_match_path(path_list.nodes):
-                    continue
+            if not matcher.is_match_path(path_list.nodes):
+                continue
 
-                _hash = path_list.to_path_string()
-                if _hash in match_path_hash_set:
-                    break
+            _hash = path_list.to_path_key()
+            if _hash in match_path_hash_set:
+                continue
 
-                match_path_hash_set.add(_hash)
-                match_paths.append(path_list.nodes)
-                break
+            match_path_hash_set.add(_hash)
+            match_paths.append(path_list.nodes)
 
         if not match_paths:
             return None
@@ -627,4 +694,8 @@ class TemplatePolicyCloneBiz:
             else:
                 prefix_chain_list = prefix_chain_list.match_prefix(chain_list)
 
-        return prefix_chain_list if prefix_chain_list and prefix_chain_list.length != 0 else None
+            # 交集为空时不匹配, 不能用后续资源类型的前缀重新开始
+            if not prefix_chain_list or prefix_chain_list.length() == 0:
+                return None
+
+        return prefix_chain_list
@@ -10,11 +10,14 @@ specific language governing permissions and limitations under the License.
 """
 import json
 import zlib
+from typing import Any, Callable, Optional
 
+from django.conf import settings
 from django.db import models
 from django.utils import timezone
 
-from backend.util.json import json_dumps
+from backend.util.compress import compress_text, decompress_text
+from backend.util.json import json_dumps, json_loads
 
 
 class BaseModel(models.Model):
@@ -84,3 +87,68 @@ class CompressedJSONField(models.BinaryField):
 
     def from_db_value(self, value, expression, connection, context):
         return self.to_python(value)
+
+
+class CompressedJSONTextField(models.TextField):
+    """
+    压缩存储的JSON文本字段
+
+    与CompressedJSONField不同, Python侧的值仍然是JSON字符串, 用法与TextField完全一致,
+    DB里存储为compress_text编码后的文本, 列类型不变, 可以直接替换已有的TextField而无需变更表结构
+    读取时兼容未压缩的历史数据, 历史数据可通过 compress_json_text_fields 命令在线压缩
+    """
+
+    def get_prep_value(self, value):
+        value = super().get_prep_value(value)
+        if not value or not settings.JSON_TEXT_COMPRESS_ENABLED or len(value) < settings.JSON_TEXT_COMPRESS_MIN_LENGTH:
+            return value
+        return compress_text(value, settings.JSON_TEXT_COMPRESS_CODEC)
+
+    def from_db_value(self, value, expression, connection, context):
+        if not value:
+            return value
+        return decompress_text(value)
+
+
+class JSONProperty(property):
+    """
+    以JSON字符串字段存储的属性, 解析结果按实例缓存, 多次读取只解析一次
+
+    缓存与解析时的字段值绑定, 直接修改字段(如 obj._resources = "...", refresh_from_db)后读取会重新解析,
+    通过属性赋值时会同时写入字段与缓存
+    Note: 读取到的是缓存的对象, 修改后需要重新赋值才会写入字段
+
+    field_name: 存储JSON字符串的字段名
+    default: 字段值为空时返回的默认值的工厂函数, 为None时空值也按JSON解析
+    """
+
+    def __init__(self, field_name: str, default: Optional[Callable[[], Any]] = None):
+        # 继承property, Django才会将其识别为属性, 支持在Model初始化时传入
+        super().__init__()
+        self.field_name = field_name
+        self.default = default
+        self.cache_attr = f"_{field_name}_json_cache"
+
+    def __set_name__(self, owner, name):
+        self.cache_attr = f"_{name}_json_cache"
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+
+        raw = getattr(instance, self.field_name)
+        cached = instance.__dict__.get(self.cache_attr)
+        if cached is not None and cached[0] is raw:
+            return cached[1]
+
+        if not raw and self.default is not None:
+            value = self.default()
+        else:
+            value = json_loads(raw)
+        instance.__dict__[self.cache_attr] = (raw, value)
+        return value
+
+    def __set__(self, instance, value):
+        raw = json_dumps(value)
+        setattr(instance, self.field_name, raw)
+        instance.__dict__[self.cache_attr] = (raw, value)
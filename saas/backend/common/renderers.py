@@ -8,10 +8,20 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
+import json
+import logging
+from typing import Any, Dict, Iterable
+
+from django.http import StreamingHttpResponse
 from django.utils import translation
 from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
 
 from backend.common.constants import DjangoLanguageEnum
+from backend.common.error_codes import CodeException, error_codes
+from backend.common.local import local
+
+logger = logging.getLogger("app")
 
 
 def handle_tranlate(data):
@@ -73,3 +83,55 @@ class BKAPIRenderer(JSONRenderer):
 
         response = super().render(data, accepted_media_type, renderer_context)
         return response
+
+
+def _dump_item(item: Dict[str, Any]) -> str:
+    return json.dumps(handle_tranlate(item), cls=encoders.JSONEncoder, ensure_ascii=False, separators=(",", ":"))
+
+
+def streaming_list_response(items: Iterable[Dict[str, Any]]) -> StreamingHttpResponse:
+    """
+    流式返回列表数据, 返回的结构与BKAPIRenderer封装的一致, 用于数据量很大的列表
+
+    列表每生成一项即写出, 不需要先在内存中生成完整的列表
+    Note: 第一项在返回响应前生成, 此前的异常仍由DRF的异常处理返回;
+          开始返回后无法再修改状态码, 出错时在结尾写入result=false与错误码, 保证返回的仍是合法的JSON
+    """
+    language = translation.get_language()
+    # 中间件RequestProvider在返回响应后即释放local, 生成过程中需要重新设置, 保证调用链使用同一个request_id
+    request = local.request
+
+    # 先生成第一项, 参数/权限校验等在生成器启动时的异常直接抛出
+    iterator = iter(items)
+    try:
+        first_data = _dump_item(next(iterator))
+    except StopIteration:
+        first_data = ""
+
+    def render():
+        local.request = request
+        try:
+            with translation.override(language):
+                yield '{"data":[' + first_data
+                error = None
+                try:
+                    for item in iterator:
+                        yield "," + _dump_item(item)
+                except Exception as e:  # pylint: disable=broad-except
+                    logger.exception("streaming list response error")
+                    error = e if isinstance(e, CodeException) else error_codes.COMMON_ERROR
+
+                if error is None:
+                    yield '],"result":true,"code":%d,"message":"%s"}' % (
+                        BKAPIRenderer.SUCCESS_CODE,
+                        BKAPIRenderer.SUCCESS_MESSAGE,
+                    )
+                else:
+                    yield '],"result":false,"code":%d,"message":%s}' % (
+                        error.code,
+                        json.dumps(str(error.message), ensure_ascii=False),
+                    )
+        finally:
+            local.release()
+
+    return StreamingHttpResponse(render(), content_type="application/json")
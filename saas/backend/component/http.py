@@ -18,17 +18,155 @@ Rules:
 
 from __future__ import unicode_literals
 
+import http.cookiejar
 import logging
+import os
+import threading
+import time
 import traceback
 from functools import partial
+from typing import Dict, Tuple
+from urllib.parse import urlparse
 
 import requests
+from django.conf import settings
+from prometheus_client import Counter, Histogram
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import PoolError
 
 from backend.common.debug import http_trace
 
 logger = logging.getLogger("component")
 
 
+# 连接池统计, 通过django_prometheus的/metrics暴露
+pool_request_counter = Counter(
+    "component_http_pool_requests_total",
+    "count of connections acquired from component http pool, result: hit(reuse keep-alive connection)/new",
+    ["host", "result"],
+)
+pool_wait_histogram = Histogram(
+    "component_http_pool_wait_seconds",
+    "time spent waiting for a connection from component http pool",
+    ["host"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5),
+)
+
+
+class _InstrumentedPoolMixin:
+    """统计连接池的复用命中、新建连接数以及获取连接的等待时间"""
+
+    def __init__(self, *args, wait_timeout=None, **kwargs):
+        # 连接池阻塞时获取连接的最大等待时间，None表示一直等待
+        self.wait_timeout = wait_timeout
+        super().__init__(*args, **kwargs)
+
+    def _new_conn(self):
+        conn = super()._new_conn()
+        conn._iam_reused = False
+        return conn
+
+    def _get_conn(self, timeout=None):
+        if timeout is None:
+            timeout = self.wait_timeout
+
+        start = time.perf_counter()
+        conn = super()._get_conn(timeout=timeout)
+        pool_wait_histogram.labels(self.host).observe(time.perf_counter() - start)
+
+        result = "hit" if getattr(conn, "_iam_reused", False) else "new"
+        pool_request_counter.labels(self.host, result).inc()
+        conn._iam_reused = True
+        return conn
+
+
+class InstrumentedHTTPConnectionPool(_InstrumentedPoolMixin, HTTPConnectionPool):
+    pass
+
+
+class InstrumentedHTTPSConnectionPool(_InstrumentedPoolMixin, HTTPSConnectionPool):
+    pass
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """使用可统计的连接池的HTTPAdapter"""
+
+    def __init__(self, pool_wait_timeout=None, **kwargs):
+        self.pool_wait_timeout = pool_wait_timeout
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": partial(InstrumentedHTTPConnectionPool, wait_timeout=self.pool_wait_timeout),
+            "https": partial(InstrumentedHTTPSConnectionPool, wait_timeout=self.pool_wait_timeout),
+        }
+
+
+class PooledSessionManager:
+    """
+    按Host维护的requests.Session, 每个Host独享连接池, 连接keep-alive复用
+
+    Note: 进程fork后连接不能共享, 所以按pid隔离
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._sessions: Dict[Tuple[str, str], requests.Session] = {}
+
+    def _pool_config(self, host: str) -> Dict:
+        maxsize = settings.COMPONENT_HTTP_POOL_HOST_MAXSIZE.get(host, settings.COMPONENT_HTTP_POOL_MAXSIZE)
+        return {
+            "pool_connections": 1,
+            "pool_maxsize": maxsize,
+            "pool_block": settings.COMPONENT_HTTP_POOL_BLOCK,
+            "pool_wait_timeout": settings.COMPONENT_HTTP_POOL_WAIT_TIMEOUT,
+        }
+
+    def _new_session(self, host: str) -> requests.Session:
+        session = requests.Session()
+        # Session按Host在所有用户间共享, 拒绝保存响应中的Set-Cookie, 避免Cookie串到其他用户的请求中
+        # 注意: 每次请求显式传入的cookies不受影响
+        session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+        adapter = PooledHTTPAdapter(**self._pool_config(host))
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def get(self, url: str) -> requests.Session:
+        parsed = urlparse(url)
+        key = (parsed.scheme, parsed.netloc)
+
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._sessions = {}
+
+            session = self._sessions.get(key)
+            if session is None:
+                session = self._new_session(parsed.netloc)
+                self._sessions[key] = session
+
+        return session
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions = {}
+
+
+session_manager = PooledSessionManager()
+
+
+def get_pooled_session(url: str) -> requests.Session:
+    """获取url对应Host的共享连接池Session"""
+    return session_manager.get(url)
+
+
 def _gen_header():
     headers = {
         "Content-Type": "application/json",
@@ -39,32 +177,34 @@ def _gen_header():
 def _http_request(method, url, headers=None, data=None, timeout=None, verify=False, cert=None, cookies=None):
     trace_func = partial(http_trace, method=method, url=url, data=data)
 
+    session = get_pooled_session(url)
     try:
         if method == "GET":
-            resp = requests.get(
+            resp = session.get(
                 url=url, headers=headers, params=data, timeout=timeout, verify=verify, cert=cert, cookies=cookies
             )
         elif method == "HEAD":
-            resp = requests.head(url=url, headers=headers, verify=verify, cert=cert, cookies=cookies)
+            resp = session.head(url=url, headers=headers, verify=verify, cert=cert, cookies=cookies)
         elif method == "POST":
-            resp = requests.post(
+            resp = session.post(
                 url=url, headers=headers, json=data, timeout=timeout, verify=verify, cert=cert, cookies=cookies
             )
         elif method == "DELETE":
-            resp = requests.delete(
+            resp = session.delete(
                 url=url, headers=headers, json=data, timeout=timeout, verify=verify, cert=cert, cookies=cookies
             )
         elif method == "PUT":
-            resp = requests.put(
+            resp = session.put(
                 url=url, headers=headers, json=data, timeout=timeout, verify=verify, cert=cert, cookies=cookies
             )
         elif method == "PATCH":
-            resp = requests.patch(
+            resp = session.patch(
                 url=url, headers=headers, json=data, timeout=timeout, verify=verify, cert=cert, cookies=cookies
             )
         else:
             return False, None
-    except requests.exceptions.RequestException:
+    except (requests.exceptions.RequestException, PoolError):
+        # Note: 连接池开启阻塞且等待超时时, urllib3会直接抛出EmptyPoolError, requests并不会封装
         logger.exception("http request error! method: %s, url: %s, data: %s", method, url, data)
         trace_func(exc=traceback.format_exc())
         return False, None
@@ -16,10 +16,10 @@ from django.conf import settings
 from backend.common.error_codes import error_codes
 from backend.common.local import local
 from backend.publisher import shortcut as publisher_shortcut
-from backend.util.cache import region
+from backend.util.cache import cache_on_system_model_version, region
 
 from .http import http_delete, http_get, http_post, http_put, logger
-from .util import execute_all_data_by_paging, list_all_data_by_paging
+from .util import ChunkExecutionSummary, execute_all_data_by_paging, list_all_data_by_paging
 
 DEFAULT_SYSTEM_FIELDS = "id,name,name_en,description,description_en"
 DEFAULT_ACTION_FIELDS = "id,name,name_en,description,description_en"
@@ -90,7 +90,7 @@ def list_resource_type(systems: List[str], fields: str = DEFAULT_RESOURCE_TYPE_F
     return _call_iam_api(http_get, url_path, data=params)
 
 
-@region.cache_on_arguments(expiration_time=60)  # 缓存1分钟
+@cache_on_system_model_version(expiration_time=60)  # 缓存1分钟
 def list_action(system_id: str, fields: str = DEFAULT_ACTION_FIELDS) -> List[Dict]:
     """
     获取系统的所有action列表
@@ -107,7 +107,7 @@ def get_action(system_id: str, action_id: str) -> Dict:
     return _call_iam_api(http_get, url_path, data={})
 
 
-@region.cache_on_arguments(expiration_time=60)
+@cache_on_system_model_version(expiration_time=60)
 def list_instance_selection(system_id: str) -> List[Dict]:
     """
     获取系统的实例视图列表
@@ -166,7 +166,7 @@ def update_subjects(subjects: List[Dict[str, str]]) -> None:
     return _call_iam_api(http_put, url_path, data=subjects)
 
 
-def create_subjects_by_auto_paging(subjects: List[Dict[str, str]]) -> None:
+def create_subjects_by_auto_paging(subjects: List[Dict[str, str]]) -> ChunkExecutionSummary:
     """通过自动分页批量创建Subject"""
 
     def create_paging_subjects(paging_data):
@@ -174,7 +174,8 @@ def create_subjects_by_auto_paging(subjects: List[Dict[str, str]]) -> None:
         url_path = "/api/v1/web/subjects"
         _call_iam_api(http_post, url_path, data=paging_data)
 
-    return execute_all_data_by_paging(create_paging_subjects, subjects, 3000)
+    # 新增不幂等，超时后请求可能已生效，不重试，失败的数据由调用方重放
+    return execute_all_data_by_paging(create_paging_subjects, subjects, 3000, max_retries=0)
 
 
 def delete_subjects(subjects: List[dict]) -> None:
@@ -188,7 +189,7 @@ def delete_subjects(subjects: List[dict]) -> None:
     return result
 
 
-def delete_subjects_by_auto_paging(subjects: List[Dict[str, str]]) -> None:
+def delete_subjects_by_auto_paging(subjects: List[Dict[str, str]]) -> ChunkExecutionSummary:
     """通过自动分页批量删除Subject"""
 
     def delete_paging_subjects(paging_data):
@@ -244,7 +245,7 @@ def list_all_subject_department() -> List[Dict]:
     return list_all_data_by_paging(list_paging_subject_department, 1000)
 
 
-def create_subject_departments_by_auto_paging(subject_departments: List[Dict]) -> None:
+def create_subject_departments_by_auto_paging(subject_departments: List[Dict]) -> ChunkExecutionSummary:
     """通过自动分页批量添加subject的所有部门记录"""
 
     def create_paging_subject_departments(paging_data):
@@ -253,10 +254,11 @@ def create_subject_departments_by_auto_paging(subject_departments: List[Dict]) -
         params = paging_data
         _call_iam_api(http_post, url_path, data=params)
 
-    return execute_all_data_by_paging(create_paging_subject_departments, subject_departments, 1000)
+    # 新增不幂等，超时后请求可能已生效，不重试，失败的数据由调用方重放
+    return execute_all_data_by_paging(create_paging_subject_departments, subject_departments, 1000, max_retries=0)
 
 
-def update_subject_departments_by_auto_paging(subject_departments: List[Dict]) -> None:
+def update_subject_departments_by_auto_paging(subject_departments: List[Dict]) -> ChunkExecutionSummary:
     """通过自动分页批量更新subject的所有部门记录"""
 
     def update_paging_subject_departments(paging_data):
@@ -268,7 +270,7 @@ def update_subject_departments_by_auto_paging(subject_departments: List[Dict]) -
     return execute_all_data_by_paging(update_paging_subject_departments, subject_departments, 1000)
 
 
-def delete_subject_departments_by_auto_paging(subjects: List[str]) -> None:
+def delete_subject_departments_by_auto_paging(subjects: List[str]) -> ChunkExecutionSummary:
     """通过自动分页批量删除subject的所有部门记录"""
 
     def add_paging_subject_departments(paging_data):
@@ -308,7 +310,7 @@ def delete_subject_members(_type: str, id: str, members: List[dict]) -> Dict[str
     return _call_iam_api(http_delete, url_path, data=params)
 
 
-def delete_subject_members_by_auto_paging(_type: str, id: str, members: List[dict]) -> None:
+def delete_subject_members_by_auto_paging(_type: str, id: str, members: List[dict]) -> ChunkExecutionSummary:
     """通过自动分页批量删除subject的成员"""
 
     def delete_paging_subject_members(paging_data):
@@ -339,7 +341,9 @@ def add_subject_members(_type: str, id: str, policy_expired_at: int, members: Li
     return _call_iam_api(http_post, url_path, data=params)
 
 
-def add_subject_members_by_auto_paging(_type: str, id: str, policy_expired_at: int, members: List[dict]) -> None:
+def add_subject_members_by_auto_paging(
+    _type: str, id: str, policy_expired_at: int, members: List[dict]
+) -> ChunkExecutionSummary:
     """通过自动分页批量添加subject的成员"""
 
     def add_paging_subject_members(paging_data):
@@ -353,7 +357,8 @@ def add_subject_members_by_auto_paging(_type: str, id: str, policy_expired_at: i
         }
         _call_iam_api(http_post, url_path, data=params)
 
-    return execute_all_data_by_paging(add_paging_subject_members, members, 1000)
+    # 新增不幂等，超时后请求可能已生效，不重试，失败的数据由调用方重放
+    return execute_all_data_by_paging(add_paging_subject_members, members, 1000, max_retries=0)
 
 
 def list_system_policy(system_id: str, subject_type: str, subject_id: str, template_id: int = 0) -> List[Dict]:
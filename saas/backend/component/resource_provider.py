@@ -27,7 +27,8 @@ from backend.common.i18n import get_bk_language
 from backend.common.local import local
 from backend.util.cache import region
 
-request_pool = requests.Session()
+from .http import get_pooled_session
+
 logger = logging.getLogger("component")
 
 
@@ -122,7 +123,7 @@ class ResourceProviderClient:
 
         try:
             st = time.time()
-            resp = request_pool.request("post", **kwargs)
+            resp = get_pooled_session(self.url).request("post", **kwargs)
             # 接入系统可返回request_id便于排查，避免接入系统未使用权限中心请求头里的request_id而自行生成，所以需要再获取赋值
             self.request_id = resp.headers.get("X-Request-Id") or self.request_id
             latency = int((time.time() - st) * 1000)
@@ -9,15 +9,18 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 import datetime
-from typing import Dict, List, Tuple
+from typing import Dict, Iterator, List, Tuple
 
 from .esb import _call_esb_api
 from .http import http_get
-from .util import list_all_data_by_paging
+from .util import iter_all_data_by_paging, list_all_data_by_paging
 
 # 用户管理，分页的默认数量为1000（实际最大可支持2000）
 USERMGR_DEFAULT_PAGE_SIZE = 1000
 
+# 按更新时间查询时，每次请求携带的分钟数，避免请求参数过长
+USERMGR_UPDATE_TIME_LOOKUP_MINUTES = 30
+
 
 def list_category() -> List[Dict]:
     """获取目录列表"""
@@ -53,6 +56,42 @@ def list_new_user(end_utc_time: datetime.datetime, minute_delta: int = 0) -> Lis
     return data
 
 
+def _list_by_update_time(
+    url_path: str, fields: str, start_utc_time: datetime.datetime, end_utc_time: datetime.datetime
+) -> List[Dict]:
+    """按更新时间查询变更的数据，与list_new_user一样以分钟粒度模糊匹配，包括起止时间所在的分钟"""
+    update_time_fuzzy_lookups = []
+    t = start_utc_time.replace(second=0, microsecond=0)
+    while t <= end_utc_time:
+        update_time_fuzzy_lookups.append(t.strftime("%Y-%m-%d %H:%M"))
+        t += datetime.timedelta(minutes=1)
+
+    data = []
+    for i in range(0, len(update_time_fuzzy_lookups), USERMGR_UPDATE_TIME_LOOKUP_MINUTES):
+        params = {
+            "fields": fields,
+            "no_page": True,
+            "lookup_field": "update_time",
+            "fuzzy_lookups": ",".join(update_time_fuzzy_lookups[i : i + USERMGR_UPDATE_TIME_LOOKUP_MINUTES]),
+        }
+        data.extend(_call_esb_api(http_get, url_path, data=params))
+    return data
+
+
+def list_updated_profile(start_utc_time: datetime.datetime, end_utc_time: datetime.datetime) -> List[Dict]:
+    """查询时间段内新增或更新的用户"""
+    url_path = "/api/c/compapi/v2/usermanage/list_users/"
+    return _list_by_update_time(
+        url_path, "id,username,display_name,staff_status,category_id", start_utc_time, end_utc_time
+    )
+
+
+def list_updated_department(start_utc_time: datetime.datetime, end_utc_time: datetime.datetime) -> List[Dict]:
+    """查询时间段内新增或更新的部门"""
+    url_path = "/api/c/compapi/v2/usermanage/list_departments/"
+    return _list_by_update_time(url_path, "id,name,category_id,parent,order", start_utc_time, end_utc_time)
+
+
 def list_profile() -> List[Dict]:
     """获取用户列表"""
 
@@ -86,6 +125,11 @@ def list_department() -> List[Dict]:
 
 def list_department_profile() -> List[Dict]:
     """获取部门与用户关系列表"""
+    return list(iter_department_profile())
+
+
+def iter_department_profile() -> Iterator[Dict]:
+    """流式获取部门与用户关系"""
 
     def _list_paging_department_profile(page: int, page_size: int) -> Tuple[int, List[Dict]]:
         """[分页]获取部门与用户关系列表"""
@@ -94,11 +138,16 @@ def list_department_profile() -> List[Dict]:
         data = _call_esb_api(http_get, url_path, data=params)
         return data["count"], data["results"]
 
-    return list_all_data_by_paging(_list_paging_department_profile, USERMGR_DEFAULT_PAGE_SIZE)
+    return iter_all_data_by_paging(_list_paging_department_profile, USERMGR_DEFAULT_PAGE_SIZE)
 
 
 def list_profile_leader() -> List[Dict]:
     """获取用户Leader列表"""
+    return list(iter_profile_leader())
+
+
+def iter_profile_leader() -> Iterator[Dict]:
+    """流式获取用户Leader关系"""
 
     def _list_paging_profile_leader(page: int, page_size: int) -> Tuple[int, List[Dict]]:
         """[分页]获取用户Leader列表"""
@@ -107,4 +156,4 @@ def list_profile_leader() -> List[Dict]:
         data = _call_esb_api(http_get, url_path, data=params)
         return data["count"], data["results"]
 
-    return list_all_data_by_paging(_list_paging_profile_leader, USERMGR_DEFAULT_PAGE_SIZE)
+    return iter_all_data_by_paging(_list_paging_profile_leader, USERMGR_DEFAULT_PAGE_SIZE)
@@ -8,7 +8,19 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
-from typing import Any, Callable, Dict, List, Tuple
+import json
+import logging
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+import requests
+from django.conf import settings
+
+from backend.common.error_codes import CodeException, error_codes
+from backend.util.concurrency import iter_concurrently, map_concurrently
+
+logger = logging.getLogger("component")
 
 
 # TODO: 后续抽象成通用的公共函数，比如paging_func支持可变参数等，同时改成一个通用装饰器
@@ -16,30 +28,174 @@ def list_all_data_by_paging(
     paging_func: Callable[[int, int], Tuple[int, List[Dict]]], page_size: int = 1000
 ) -> List[Dict]:
     """获取所有数据通过循环分页"""
-    page = 1
+    return list(iter_all_data_by_paging(paging_func, page_size))
+
+
+def iter_all_data_by_paging(
+    paging_func: Callable[[int, int], Tuple[int, List[Dict]]], page_size: int = 1000, max_workers: Optional[int] = None
+) -> Iterator[Dict]:
+    """
+    流式获取所有数据，逐条产出，调用方可边获取边处理，无需将所有数据保存在内存里
+    第一页得到总数后，剩余的页以有界并发的方式预取，按页的顺序产出
+    """
+    if max_workers is None:
+        max_workers = settings.COMPONENT_PAGING_MAX_CONCURRENCY
+
     # 先第一次调用
-    total, results = paging_func(page, page_size)
-    # 返回的数据数量
-    result_count = len(results)
+    total, results = paging_func(1, page_size)
+    yield from results
     # 已获取的数据总数
-    count = result_count
-    # 已获得的数据
-    data = results
-    # 最大循环次数，避免死循环
+    count = len(results)
+    # 返回数据数量小于page_size或已获取的总数不小于total，则没有下一页
+    if len(results) < page_size or count >= total:
+        return
+
+    # 剩余的页数，最大页数与总数相关，避免死循环
     maximum = int(total / page_size + 1)
-    # 返回数据数量等于page_size且已获取的总数小于total
-    while result_count == page_size and count < total and page <= maximum:
-        page += 1
-        _, results = paging_func(page, page_size)
-        result_count = len(results)
-        count += result_count
-        data.extend(results)
-    return data
+    pages = range(2, min((total + page_size - 1) // page_size, maximum) + 1)
+    for results in iter_concurrently(lambda page: paging_func(page, page_size)[1], pages, max_workers):
+        yield from results
+        count += len(results)
+        # 与串行分页一致，分页过程中数据减少导致某页不满时，则提前结束
+        if len(results) < page_size or count >= total:
+            return
+
+
+class ChunkResult:
+    """单个分块的执行结果，失败时保留分块数据，可用于重放"""
+
+    def __init__(self, data: List[Any], attempts: int, error: Optional[Exception] = None):
+        self.data = data
+        # 该分块数据总共被执行的次数(包括拆分前所在分块的执行)
+        self.attempts = attempts
+        self.error = error
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
+
+
+class ChunkExecutionSummary:
+    """所有分块的执行结果"""
+
+    def __init__(self, results: List[ChunkResult]):
+        self.results = results
+
+    @property
+    def failed_results(self) -> List[ChunkResult]:
+        return [r for r in self.results if not r.success]
+
+    @property
+    def failed_data(self) -> List[Any]:
+        """所有失败分块的数据，重放时直接使用"""
+        return [i for r in self.failed_results for i in r.data]
+
+    def raise_first_error(self):
+        """有分块最终失败时，抛出第一个失败分块的异常"""
+        failed_results = self.failed_results
+        if failed_results:
+            error = failed_results[0].error
+            assert error is not None
+            raise error
+
+    def __str__(self):
+        failed_results = self.failed_results
+        return (
+            f"chunks: {len(self.results)}, failed chunks: {len(failed_results)}, "
+            f"failed items: {sum(len(r.data) for r in failed_results)}, "
+            f"first error: {repr(failed_results[0].error) if failed_results else None}"
+        )
 
 
 def execute_all_data_by_paging(
-    paging_func: Callable[[List[Any]], None], data: List[Any], page_size: int = 1000
-) -> None:
-    """通过分页数据的方式循环执行调用"""
-    for i in range(0, len(data), page_size):
-        paging_func(data[i : i + page_size])
+    paging_func: Callable[[List[Any]], None],
+    data: List[Any],
+    page_size: int = 1000,
+    max_retries: Optional[int] = None,
+) -> ChunkExecutionSummary:
+    """
+    通过分页数据的方式执行调用，分块并发执行并失败重试，返回每个分块的执行结果
+    有分块最终失败时记录失败的数据，调用方根据返回的执行结果重放失败的数据或抛出异常
+
+    max_retries: 不幂等的调用(比如新增)超时后请求可能已生效，重试会重复执行，需设置为0
+    """
+    summary = execute_all_data_by_chunks(paging_func, data, page_size, max_retries=max_retries)
+    if summary.failed_results:
+        logger.error(
+            "execute_all_data_by_paging %s failed: %s, failed data: %s",
+            paging_func.__name__,
+            summary,
+            json.dumps(summary.failed_data),
+        )
+    return summary
+
+
+def execute_all_data_by_chunks(
+    chunk_func: Callable[[List[Any]], None],
+    data: List[Any],
+    chunk_size: int = 1000,
+    max_workers: Optional[int] = None,
+    max_retries: Optional[int] = None,
+    key_func: Optional[Callable[[Any], Hashable]] = None,
+) -> ChunkExecutionSummary:
+    """
+    分块并发执行，返回每个分块的执行结果
+    每个分块失败后退避重试，重试时将分块对半拆分，以适应后端单次请求量的限制，同时将出错的数据隔离到更小的分块里
+    只有临时错误(网络错误、超时、5xx等)才重试，IAM后台返回码非0(参数校验等)的错误重试也不会成功，直接失败
+
+    key_func: 对数据分组，每个分块只包含同一组的数据，用于后台接口只支持单个对象的场景(比如按用户组更新成员)
+    """
+    if max_workers is None:
+        max_workers = settings.COMPONENT_CHUNK_MAX_CONCURRENCY
+    if max_retries is None:
+        max_retries = settings.COMPONENT_CHUNK_MAX_RETRIES
+
+    groups: List[List[Any]] = [data]
+    if key_func is not None:
+        key_data: Dict[Hashable, List[Any]] = defaultdict(list)
+        for item in data:
+            key_data[key_func(item)].append(item)
+        groups = list(key_data.values())
+
+    chunks = [items[i : i + chunk_size] for items in groups for i in range(0, len(items), chunk_size)]
+    chunk_results = map_concurrently(lambda chunk: _execute_chunk(chunk_func, chunk, max_retries), chunks, max_workers)
+    return ChunkExecutionSummary([r for results in chunk_results for r in results])
+
+
+def _is_transient_error(error: Exception) -> bool:
+    """
+    是否为重试可能成功的临时错误
+    """
+    # 请求第三方API错误: 网络错误、超时、非200响应等
+    if isinstance(error, CodeException):
+        return error.code == error_codes.REMOTE_REQUEST_ERROR.code
+
+    if isinstance(error, (requests.exceptions.Timeout, requests.exceptions.ConnectionError)):
+        return True
+
+    if isinstance(error, requests.exceptions.HTTPError):
+        return error.response is not None and error.response.status_code >= 500
+
+    return False
+
+
+def _execute_chunk(
+    chunk_func: Callable[[List[Any]], None], chunk: List[Any], retries: int, attempts: int = 1
+) -> List[ChunkResult]:
+    try:
+        chunk_func(chunk)
+        return [ChunkResult(chunk, attempts)]
+    except Exception as error:  # pylint: disable=broad-except
+        if retries <= 0 or not _is_transient_error(error):
+            logger.exception("execute chunk of %d items failed after %d attempts", len(chunk), attempts)
+            return [ChunkResult(chunk, attempts, error)]
+
+    # 指数退避
+    time.sleep(settings.COMPONENT_CHUNK_RETRY_BACKOFF * 2 ** (attempts - 1))
+    if len(chunk) == 1:
+        return _execute_chunk(chunk_func, chunk, retries - 1, attempts + 1)
+
+    middle = len(chunk) // 2
+    return _execute_chunk(chunk_func, chunk[:middle], retries - 1, attempts + 1) + _execute_chunk(
+        chunk_func, chunk[middle:], retries - 1, attempts + 1
+    )
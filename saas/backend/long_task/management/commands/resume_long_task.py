@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.common.error_codes import CodeException
+from backend.long_task.constants import TaskStatus
+from backend.long_task.models import TaskDetail
+from backend.long_task.task import TaskFactory
+
+
+class Command(BaseCommand):
+    help = "resume failed, canceled or stale running long tasks, the finished chunks will not be executed again"
+
+    def add_arguments(self, parser):
+        parser.add_argument("-t", action="store", dest="task_ids", help="task ids, separated by commas")
+        parser.add_argument(
+            "--stale", action="store_true", dest="stale", help="resume all running tasks which have no progress"
+        )
+
+    def handle(self, *args, **options):
+        if options["task_ids"]:
+            task_ids = [int(i) for i in options["task_ids"].split(",") if i.strip()]
+            tasks = list(TaskDetail.objects.filter(id__in=task_ids))
+        elif options["stale"]:
+            tasks = [
+                t
+                for t in TaskDetail.objects.filter(status=TaskStatus.RUNNING.value)  # type: ignore[attr-defined]
+                if t.is_stale()
+            ]
+        else:
+            raise CommandError("one of -t or --stale is required")
+
+        for task in tasks:
+            try:
+                task.resume()
+            except CodeException as e:
+                self.stderr.write(f"resume long task({task.id}) fail: {e.message}")
+                continue
+
+            TaskFactory().delay(task.id)
+            self.stdout.write(self.style.SUCCESS(f"resume long task({task.id}) success"))
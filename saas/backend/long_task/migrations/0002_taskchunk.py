@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+# Generated by Django 2.2.24 on 2026-10-18 18:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('long_task', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskChunk',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_id', models.IntegerField(verbose_name='父亲任务id')),
+                ('index', models.IntegerField(verbose_name='分块索引')),
+                ('start', models.IntegerField(verbose_name='分块第一个参数在所有参数中的索引')),
+                ('_params', models.TextField(db_column='params', verbose_name='分块参数集')),
+                ('status', models.IntegerField(choices=[(0, '未开始'), (1, '运行中'), (2, '成功'), (3, '失败'), (4, '取消')], default=0, verbose_name='分块状态')),
+                ('celery_id', models.CharField(default='', max_length=36, verbose_name='celery任务id')),
+            ],
+            options={
+                'verbose_name': '子任务分块',
+                'verbose_name_plural': '子任务分块',
+                'ordering': ['index'],
+                'unique_together': {('task_id', 'index')},
+            },
+        ),
+    ]
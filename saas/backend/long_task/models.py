@@ -9,10 +9,13 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 import json
+from datetime import datetime, timedelta
 from typing import Any, List
 
+from django.conf import settings
 from django.core.cache import cache
 from django.db import models
+from django.utils import timezone
 
 from backend.common.error_codes import error_codes
 from backend.common.models import BaseModel
@@ -22,6 +25,13 @@ from .constants import TaskStatus
 EXISTS_TASK_ERROR = error_codes.INVALID_ARGS.format("已存在未完成的相同任务")
 
 
+def get_stale_deadline() -> datetime:
+    """
+    运行中的任务/分块, 最近活动时间早于该时间的, 认为执行的worker已异常退出
+    """
+    return timezone.now() - timedelta(seconds=settings.LONG_TASK_STALE_TIMEOUT)
+
+
 class TaskDetail(BaseModel):
     """
     长时任务
@@ -107,6 +117,39 @@ class TaskDetail(BaseModel):
             self.status = TaskStatus.CANCEL.value
             self.save(update_fields=["status"])
 
+    def is_stale(self) -> bool:
+        """
+        运行中的任务长时间没有进展(任务与所有分块都没有活动), 一般是执行的worker异常退出
+        """
+        if self.status != TaskStatus.RUNNING.value:  # type: ignore[attr-defined]
+            return False
+
+        deadline = get_stale_deadline()
+        if self.updated_time >= deadline:
+            return False
+
+        return not TaskChunk.objects.filter(task_id=self.id, updated_time__gte=deadline).exists()
+
+    def resume(self):
+        """
+        失败、取消或运行超时(is_stale)的任务重新执行, 已成功执行的参数不会重复执行
+
+        与create一致, 需要调用方在事务完成后执行TaskFactory().delay(task.id)
+        """
+        if self.status not in [TaskStatus.FAILURE.value, TaskStatus.CANCEL.value] and not self.is_stale():
+            raise error_codes.INVALID_ARGS.format("只有失败、取消或运行超时的任务可以重新执行")
+
+        if (
+            self.unique_sign
+            and TaskDetail.objects.filter(unique_sign=self.unique_sign, status__lte=TaskStatus.RUNNING.value)
+            .exclude(id=self.id)
+            .exists()
+        ):
+            raise EXISTS_TASK_ERROR
+
+        self.status = TaskStatus.PENDING.value
+        self.save(update_fields=["status"])
+
 
 class SubTaskState(models.Model):
     task_id = models.IntegerField("父亲任务id")
@@ -121,3 +164,36 @@ class SubTaskState(models.Model):
         verbose_name = "子任务状态"
         verbose_name_plural = "子任务状态"
         ordering = ["index"]
+
+
+class TaskChunk(models.Model):
+    """
+    长时任务的子任务参数分块, 每个分块由一个celery任务执行, 分块的状态用于任务的断点恢复
+    """
+
+    task_id = models.IntegerField("父亲任务id")
+    index = models.IntegerField("分块索引")
+    start = models.IntegerField("分块第一个参数在所有参数中的索引")
+    _params = models.TextField("分块参数集", db_column="params")  # List[Any]
+    status = models.IntegerField(
+        "分块状态", choices=TaskStatus.get_choices(), default=TaskStatus.PENDING.value  # type: ignore[attr-defined]
+    )
+    celery_id = models.CharField("celery任务id", max_length=36, default="")
+    # 分块状态变更与执行中每个参数执行完都会更新, 用于判断运行中的分块是否已失去执行的worker
+    updated_time = models.DateTimeField("最近活动时间", auto_now=True)
+    # 分块执行失败时记录未成功执行的参数索引, 重新执行时只执行这些参数, 为空时执行分块的所有参数
+    _pending_indexes = models.TextField("待执行的参数索引", db_column="pending_indexes", default="")  # List[int]
+
+    class Meta:
+        verbose_name = "子任务分块"
+        verbose_name_plural = "子任务分块"
+        ordering = ["index"]
+        unique_together = ["task_id", "index"]
+
+    @property
+    def params(self):
+        return json.loads(self._params)
+
+    @property
+    def pending_indexes(self) -> List[int]:
+        return json.loads(self._pending_indexes) if self._pending_indexes else []
@@ -15,13 +15,16 @@ import sys
 import time
 import traceback
 from abc import ABCMeta, abstractmethod
-from typing import Any, Dict, List, Type
+from typing import Any, Dict, List, Optional, Type
 
 from celery import Task
-from django.db.models import Max
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from backend.util.basic import chunked
 
 from .constants import TaskStatus
-from .models import SubTaskState, TaskDetail
+from .models import SubTaskState, TaskChunk, TaskDetail, get_stale_deadline
 
 logger = logging.getLogger("celery")
 
@@ -35,6 +38,9 @@ class StepTask(metaclass=ABCMeta):
     retry = 1  # 单步任务执行失败, 重试的次数
     break_ = False  # 单步任务失败是否中断整个任务
 
+    chunk_size = 1  # 每个celery子任务执行的参数数量
+    parallelism = 1  # 同时执行的celery子任务数量, 大于1时需要保证各个参数的执行互不影响
+
     @abstractmethod
     def __init__(self, *args):
         """
@@ -112,12 +118,22 @@ class ResultStore:
     def clear(self):
         SubTaskState.objects.filter(task_id=self._task_id).delete()
 
+    def clear_indexes(self, indexes: List[int]):
+        """清理指定参数的子任务结果, 用于分块重新执行"""
+        SubTaskState.objects.filter(task_id=self._task_id, index__in=indexes).delete()
+
     def next_index(self):
         q = SubTaskState.objects.filter(task_id=self._task_id).aggregate(Max("index"))
         return 0 if q["index__max"] is None else q["index__max"] + 1
 
 
 class SubTask(Task):
+    """
+    逐个参数执行子任务, 参数存储在TaskDetail._params里
+
+    Note: 新任务都由ChunkTask执行, 保留该任务用于执行升级前已发起的任务
+    """
+
     def run(self, id: int):
         # 查询任务
         task_detail = TaskDetail.objects.get(pk=id)
@@ -184,6 +200,163 @@ class SubTask(Task):
         ResultStore(task.id).clear()
 
 
+class ChunkTask(Task):
+    """
+    分块执行子任务: 每次领取一个未执行的分块执行, 执行完后流转下一个分块
+
+    TaskFactory会同时发起handler.parallelism个ChunkTask, 所有分块执行完成后, 由最后完成的ChunkTask结束任务
+    """
+
+    def run(self, id: int):
+        # 查询任务
+        task_detail = TaskDetail.objects.get(pk=id)
+
+        # 如果任务的状态不为running(取消或其他子任务已失败), 则保存结果, 退出任务
+        if task_detail.status != TaskStatus.RUNNING.value:  # type: ignore[attr-defined]
+            _save_results(task_detail, task_detail.status)
+            return
+
+        handler = task_type_mapping[task_detail.type](*task_detail.args)
+
+        chunk = self._claim_chunk(id)
+        if chunk is None:
+            self._finish(task_detail, handler)
+            return
+
+        self._run_chunk(id, chunk, handler)
+
+        # 流转下一个分块
+        ChunkTask().delay(id)
+
+    def _claim_chunk(self, id: int) -> Optional[TaskChunk]:
+        """
+        领取一个未执行的分块, 多个ChunkTask并发时通过状态条件更新避免重复领取
+
+        运行中但长时间没有活动的分块(执行的worker已异常退出)也会被重新领取, 避免任务永远无法结束
+        """
+        while True:
+            claimable = Q(status=TaskStatus.PENDING.value) | Q(  # type: ignore[attr-defined]
+                status=TaskStatus.RUNNING.value, updated_time__lt=get_stale_deadline()  # type: ignore[attr-defined]
+            )
+            chunk = TaskChunk.objects.filter(claimable, task_id=id).order_by("index").first()
+            if chunk is None:
+                return None
+
+            # 领取时更新了活动时间, 并发领取同一个超时分块时, 只有一个能更新成功
+            claimed = TaskChunk.objects.filter(claimable, id=chunk.id).update(
+                status=TaskStatus.RUNNING.value,  # type: ignore[attr-defined]
+                celery_id=self.request.id or "",
+                updated_time=timezone.now(),
+            )
+            if claimed:
+                if chunk.status == TaskStatus.RUNNING.value:  # type: ignore[attr-defined]
+                    logger.warning("long task {} chunk {} is stale, claim it again".format(id, chunk.index))
+                return chunk
+
+    def _run_chunk(self, id: int, chunk: TaskChunk, handler: StepTask):
+        params = chunk.params
+        # 失败后重新执行的分块只执行上次未成功的参数
+        indexes = chunk.pending_indexes or list(range(chunk.start, chunk.start + len(params)))
+        store = ResultStore(id)
+        # 分块可能是中断后重新执行的, 需要清理上次的结果
+        store.clear_indexes(indexes)
+
+        retry_run = Retry(handler.run, handler.retry)
+        celery_id = self.request.id or ""
+
+        failed_indexes = []
+        for position, index in enumerate(indexes):
+            param = params[index - chunk.start]
+            store.create(celery_id, index)
+            try:
+                retry_run(param)
+
+                store.update(index, TaskStatus.SUCCESS.value)  # type: ignore[attr-defined]
+
+                logger.debug("long task {} sub task item: {} execute success".format(id, param))
+            except Exception:  # pylint: disable=broad-except
+                store.update(
+                    index,
+                    TaskStatus.FAILURE.value,  # type: ignore[attr-defined]
+                    traceback.format_exc(),
+                )
+
+                logger.warning(
+                    "long task {} sub task item: {} execute fail".format(id, param), exc_info=sys.exc_info()
+                )
+
+                failed_indexes.append(index)
+                # 子任务失败, 直接失败, 重新执行任务时从失败的参数开始
+                if handler.break_:
+                    self._fail_chunk(chunk, failed_indexes + indexes[position + 1 :])
+                    raise
+
+            # 心跳: 分块执行中的进展, 避免执行时间较长的分块被当作超时重新领取
+            TaskChunk.objects.filter(id=chunk.id).update(updated_time=timezone.now())
+
+        # 失败的参数不中断任务, 其他分块继续执行, 任务最终失败, 重新执行任务时只执行失败的参数
+        if failed_indexes:
+            self._fail_chunk(chunk, failed_indexes)
+            return
+
+        TaskChunk.objects.filter(id=chunk.id).update(
+            status=TaskStatus.SUCCESS.value,  # type: ignore[attr-defined]
+            _pending_indexes="",
+            updated_time=timezone.now(),
+        )
+
+    def _fail_chunk(self, chunk: TaskChunk, pending_indexes: List[int]):
+        TaskChunk.objects.filter(id=chunk.id).update(
+            status=TaskStatus.FAILURE.value,  # type: ignore[attr-defined]
+            _pending_indexes=json.dumps(pending_indexes),
+            updated_time=timezone.now(),
+        )
+
+    def _finish(self, task_detail: TaskDetail, handler: StepTask):
+        chunk_statuses = set(TaskChunk.objects.filter(task_id=task_detail.id).values_list("status", flat=True))
+        # 其他ChunkTask还有分块在执行, 由最后完成的ChunkTask结束任务
+        if chunk_statuses - {TaskStatus.SUCCESS.value, TaskStatus.FAILURE.value}:  # type: ignore[attr-defined]
+            return
+
+        # 有分块执行失败时任务失败, 不执行on_success, 重新执行成功后再执行
+        status = (
+            TaskStatus.FAILURE.value  # type: ignore[attr-defined]
+            if TaskStatus.FAILURE.value in chunk_statuses  # type: ignore[attr-defined]
+            else TaskStatus.SUCCESS.value  # type: ignore[attr-defined]
+        )
+
+        # 并发时只有一个ChunkTask能结束任务
+        finished = TaskDetail.objects.filter(
+            id=task_detail.id, status=TaskStatus.RUNNING.value  # type: ignore[attr-defined]
+        ).update(status=status)
+        if not finished:
+            return
+
+        if status == TaskStatus.SUCCESS.value:  # type: ignore[attr-defined]
+            try:
+                handler.on_success()
+            except Exception:  # pylint: disable=broad-except
+                logger.warning("long task {} handler on_success fail".format(task_detail.id), exc_info=sys.exc_info())
+        _save_results(task_detail, status)
+
+    def on_failure(self, exc, task_id, args, kwargs, einfo):
+        task_detail = TaskDetail.objects.get(pk=args[0])
+        _save_results(task_detail, TaskStatus.FAILURE.value)  # type: ignore[attr-defined]
+
+
+def _save_results(task: TaskDetail, status: int):
+    """
+    保存子任务结果, 重新执行的任务, 同一个参数以最后一次执行的结果为准
+    """
+    results = {r["index"]: r for r in task.results}
+    # task.results只有运行中的任务才会查询实时结果
+    results.update({r["index"]: r for r in ResultStore(task.id).list()})
+    TaskDetail.objects.filter(id=task.id).update(
+        status=status, _results=json.dumps([results[i] for i in sorted(results)])
+    )
+    ResultStore(task.id).clear()
+
+
 class TaskFactory(Task):
     def run(self, id: int):
         # 查询任务
@@ -199,16 +372,39 @@ class TaskFactory(Task):
 
         handler = handler_class(*args)
 
-        params = handler.get_params()
-
-        celery_id = self.request.id
+        if TaskChunk.objects.filter(task_id=id).exists():
+            # 重新执行的任务: 已完成的分块不再执行, 仍在其他worker上正常运行的分块也不能重新执行
+            TaskChunk.objects.filter(task_id=id).exclude(
+                status=TaskStatus.SUCCESS.value  # type: ignore[attr-defined]
+            ).exclude(
+                status=TaskStatus.RUNNING.value, updated_time__gte=get_stale_deadline()  # type: ignore[attr-defined]
+            ).update(
+                status=TaskStatus.PENDING.value,  # type: ignore[attr-defined]
+                celery_id="",
+                updated_time=timezone.now(),
+            )
+        else:
+            # 参数按分块存储, 避免每个子任务都解析全部参数
+            params = handler.get_params()
+            chunk_size = max(handler.chunk_size, 1)
+            TaskChunk.objects.bulk_create(
+                [
+                    TaskChunk(task_id=id, index=index, start=index * chunk_size, _params=json.dumps(chunk_params))
+                    for index, chunk_params in enumerate(chunked(params, chunk_size))
+                ],
+                batch_size=100,
+            )
+
+        celery_id = self.request.id or ""
         TaskDetail.objects.filter(pk=id).update(
             celery_id=celery_id,
             status=TaskStatus.RUNNING.value,  # type: ignore[attr-defined]
-            _params=json.dumps(params),
+            updated_time=timezone.now(),
         )
 
-        SubTask().delay(id)
+        # 至少发起一个ChunkTask, 没有分块时由其结束任务
+        for _ in range(max(handler.parallelism, 1)):
+            ChunkTask().delay(id)
 
 
 def register_handler(_type: str):
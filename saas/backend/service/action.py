@@ -13,7 +13,7 @@ from typing import List, Optional
 from pydantic import parse_obj_as
 
 from backend.component import iam
-from backend.util.cache import region
+from backend.util.cache import cache_on_system_model_version
 
 from .models import Action
 
@@ -35,7 +35,7 @@ class ActionService:
 
     full_fields = "id,name,name_en,related_resource_types,version,type,description,description_en,related_actions"
 
-    @region.cache_on_arguments(expiration_time=60)
+    @cache_on_system_model_version(expiration_time=5 * 60)  # 5分钟过期
     def list(self, system_id: str) -> List[Action]:
         """获取系统的Action列表"""
         actions = iam.list_action(system_id, fields=self.full_fields)
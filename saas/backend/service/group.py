@@ -9,8 +9,10 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 import logging
-from typing import List, Tuple
+from operator import itemgetter
+from typing import Dict, List, Tuple
 
+from django.conf import settings
 from django.db import transaction
 from django.db.models import F
 from pydantic import BaseModel, parse_obj_as
@@ -18,6 +20,8 @@ from pydantic import BaseModel, parse_obj_as
 from backend.apps.group.models import Group
 from backend.apps.organization.models import Department, DepartmentMember, User
 from backend.component import iam
+from backend.component.util import execute_all_data_by_chunks
+from backend.util.concurrency import map_concurrently
 
 from .constants import SubjectType
 from .models import Subject
@@ -139,22 +143,29 @@ class GroupService:
         """
         查询user的部门递归的Group
         """
-        relations = []
         user = User.objects.get(username=user_id)
         # 查询用户直接加入的部门
         department_ids = DepartmentMember.objects.filter(user_id=user.id).values_list("department_id", flat=True)
-        department_set = set()
-        for department in Department.objects.filter(id__in=department_ids):
-            # 查询部门继承的所有部门
-            for ancestor in department.get_ancestors(include_self=True):
-                if ancestor.id in department_set:
-                    continue
-                department_set.add(ancestor.id)
-                iam_data = iam.get_subject_relation("department", str(ancestor.id))
-                dep_relations = [
-                    SubjectGroup(department_id=ancestor.id, department_name=ancestor.name, **one) for one in iam_data
-                ]
-                relations.extend(dep_relations)
+
+        # 通过冗余的祖先字段获取部门继承的所有部门, 去重后再查询, 保持祖先在前的顺序
+        department_names: Dict[int, str] = {}
+        for department in Department.objects.filter(id__in=department_ids).only("id", "name", "ancestors"):
+            for ancestor in department.parse_ancestors():
+                department_names.setdefault(ancestor["id"], ancestor["name"])
+            department_names.setdefault(department.id, department.name)
+
+        departments = list(department_names.items())
+        iam_data_list = map_concurrently(
+            lambda d: iam.get_subject_relation(SubjectType.DEPARTMENT.value, str(d[0])),
+            departments,
+            max_workers=settings.IAM_BACKEND_MAX_CONCURRENCY,
+        )
+
+        relations: List[SubjectGroup] = []
+        for (department_id, department_name), iam_data in zip(departments, iam_data_list):
+            relations.extend(
+                SubjectGroup(department_id=department_id, department_name=department_name, **one) for one in iam_data
+            )
         return relations
 
     def list_subject_group_before_expired_at(self, subject: Subject, expired_at: int) -> List[SubjectGroup]:
@@ -201,22 +212,36 @@ class GroupService:
         """
         subject group 续期
         """
-        for group_id in group_ids:
-            iam.update_subject_members_expired_at(
-                SubjectType.GROUP.value,
-                str(group_id),
-                [subject_expired_at.dict()],
-            )
+        self.update_groups_members_expired_at({group_id: [subject_expired_at] for group_id in group_ids})
 
     def update_members_expired_at(self, group_id: int, members: List[GroupMemberExpiredAt]):
         """
         更新用户组成员的过期时间
         """
-        iam.update_subject_members_expired_at(
-            SubjectType.GROUP.value,
-            str(group_id),
-            [one.dict() for one in members],
+        self.update_groups_members_expired_at({group_id: members})
+
+    def update_groups_members_expired_at(self, group_members: Dict[int, List[GroupMemberExpiredAt]]):
+        """
+        批量更新多个用户组成员的过期时间
+        后台只支持按单个用户组更新，所以按用户组分块后，有界并发请求后台，失败的分块重试，最终失败时抛出第一个异常
+        """
+
+        def update_chunk(chunk: List[Tuple[int, GroupMemberExpiredAt]]):
+            # 同一分块的成员属于同一个用户组
+            iam.update_subject_members_expired_at(
+                SubjectType.GROUP.value, str(chunk[0][0]), [member.dict() for _, member in chunk]
+            )
+
+        summary = execute_all_data_by_chunks(
+            update_chunk,
+            [(group_id, member) for group_id, members in group_members.items() for member in members],
+            chunk_size=1000,
+            max_workers=settings.IAM_BACKEND_MAX_CONCURRENCY,
+            key_func=itemgetter(0),
         )
+        if summary.failed_results:
+            logger.error("update groups members expired_at failed: %s", summary)
+            summary.raise_first_error()
 
     def list_paging_group_member(self, group_id: int, limit: int, offset: int) -> Tuple[int, List[SubjectGroup]]:
         """分页查询用户组成员"""
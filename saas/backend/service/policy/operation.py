@@ -10,6 +10,7 @@ specific language governing permissions and limitations under the License.
 """
 from typing import List, Optional
 
+from django.conf import settings
 from django.db import transaction
 
 from backend.apps.policy.models import Policy as PolicyModel
@@ -96,13 +97,18 @@ class PolicyOperationService:
             subject_id=subject.id, subject_type=subject.type, system_id=system_id, policy_id__in=policy_list.ids
         ).only("id", "action_id")
 
-        # 使用主键更新, 避免死锁
+        updated_db_policies = []
         for p in db_policies:
             update_policy = policy_list.get(p.action_id)
             if not update_policy:
                 continue
-            PolicyModel.objects.filter(id=p.id).update(
-                _resources=json_dumps([rt.dict() for rt in update_policy.related_resource_types])
+            p._resources = json_dumps([rt.dict() for rt in update_policy.related_resource_types])
+            updated_db_policies.append(p)
+
+        # 使用主键批量更新(UPDATE ... CASE id WHEN ...), 避免死锁, 同时减少事务内的DB请求次数
+        if updated_db_policies:
+            PolicyModel.objects.bulk_update(
+                updated_db_policies, fields=["_resources"], batch_size=settings.POLICY_BULK_UPDATE_BATCH_SIZE
             )
 
     def _delete_db_policies(self, system_id: str, subject: Subject, policy_ids: List[int]):
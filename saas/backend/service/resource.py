@@ -11,11 +11,13 @@ specific language governing permissions and limitations under the License.
 import logging
 from typing import Dict, List, Optional, Tuple
 
+from django.conf import settings
 from redis.exceptions import RedisError
 
 from backend.component import iam, resource_provider
 from backend.util.basic import chunked
 from backend.util.cache import redis_region, region
+from backend.util.concurrency import map_concurrently
 
 from .models import (
     ResourceAttribute,
@@ -208,12 +210,17 @@ class ResourceProvider:
         """批量查询资源实例属性，包括display_name等"""
         # fetch_instance_info 接口的批量限制
         fetch_limit = 1000
-        # 分页查询资源实例属性
+
+        # 分页查询资源实例属性，多页时并发查询，并发数不超过单个接入系统的限制；已在并发的工作线程内(比如按资源类型并发)时串行查询
+        def fetch_page(page_ids: List[str]) -> List[Dict]:
+            filter_condition = {"ids": page_ids, "attrs": attributes} if attributes else {"ids": page_ids}
+            return self.client.fetch_instance_info(filter_condition)
+
         results = []
         page_ids_list = chunked(ids, fetch_limit)
-        for page_ids in page_ids_list:
-            filter_condition = {"ids": page_ids, "attrs": attributes} if attributes else {"ids": page_ids}
-            page_results = self.client.fetch_instance_info(filter_condition)
+        for page_results in map_concurrently(
+            fetch_page, page_ids_list, max_workers=settings.RESOURCE_PROVIDER_SYSTEM_MAX_CONCURRENCY
+        ):
             results.extend(page_results)
 
         # Dict转为struct
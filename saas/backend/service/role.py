@@ -10,9 +10,11 @@ specific language governing permissions and limitations under the License.
 """
 import json
 import logging
-from typing import List
+from typing import Any, Dict, List, Optional
 
+from django.conf import settings
 from django.db import transaction
+from django.db.models import F
 from django.utils.translation import gettext as _
 from pydantic import BaseModel, parse_obj_as
 
@@ -28,6 +30,7 @@ from backend.apps.role.models import (
 from backend.apps.template.models import PermTemplate, PermTemplatePolicyAuthorized
 from backend.common.error_codes import error_codes
 from backend.component import iam
+from backend.util.cache import LocalLRUCache
 from backend.util.json import json_dumps
 
 from .constants import RoleRelatedObjectType, RoleScopeType, RoleSourceTypeEnum, RoleType, SubjectType
@@ -73,22 +76,82 @@ class CommonAction(BaseModel):
     action_ids: List[str]
 
 
+class RoleScopeCache:
+    """
+    角色限制范围解析结果的缓存(进程内), key为(role_id, 限制类型, 限制内容版本号)
+
+    分级管理员的授权范围可能很大, 每次都json.loads + parse_obj_as开销较大,
+    修改限制内容时递增RoleScope.version, 这样只需查询版本号即可判断缓存是否可用
+    授权范围会同时缓存按系统索引的操作, 用于快速判断操作是否在范围内
+    """
+
+    def __init__(self):
+        self._cache = LocalLRUCache(maxsize=settings.ROLE_SCOPE_CACHE_MAXSIZE)
+
+    def get(self, role_id: int, scope_type: str) -> Optional[Dict[str, Any]]:
+        """
+        返回解析后的限制范围, 角色没有对应的限制范围时返回None
+        Note: 返回的数据为缓存共享, 调用方不能修改
+        """
+        role_scope = RoleScope.objects.filter(role_id=role_id, type=scope_type).only("id", "version").first()
+        if not role_scope:
+            return None
+
+        key = (role_id, scope_type, role_scope.version)
+        parsed = self._cache.get(key)
+        if parsed is None:
+            content = RoleScope.objects.filter(id=role_scope.id).values_list("content", flat=True).first()
+            parsed = self._parse(scope_type, content or "[]")
+            self._cache.set(key, parsed)
+
+        return parsed
+
+    def _parse(self, scope_type: str, content: str) -> Dict[str, Any]:
+        if scope_type == RoleScopeType.SUBJECT.value:
+            return {"subjects": parse_obj_as(List[Subject], json.loads(content))}
+
+        systems = parse_obj_as(List[AuthScopeSystem], json.loads(content))
+        return {
+            "systems": systems,
+            "system_actions": {s.system_id: {a.id: a for a in s.actions} for s in systems},
+        }
+
+    def stats(self) -> Dict[str, int]:
+        return self._cache.stats()
+
+
+role_scope_cache = RoleScopeCache()
+
+
 class RoleService:
     def list_subject_scope(self, role_id: int) -> List[Subject]:
         """查询role的subject授权范围"""
-        role_scope = RoleScope.objects.filter(role_id=role_id, type=RoleScopeType.SUBJECT.value).first()
-        if not role_scope:
+        parsed = role_scope_cache.get(role_id, RoleScopeType.SUBJECT.value)
+        if not parsed:
             return []
 
-        return parse_obj_as(List[Subject], json.loads(role_scope.content))
+        # 返回新列表, 避免调用方修改缓存
+        return list(parsed["subjects"])
 
     def list_auth_scope(self, role_id: int) -> List[AuthScopeSystem]:
         """查询role的policy授权范围"""
-        role_scope = RoleScope.objects.filter(role_id=role_id, type=RoleScopeType.AUTHORIZATION.value).first()
-        if not role_scope:
+        parsed = role_scope_cache.get(role_id, RoleScopeType.AUTHORIZATION.value)
+        if not parsed:
             return []
 
-        return parse_obj_as(List[AuthScopeSystem], json.loads(role_scope.content))
+        # 返回新列表, 避免调用方修改缓存
+        return list(parsed["systems"])
+
+    def get_auth_scope_system_actions(self, role_id: int) -> Dict[str, Dict[str, AuthScopeAction]]:
+        """
+        查询role的policy授权范围, 按系统索引操作: {system_id: {action_id: action}}
+        Note: 返回的数据为缓存共享, 只读
+        """
+        parsed = role_scope_cache.get(role_id, RoleScopeType.AUTHORIZATION.value)
+        if not parsed:
+            return {}
+
+        return parsed["system_actions"]
 
     def list_user_role(self, user_id: str) -> List[UserRole]:
         """查询用户的角色列表"""
@@ -171,6 +234,8 @@ class RoleService:
             if not partial:
                 self._update_role_scope(role.id, info.subject_scopes, info.authorization_scopes)
 
+            RoleUser.objects.invalidate_role(role.id)
+
     def _update_members(self, role: Role, members: List[str], need_sync_backend_role: bool = False):
         """更新Role成员"""
         role_id = role.id
@@ -183,6 +248,7 @@ class RoleService:
             RoleUser.objects.filter(role_id=role_id).delete()
             # 重新全部添加
             self._add_members(role_id, new_members)
+            RoleUser.objects.invalidate_role(role_id)
 
         # 同步后端的role信息
         if need_sync_backend_role:
@@ -222,14 +288,14 @@ class RoleService:
     def update_role_auth_scope(self, role_id: int, systems: List[AuthScopeSystem]):
         """更新Role可授权的权限范围"""
         RoleScope.objects.filter(role_id=role_id, type=RoleScopeType.AUTHORIZATION.value).update(
-            content=json_dumps([system.dict() for system in systems])
+            content=json_dumps([system.dict() for system in systems]), version=F("version") + 1
         )
 
     def _update_role_subject_scope(self, role_id: int, subjects: List[Subject]):
         """更新Role可授权的人员范围"""
         # 1. 修改授权对象的限制范围
         RoleScope.objects.filter(role_id=role_id, type=RoleScopeType.SUBJECT.value).update(
-            content=json_dumps([subject.dict() for subject in subjects])
+            content=json_dumps([subject.dict() for subject in subjects]), version=F("version") + 1
         )
 
         # 2. 更新role subject scope 关系
@@ -333,6 +399,7 @@ class RoleService:
             return
         # 添加成员
         RoleUser.objects.create(role_id=role.id, username=username)
+        RoleUser.objects.invalidate_role(role.id)
 
         # 未拥有所有系统的权限，则无需再操作
         if not need_sync_backend_role:
@@ -351,6 +418,7 @@ class RoleService:
             return
         # 删除成员
         RoleUser.objects.filter(role_id=role.id, username=username).delete()
+        RoleUser.objects.invalidate_role(role.id)
 
         # 之前没有启用拥有所有系统权限，则无需操作
         if username not in role.system_permission_enabled_content.enabled_users:
@@ -398,6 +466,8 @@ class RoleService:
             if not RoleUser.objects.filter(role_id=role_id, username=username).delete()[0]:
                 return
 
+            RoleUser.objects.invalidate_role(role_id)
+
             role = Role.objects.get(id=role_id)
             if role.type == RoleType.SYSTEM_MANAGER.value and role.system_permission_enabled_content.global_enabled:
                 self._delete_backend_role_member(role, deleted_members=[username])
@@ -412,6 +482,7 @@ class RoleService:
         members = [RoleUser(role_id=role_id, username=u) for u in usernames if u not in exist_members]
         if members:
             RoleUser.objects.bulk_create(members, batch_size=100)
+            RoleUser.objects.invalidate_role(role_id)
 
     def get_role_by_group_id(self, group_id: int) -> Role:
         """通过用户组ID查询其对应的角色"""
@@ -8,7 +8,8 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
-from typing import List
+import itertools
+from typing import Iterable, Iterator, List
 
 
 def chunked(data: List, chunk_size: int):
@@ -25,3 +26,15 @@ def chunked(data: List, chunk_size: int):
         [[1, 2, 3], [4, 5, 6], [7, 8]]
     """
     return [data[i : i + chunk_size] for i in range(0, len(data), chunk_size)]  # 直接使用range的步长功能进行分块
+
+
+def iter_chunked(data: Iterable, chunk_size: int) -> Iterator[List]:
+    """
+    与chunked一致, 但支持迭代器, 按需逐块读取, 不会一次性加载所有数据
+    """
+    iterator = iter(data)
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
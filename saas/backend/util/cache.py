@@ -8,11 +8,21 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
-from typing import Any, Dict
+import inspect
+import logging
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable, Optional
 
 import redis
 from django.conf import settings
 from dogpile.cache import make_region
+from dogpile.cache.api import NO_VALUE
+from redis.exceptions import RedisError
+
+logger = logging.getLogger("app")
 
 # 默认是内存的Cache
 cache_dictionary: Dict[str, Any] = {}  # 内存cache是使用Python dictionary来作为Cache的
@@ -41,3 +51,156 @@ redis_region = make_region().configure(
 
 # Note: 使用region.cache_on_arguments() 对类的相关方法应用时，会忽略self和cls参数，进而是在类的所有对象上缓存的，并不是针对某个对象
 # 如果需要针对对象缓存，则需要自定义 function_key_generator参数传入cache_on_arguments()里
+
+
+class LocalLRUCache:
+    """
+    进程内的LRU缓存，支持过期时间与命中统计，线程安全
+
+    与region(memory_pickle)不同，缓存数量有上限，不会无限增长，适合以用户、Token等为key的场景
+    """
+
+    def __init__(self, maxsize: int, ttl: Optional[int] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # key -> (过期时间戳, value)
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or (item[0] is not None and item[0] <= time.monotonic()):
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[int] = None):
+        ttl = ttl if ttl is not None else self.ttl
+        expired_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (expired_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._data)}
+
+
+class RedisVersion:
+    """
+    存储在Redis里的版本号，所有进程共享，用于使各进程内存中的缓存失效
+
+    数据变更时递增版本号，各进程读取本地缓存时与版本号比较，版本不一致则重新加载
+    """
+
+    key_prefix = "bk_iam:version"
+    # 进程内缓存版本号的秒数, 为0时每次都读取Redis
+    local_ttl = 0
+
+    def __init__(self, key_prefix: Optional[str] = None, local_ttl: Optional[int] = None):
+        if key_prefix:
+            self.key_prefix = key_prefix
+        if local_ttl is not None:
+            self.local_ttl = local_ttl
+        self._local = LocalLRUCache(maxsize=10000, ttl=self.local_ttl) if self.local_ttl else None
+
+    def _key(self, name: str) -> str:
+        return f"{self.key_prefix}:{name}"
+
+    def get(self, name: str) -> str:
+        if self._local is not None:
+            version = self._local.get(name)
+            if version is not None:
+                return version
+
+        # Redis有问题时，不影响正常逻辑，返回空版本号，由调用方退化为只依赖本地缓存的过期时间
+        try:
+            version = redis_region.backend.client.get(self._key(name)) or "0"
+        except RedisError as error:
+            logger.exception(f"get version of {self._key(name)} error: {error}")
+            version = ""
+
+        # 读取失败的空版本号也缓存, 避免Redis故障期间每次调用都请求Redis并记录异常
+        if self._local is not None:
+            self._local.set(name, version)
+        return version
+
+    def bump(self, name: str):
+        try:
+            redis_region.backend.client.incr(self._key(name))
+        except RedisError as error:
+            logger.exception(f"bump version of {self._key(name)} error: {error}")
+
+        # 当前进程立即生效, 其他进程最多延迟local_ttl秒
+        if self._local is not None:
+            self._local.delete(name)
+
+
+class SystemModelVersion(RedisVersion):
+    """
+    系统权限模型的版本号
+
+    当观察到模型变更(模型变更事件、系统重新注册)时递增版本号，使本地缓存的模型数据在过期前失效
+    版本号在进程内缓存几秒，避免每次读取模型缓存都请求Redis
+    """
+
+    key_prefix = "bk_iam:model_version"
+    local_ttl = 5
+
+
+system_model_version = SystemModelVersion()
+
+
+def cache_on_system_model_version(expiration_time: int, system_id_arg: str = "system_id") -> Callable:
+    """
+    在进程内存region上缓存与系统模型相关的数据，读取时根据系统的模型版本号校验
+
+    与region.cache_on_arguments()一致，缓存key会忽略self和cls参数，不同的是支持关键字参数
+    system_id_arg: 被装饰函数中表示系统ID的参数名
+
+    Note: 系统注册/更新模型是直接调用后台接口的，SaaS无法感知，版本号只在SaaS处理模型变更事件或手动执行
+        bump_system_model_version时更新，所以expiration_time是模型变更生效的最长延迟，不能设置过长；
+        已感知的变更在版本号的进程内缓存过期后(local_ttl秒)生效
+    """
+
+    def decorator(fn):
+        namespace = f"{fn.__module__}:{fn.__qualname__}"
+        signature = inspect.signature(fn)
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = {k: v for k, v in bound.arguments.items() if k not in ("self", "cls")}
+
+            key = namespace + "|" + " ".join(map(str, arguments.values()))
+            version = system_model_version.get(arguments[system_id_arg])
+
+            cached = region.get(key, expiration_time=expiration_time)
+            if cached is not NO_VALUE and cached[0] == version:
+                return cached[1]
+
+            value = fn(*args, **kwargs)
+            region.set(key, (version, value))
+            return value
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import base64
+import zlib
+from typing import Callable, Dict, NamedTuple, Optional
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # pragma: no cover
+    lz4_frame = None
+
+
+class TextCodec(NamedTuple):
+    """
+    文本压缩编码
+
+    prefix: 编码后文本的前缀, 用于解码时识别编码, 不能是合法JSON的开头字符
+    """
+
+    prefix: str
+    compress: Callable[[bytes], bytes]
+    decompress: Callable[[bytes], bytes]
+
+
+# zlib不同压缩级别解码方式相同, 共用前缀
+text_codecs: Dict[str, TextCodec] = {
+    "zlib": TextCodec("zlib:", lambda b: zlib.compress(b, 6), zlib.decompress),
+    "zlib-fast": TextCodec("zlib:", lambda b: zlib.compress(b, 1), zlib.decompress),
+}
+
+# lz4为可选依赖, 压缩率略低于zlib, 但编解码快得多
+if lz4_frame is not None:
+    text_codecs["lz4"] = TextCodec("lz4:", lz4_frame.compress, lz4_frame.decompress)
+
+_prefix_codecs = {codec.prefix: codec for codec in text_codecs.values()}
+
+
+def compress_text(text: str, codec: str = "zlib") -> str:
+    """
+    压缩文本, 返回"<编码前缀>" + base64(压缩数据)
+
+    结果仍然是文本, 可以直接存储在原有的文本列里, 无需变更列类型
+    """
+    text_codec = text_codecs[codec]
+    return text_codec.prefix + base64.b64encode(text_codec.compress(text.encode("utf-8"))).decode("ascii")
+
+
+def decompress_text(value: str) -> str:
+    """解压compress_text压缩的文本, 没有编码前缀的文本(未压缩的历史数据)原样返回"""
+    text_codec = get_text_codec(value)
+    if text_codec is None:
+        return value
+
+    data = base64.b64decode(value[len(text_codec.prefix) :])
+    return text_codec.decompress(data).decode("utf-8")
+
+
+def get_text_codec(value: str) -> Optional[TextCodec]:
+    """返回文本的压缩编码, 未压缩的文本返回None"""
+    index = value.find(":", 0, 8)
+    if index == -1:
+        return None
+
+    prefix = value[: index + 1]
+    if prefix in _prefix_codecs:
+        return _prefix_codecs[prefix]
+
+    if prefix == "lz4:":
+        raise ValueError("the text is compressed by lz4, but lz4 is not installed")
+    return None
+
+
+def is_compressed_text(value: str) -> bool:
+    return get_text_codec(value) is not None
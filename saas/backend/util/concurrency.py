@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import itertools
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Hashable, Iterable, Iterator, List, Optional
+
+from django.db import connections
+from django.utils import translation
+
+from backend.common.local import local
+
+# 标记当前线程是否为并发执行的工作线程
+_worker = threading.local()
+
+
+def _in_worker() -> bool:
+    return getattr(_worker, "active", False)
+
+
+def _wrap_with_context(func: Callable) -> Callable:
+    """
+    将当前线程的request(request_id等)和语言传递到工作线程
+    """
+    request = local.request
+    language = translation.get_language()
+
+    def _run(*args, **kwargs):
+        if request is not None:
+            local.request = request
+        if language:
+            translation.activate(language)
+        _worker.active = True
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _worker.active = False
+            translation.deactivate()
+            # 线程池的线程会被复用，需要清理线程local与DB连接
+            local.release()
+            connections.close_all()
+
+    return _run
+
+
+def map_concurrently(
+    func: Callable[[Any], Any],
+    items: Iterable[Any],
+    max_workers: int,
+    key_func: Optional[Callable[[Any], Hashable]] = None,
+    key_max_workers: Optional[int] = None,
+) -> List[Any]:
+    """
+    有界并发执行func(item)，返回结果与items顺序一致
+
+    key_func: 对item分组(比如按system_id)，每组最多key_max_workers个并发，避免压垮单个接入系统
+    异常: 与串行执行保持一致，所有任务结束后，按items顺序抛出第一个异常
+
+    Note: 并发限制(max_workers与key_max_workers)在本次调用内有效，不是进程级别的限制
+        - 多个请求同时调用时，对同一个接入系统的总并发数是各调用之和
+        - 嵌套调用(比如按资源类型并发，每个资源类型内再分页并发)时，内层在工作线程里串行执行，
+          总并发数不超过外层的限制
+    """
+    item_list = list(items)
+    # 无需并发或已在并发的工作线程内的场景直接串行执行，避免线程开销与并发数相乘
+    if len(item_list) <= 1 or max_workers <= 1 or _in_worker():
+        return [func(item) for item in item_list]
+
+    # 按key分组，每组最多key_max_workers个执行通道，每个通道逐个取出组内的item执行
+    # 通道不会阻塞等待，某个接入系统较慢时，只占用该组的通道，不影响其他组使用线程池
+    groups: Dict[Hashable, Deque[int]] = defaultdict(deque)
+    for index, item in enumerate(item_list):
+        groups[key_func(item) if key_func else None].append(index)
+    lane_count = key_max_workers if key_func and key_max_workers else max_workers
+
+    results: List[Any] = [None] * len(item_list)
+    errors: Dict[int, BaseException] = {}
+
+    def _lane(indexes: Deque[int]):
+        while True:
+            try:
+                index = indexes.popleft()
+            except IndexError:
+                return
+            try:
+                results[index] = func(item_list[index])
+            except Exception as error:  # pylint: disable=broad-except
+                errors[index] = error
+
+    run = _wrap_with_context(_lane)
+    lanes = [indexes for indexes in groups.values() for _ in range(min(lane_count, len(indexes)))]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(lanes))) as executor:
+        for indexes in lanes:
+            executor.submit(run, indexes)
+
+    # with 退出时所有任务已完成
+    if errors:
+        raise errors[min(errors)]
+    return results
+
+
+def iter_concurrently(func: Callable[[Any], Any], items: Iterable[Any], max_workers: int) -> Iterator[Any]:
+    """
+    有界并发执行func(item)，按items顺序逐个产出结果，用于流式处理
+
+    最多只有max_workers个item在执行或等待被取走，消费方处理结果时，后续的item继续在后台执行
+    与map_concurrently一致，在并发的工作线程内调用时串行执行
+    异常: 按items顺序，产出到该item时抛出
+    """
+    if max_workers <= 1 or _in_worker():
+        for item in items:
+            yield func(item)
+        return
+
+    items = iter(items)
+    run = _wrap_with_context(func)
+    futures: Deque = deque()
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        for item in itertools.islice(items, max_workers):
+            futures.append(executor.submit(run, item))
+
+        while futures:
+            result = futures.popleft().result()
+            # 先提交下一个再产出结果，保持后台执行
+            for item in itertools.islice(items, 1):
+                futures.append(executor.submit(run, item))
+            yield result
+    finally:
+        # 消费方提前结束或出现异常时，取消还未开始执行的任务
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=True)
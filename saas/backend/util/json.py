@@ -9,8 +9,20 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 import json
-from typing import Any
+from typing import Any, Union
+
+try:
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover
+    orjson = None
 
 
 def json_dumps(data: Any, cls=None) -> str:
     return json.dumps(data, separators=(",", ":"), cls=cls)
+
+
+def json_loads(data: Union[str, bytes]) -> Any:
+    """解析JSON, 安装了可选依赖orjson时使用orjson, 解析大JSON快数倍"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
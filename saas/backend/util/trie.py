@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Optional, Sequence
+
+
+class _TrieNode:
+    __slots__ = ("children", "values")
+
+    def __init__(self):
+        self.children: Dict[Hashable, "_TrieNode"] = {}
+        self.values: List[Any] = []  # 非空表示有key在该节点结束
+
+
+class PrefixTrie:
+    """
+    前缀树, key为token序列
+
+    用于大量key的前缀匹配, 查询的复杂度只与被查询key的长度相关, 与树中key的数量无关
+    """
+
+    def __init__(self, keys: Iterable[Sequence[Hashable]] = ()) -> None:
+        self._root = _TrieNode()
+        self._size = 0
+        for key in keys:
+            self.add(key)
+
+    def add(self, key: Sequence[Hashable], value: Any = None) -> bool:
+        """
+        添加key, 返回key是否是新增的
+        """
+        node = self._root
+        for token in key:
+            child = node.children.get(token)
+            if child is None:
+                child = node.children[token] = _TrieNode()
+            node = child
+
+        is_new = not node.values
+        if is_new:
+            self._size += 1
+        node.values.append(value)
+        return is_new
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, key: Sequence[Hashable]) -> bool:
+        node = self._find(key)
+        return node is not None and bool(node.values)
+
+    def _find(self, key: Sequence[Hashable]) -> Optional[_TrieNode]:
+        node = self._root
+        for token in key:
+            child = node.children.get(token)
+            if child is None:
+                return None
+            node = child
+        return node
+
+    def has_prefix_of(self, key: Sequence[Hashable]) -> bool:
+        """
+        树中是否存在key的前缀(包括key本身)
+        """
+        node = self._root
+        if node.values:
+            return True
+
+        for token in key:
+            child = node.children.get(token)
+            if child is None:
+                return False
+            if child.values:
+                return True
+            node = child
+
+        return False
+
+    def iter_prefix_values(self, key: Sequence[Hashable]) -> Iterator[Any]:
+        """
+        遍历树中是key的前缀(包括key本身)的所有key的value, 按key的长度从短到长
+        """
+        node = self._root
+        yield from node.values
+
+        for token in key:
+            child = node.children.get(token)
+            if child is None:
+                return
+            yield from child.values
+            node = child
+
+    def iter_extension_values(self, key: Sequence[Hashable]) -> Iterator[Any]:
+        """
+        遍历树中以key为前缀(包括key本身)的所有key的value
+        """
+        node = self._find(key)
+        if node is None:
+            return
+
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            yield from node.values
+            stack.extend(node.children.values())
@@ -9,9 +9,11 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 import hashlib
+import importlib.util
 from urllib.parse import urlparse
 
 from celery.schedules import crontab
+from django.core.exceptions import ImproperlyConfigured
 
 from blueapps.conf.default_settings import *  # noqa
 from blueapps.conf.log import get_logging_config_dict
@@ -168,6 +170,10 @@ CELERYBEAT_SCHEDULE = {
         "task": "backend.apps.organization.tasks.sync_organization",
         "schedule": crontab(minute=0, hour=0),  # 每天凌晨执行
     },
+    "periodic_sync_organization_incremental": {
+        "task": "backend.apps.organization.tasks.sync_organization_incremental",
+        "schedule": crontab(minute="*/10"),  # 每10分钟执行一次
+    },
     "periodic_sync_new_users": {
         "task": "backend.apps.organization.tasks.sync_new_users",
         "schedule": crontab(),  # 每1分钟执行一次
@@ -200,6 +206,10 @@ CELERYBEAT_SCHEDULE = {
         "task": "backend.audit.tasks.pre_create_audit_model",
         "schedule": crontab(0, 0, day_of_month="25"),  # 每月25号执行
     },
+    "periodic_flush_audit_event": {
+        "task": "backend.audit.tasks.flush_audit_event",
+        "schedule": crontab(),  # 每1分钟执行一次
+    },
     "periodic_generate_action_aggregate": {
         "task": "backend.apps.action.tasks.generate_action_aggregate",
         "schedule": crontab(minute=0, hour=1),  # 每天凌晨1时执行
@@ -335,3 +345,112 @@ PUB_SUB_REDIS_DB = os.environ.get("BKAPP_PUB_SUB_REDIS_DB", 0)
 ENABLE_FRONT_END_FEATURES = {
     "enable_model_build": os.environ.get("BKAPP_ENABLE_FRONT_END_MODEL_BUILD", "False").lower() == "true"
 }
+
+# 后台组件(iam/engine/esb/usermgr/itsm等)HTTP连接池配置
+# 每个Host保持的最大keep-alive连接数
+COMPONENT_HTTP_POOL_MAXSIZE = int(os.environ.get("BKAPP_COMPONENT_HTTP_POOL_MAXSIZE", 20))
+# 单独配置某些Host的最大连接数, key: host(netloc), value: int
+COMPONENT_HTTP_POOL_HOST_MAXSIZE = {}
+# 连接数达到上限后是否阻塞等待, 开启后即为每个Host的并发连接数限制
+COMPONENT_HTTP_POOL_BLOCK = os.environ.get("BKAPP_COMPONENT_HTTP_POOL_BLOCK", "False").lower() == "true"
+# 阻塞等待连接的超时时间(秒)
+COMPONENT_HTTP_POOL_WAIT_TIMEOUT = int(os.environ.get("BKAPP_COMPONENT_HTTP_POOL_WAIT_TIMEOUT", 10))
+# 分页获取所有数据时，并发预取的最大页数
+COMPONENT_PAGING_MAX_CONCURRENCY = int(os.environ.get("BKAPP_COMPONENT_PAGING_MAX_CONCURRENCY", 4))
+# 分块批量写入时，并发执行的最大分块数
+COMPONENT_CHUNK_MAX_CONCURRENCY = int(os.environ.get("BKAPP_COMPONENT_CHUNK_MAX_CONCURRENCY", 4))
+# 分块写入失败的最大重试次数，每次重试会将分块对半拆分
+COMPONENT_CHUNK_MAX_RETRIES = int(os.environ.get("BKAPP_COMPONENT_CHUNK_MAX_RETRIES", 2))
+# 分块写入失败重试的退避基数(秒)，第n次重试等待 base * 2^(n-1)
+COMPONENT_CHUNK_RETRY_BACKOFF = float(os.environ.get("BKAPP_COMPONENT_CHUNK_RETRY_BACKOFF", 0.5))
+
+# 请求接入系统回调接口(资源实例查询)的并发控制
+# 单次批量查询的最大并发数
+RESOURCE_PROVIDER_MAX_CONCURRENCY = int(os.environ.get("BKAPP_RESOURCE_PROVIDER_MAX_CONCURRENCY", 8))
+# 单个接入系统的最大并发数
+RESOURCE_PROVIDER_SYSTEM_MAX_CONCURRENCY = int(os.environ.get("BKAPP_RESOURCE_PROVIDER_SYSTEM_MAX_CONCURRENCY", 3))
+
+# 登录认证
+AUTHENTICATION_BACKENDS = ("backend.account.backends.TokenBackend",)
+# bk_token校验结果的本地缓存时间(秒)，有效期内不再请求登录服务校验，0表示不缓存
+BK_TOKEN_VERIFY_CACHE_TTL = int(os.environ.get("BKAPP_BK_TOKEN_VERIFY_CACHE_TTL", 60))
+# bk_token校验结果的本地缓存最大数量
+BK_TOKEN_VERIFY_CACHE_MAXSIZE = int(os.environ.get("BKAPP_BK_TOKEN_VERIFY_CACHE_MAXSIZE", 10000))
+# 用户时区的本地缓存时间(秒)，登录同步用户属性时会立即失效
+USER_TIMEZONE_CACHE_TTL = int(os.environ.get("BKAPP_USER_TIMEZONE_CACHE_TTL", 5 * 60))
+# 用户时区的本地缓存最大数量
+USER_TIMEZONE_CACHE_MAXSIZE = int(os.environ.get("BKAPP_USER_TIMEZONE_CACHE_MAXSIZE", 10000))
+
+# 批量更新策略时每条SQL更新的策略数量，策略资源数据较大时可调小
+POLICY_BULK_UPDATE_BATCH_SIZE = int(os.environ.get("BKAPP_POLICY_BULK_UPDATE_BATCH_SIZE", 100))
+
+# 长时任务分块执行配置
+# 权限模板更新同步: 每个子任务同步的用户组数量与并发子任务数量
+LONG_TASK_TEMPLATE_UPDATE_CHUNK_SIZE = int(os.environ.get("BKAPP_LONG_TASK_TEMPLATE_UPDATE_CHUNK_SIZE", 10))
+LONG_TASK_TEMPLATE_UPDATE_PARALLELISM = int(os.environ.get("BKAPP_LONG_TASK_TEMPLATE_UPDATE_PARALLELISM", 4))
+# 用户组授权: 每个子任务执行的授权数量
+LONG_TASK_GROUP_AUTHORIZATION_CHUNK_SIZE = int(os.environ.get("BKAPP_LONG_TASK_GROUP_AUTHORIZATION_CHUNK_SIZE", 10))
+# 运行中的任务/分块超过该时间(秒)没有进展，认为执行的worker已异常退出，分块可被重新领取，任务可被重新执行
+LONG_TASK_STALE_TIMEOUT = int(os.environ.get("BKAPP_LONG_TASK_STALE_TIMEOUT", 30 * 60))
+
+# 用户权限过期提醒: 每批处理的用户数量与查询权限、发送邮件的并发数
+USER_EXPIRE_REMIND_BATCH_SIZE = int(os.environ.get("BKAPP_USER_EXPIRE_REMIND_BATCH_SIZE", 100))
+USER_EXPIRE_REMIND_MAX_CONCURRENCY = int(os.environ.get("BKAPP_USER_EXPIRE_REMIND_MAX_CONCURRENCY", 8))
+
+# 用户角色认证结果的本地缓存时间(秒)，角色成员变更时通过版本号立即失效，0表示不缓存
+ROLE_AUTH_CACHE_TTL = int(os.environ.get("BKAPP_ROLE_AUTH_CACHE_TTL", 5 * 60))
+# 用户角色认证结果的本地缓存最大数量
+ROLE_AUTH_CACHE_MAXSIZE = int(os.environ.get("BKAPP_ROLE_AUTH_CACHE_MAXSIZE", 10000))
+# 角色限制范围(已解析)的本地缓存最大数量
+ROLE_SCOPE_CACHE_MAXSIZE = int(os.environ.get("BKAPP_ROLE_SCOPE_CACHE_MAXSIZE", 1000))
+
+# 并发请求IAM后台的最大并发数
+IAM_BACKEND_MAX_CONCURRENCY = int(os.environ.get("BKAPP_IAM_BACKEND_MAX_CONCURRENCY", 8))
+
+# 审计事件写入方式: sync 同步写入DB, memory 进程内队列异步批量写入, redis Redis队列异步批量写入(由定时任务写入DB)
+# memory模式下进程异常退出时会丢失未写入的事件, 默认使用sync, 需要降低请求耗时可使用redis
+AUDIT_EVENT_WRITE_MODE = os.environ.get("BKAPP_AUDIT_EVENT_WRITE_MODE", "sync")
+# 审计事件队列的最大长度, 队列满时等待的时间(秒), 超时后同步写入DB
+AUDIT_EVENT_QUEUE_MAXSIZE = int(os.environ.get("BKAPP_AUDIT_EVENT_QUEUE_MAXSIZE", 10000))
+AUDIT_EVENT_QUEUE_PUT_TIMEOUT = float(os.environ.get("BKAPP_AUDIT_EVENT_QUEUE_PUT_TIMEOUT", 0.1))
+# 审计事件批量写入DB的数量与间隔(秒)
+AUDIT_EVENT_FLUSH_BATCH_SIZE = int(os.environ.get("BKAPP_AUDIT_EVENT_FLUSH_BATCH_SIZE", 100))
+AUDIT_EVENT_FLUSH_INTERVAL = float(os.environ.get("BKAPP_AUDIT_EVENT_FLUSH_INTERVAL", 1))
+# 审计事件游标分页跨月查询时, 最多查询的月份数
+AUDIT_EVENT_CROSS_MONTH_MAX = int(os.environ.get("BKAPP_AUDIT_EVENT_CROSS_MONTH_MAX", 12))
+
+# 组织架构增量同步每个事务写入的用户数
+ORG_SYNC_INCREMENTAL_BATCH_SIZE = int(os.environ.get("BKAPP_ORG_SYNC_INCREMENTAL_BATCH_SIZE", 100))
+# 距离上次成功的全量同步超过该间隔(小时)时，增量同步任务转为执行全量同步兜底
+ORG_SYNC_FULL_RECONCILE_INTERVAL = int(os.environ.get("BKAPP_ORG_SYNC_FULL_RECONCILE_INTERVAL", 24))
+# 组织架构同步时新增与变更parent的部门数达到该值，则批量写入后一次性重建部门树
+ORG_SYNC_DEPARTMENT_BULK_THRESHOLD = int(os.environ.get("BKAPP_ORG_SYNC_DEPARTMENT_BULK_THRESHOLD", 100))
+
+# 清理用户长时间过期权限时, 每批处理的用户数
+POLICY_CLEANUP_BATCH_SIZE = int(os.environ.get("BKAPP_POLICY_CLEANUP_BATCH_SIZE", 100))
+# 清理用户长时间过期权限时, 查询与删除的最大并发数
+POLICY_CLEANUP_MAX_CONCURRENCY = int(os.environ.get("BKAPP_POLICY_CLEANUP_MAX_CONCURRENCY", 8))
+
+# 策略等大JSON文本字段是否压缩存储, 关闭后新写入的数据不压缩, 已压缩的数据仍可正常读取
+# 需要分两个阶段开启, 避免滚动升级时未升级的进程读到压缩的数据:
+#   1. 保持关闭, 升级所有SaaS进程(web与celery), 新版本可以读取压缩与未压缩的数据
+#   2. 所有进程升级完成后再开启, 已有数据可通过 manage.py compress_json_text_fields 分批压缩
+JSON_TEXT_COMPRESS_ENABLED = os.environ.get("BKAPP_JSON_TEXT_COMPRESS_ENABLED", "False").lower() == "true"
+# JSON文本字段的压缩编码: zlib / zlib-fast / lz4(需安装lz4)
+JSON_TEXT_COMPRESS_CODEC = os.environ.get("BKAPP_JSON_TEXT_COMPRESS_CODEC", "zlib")
+if JSON_TEXT_COMPRESS_CODEC == "lz4" and importlib.util.find_spec("lz4") is None:
+    raise ImproperlyConfigured("BKAPP_JSON_TEXT_COMPRESS_CODEC is lz4, but lz4 is not installed")
+# 长度小于该值的JSON文本不压缩
+JSON_TEXT_COMPRESS_MIN_LENGTH = int(os.environ.get("BKAPP_JSON_TEXT_COMPRESS_MIN_LENGTH", 256))
+
+# 模板新增操作时从已有操作克隆用户组策略, 每批读取处理的模板授权数量
+TEMPLATE_CLONE_POLICY_CHUNK_SIZE = int(os.environ.get("BKAPP_TEMPLATE_CLONE_POLICY_CHUNK_SIZE", 100))
+
+# 检查审批中的申请单据状态时, 每页读取的单据数, 每次请求审批系统查询的单据数与最大并发数
+APPLICATION_STATUS_CHECK_PAGE_SIZE = int(os.environ.get("BKAPP_APPLICATION_STATUS_CHECK_PAGE_SIZE", 1000))
+APPLICATION_STATUS_CHECK_CHUNK_SIZE = int(os.environ.get("BKAPP_APPLICATION_STATUS_CHECK_CHUNK_SIZE", 100))
+APPLICATION_STATUS_CHECK_MAX_CONCURRENCY = int(os.environ.get("BKAPP_APPLICATION_STATUS_CHECK_MAX_CONCURRENCY", 4))
+# 单据的检查间隔(秒)为已创建时长乘以该比例, 并限制在最小与最大间隔之间
+APPLICATION_STATUS_CHECK_INTERVAL_RATIO = float(os.environ.get("BKAPP_APPLICATION_STATUS_CHECK_INTERVAL_RATIO", 0.1))
+APPLICATION_STATUS_CHECK_MIN_INTERVAL = int(os.environ.get("BKAPP_APPLICATION_STATUS_CHECK_MIN_INTERVAL", 20 * 60))
+APPLICATION_STATUS_CHECK_MAX_INTERVAL = int(os.environ.get("BKAPP_APPLICATION_STATUS_CHECK_MAX_INTERVAL", 86400))
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from unittest import mock
+
+from django.test import TestCase
+
+from backend.account.backends import TokenBackend, verified_token_cache
+from blueapps.account import get_user_model
+from blueapps.account.models import UserProperty
+
+USER_INFO = {
+    "qq": "",
+    "language": "zh-cn",
+    "time_zone": "Asia/Shanghai",
+    "role": 2,
+    "phone": "11111111111",
+    "email": "test@example.com",
+    "wx_userid": "",
+    "chname": "test",
+}
+
+
+class TestTokenBackend(TestCase):
+    def setUp(self):
+        self.backend = TokenBackend()
+        self.backend.verify_bk_token = mock.Mock(return_value=(True, "token_backend_test"))
+        self.backend.get_user_info = mock.Mock(return_value=(True, dict(USER_INFO)))
+
+    def test_authenticate_cache_token(self):
+        """校验通过后缓存bk_token"""
+        with self.settings(BK_TOKEN_VERIFY_CACHE_TTL=60):
+            user = self.backend.authenticate(bk_token="bk_token_cache")
+            self.assertEqual(user.username, "token_backend_test")
+            self.assertEqual(verified_token_cache.get("bk_token_cache"), "token_backend_test")
+
+            self.backend.verify_bk_token = mock.Mock(return_value=(False, None))
+            self.assertIsNone(self.backend.authenticate(bk_token="bk_token_cache"))
+            self.assertIsNone(verified_token_cache.get("bk_token_cache"))
+
+    def test_update_changed_properties_only(self):
+        """只更新有变化的用户属性"""
+        user = self.backend.authenticate(bk_token="bk_token_property")
+        self.assertEqual(user.get_property("role"), "2")
+
+        self.backend.get_user_info = mock.Mock(return_value=(True, dict(USER_INFO, chname="changed")))
+        with mock.patch.object(UserProperty, "save", autospec=True, side_effect=UserProperty.save) as mocked:
+            self.backend.authenticate(bk_token="bk_token_property")
+
+        self.assertEqual(mocked.call_count, 1)
+        self.assertEqual(get_user_model().objects.get(username="token_backend_test").get_property("chname"), "changed")
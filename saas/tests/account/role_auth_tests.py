@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from collections import defaultdict
+from unittest import mock
+
+from django.test import TestCase
+from prometheus_client import REGISTRY
+
+from backend.account.role_auth import authenticate
+from backend.apps.role.models import Role, RoleUser
+from backend.service.constants import RoleType
+from backend.service.role import RoleService
+
+
+class TestRoleAuthenticate(TestCase):
+    def setUp(self):
+        self.role = Role.objects.create(name="grade_manager", type=RoleType.RATING_MANAGER.value)
+        RoleUser.objects.create(role_id=self.role.id, username="role_auth_test")
+        self.request = mock.Mock(user=mock.Mock(username="role_auth_test", is_authenticated=True))
+
+        # 使用内存中的版本号代替Redis
+        versions = defaultdict(int)
+        version = mock.patch("backend.account.role_auth.role_member_version").start()
+        version.get.side_effect = lambda name: str(versions[name])
+        bump = mock.patch("backend.apps.role.managers.role_member_version").start()
+        bump.bump.side_effect = lambda name: versions.__setitem__(name, versions[name] + 1)
+        # TestCase在事务中执行, 事务提交后的回调直接执行
+        mock.patch("backend.apps.role.managers.transaction.on_commit", side_effect=lambda func: func()).start()
+        self.addCleanup(mock.patch.stopall)
+
+    def _count(self, result):
+        return REGISTRY.get_sample_value("role_auth_cache_total", {"result": result}) or 0
+
+    def test_cached(self):
+        """角色认证结果缓存后不再查询DB"""
+        with self.settings(ROLE_AUTH_CACHE_TTL=60):
+            role = authenticate(self.request, self.role.id)
+            self.assertEqual(role.id, self.role.id)
+
+            hits = self._count("hit")
+            with self.assertNumQueries(0):
+                self.assertEqual(authenticate(self.request, self.role.id).id, self.role.id)
+            self.assertEqual(self._count("hit"), hits + 1)
+
+    def test_invalidate_by_member_change(self):
+        """角色成员变更后缓存失效"""
+        with self.settings(ROLE_AUTH_CACHE_TTL=60):
+            self.assertEqual(authenticate(self.request, self.role.id).id, self.role.id)
+
+            RoleService().delete_member(self.role.id, "role_auth_test")
+            self.assertEqual(authenticate(self.request, self.role.id).type, RoleType.STAFF.value)
+
+            RoleService().add_grade_manager_members(self.role.id, ["role_auth_test"])
+            self.assertEqual(authenticate(self.request, self.role.id).id, self.role.id)
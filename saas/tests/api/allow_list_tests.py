@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import time
+from unittest import mock
+
+from django.test import TestCase
+
+from backend.api.allow_list import AllowListIndex
+from backend.api.authorization.constants import ALLOW_ANY, AuthorizationAPIEnum
+from backend.api.authorization.models import AuthAPIAllowListConfig, auth_api_allow_list_index
+
+
+class TestAllowListIndex(TestCase):
+    def test_wildcard(self):
+        index = AllowListIndex(
+            "test", lambda: [(("t", "s1"), "a1"), (("t", "s1"), "a2"), (("t", "s2"), ALLOW_ANY)], wildcard=ALLOW_ANY
+        )
+        with mock.patch.object(AllowListIndex.version, "get", return_value="1"):
+            self.assertTrue(index.is_allowed(("t", "s1"), "a1"))
+            self.assertFalse(index.is_allowed(("t", "s1"), "a3"))
+            self.assertTrue(index.is_allowed(("t", "s2"), "any"))
+            self.assertFalse(index.is_allowed(("t", "s3"), "a1"))
+            self.assertEqual(index.filter_not_allowed(("t", "s1"), ["a1", "a3", "a4"]), ["a3", "a4"])
+            self.assertEqual(index.filter_not_allowed(("t", "s2"), ["a1", "a3"]), [])
+
+    def test_reload_by_version(self):
+        """版本号变化后重新加载"""
+        _type = AuthorizationAPIEnum.AUTHORIZATION_INSTANCE.value
+        with mock.patch.object(AllowListIndex.version, "get", return_value="1"):
+            self.assertFalse(AuthAPIAllowListConfig.is_allowed(_type, "allow_list_test", "view"))
+
+        with mock.patch.object(AllowListIndex.version, "bump") as mocked_bump, mock.patch(
+            "backend.api.allow_list.transaction.on_commit"
+        ) as mocked_on_commit:
+            AuthAPIAllowListConfig.objects.create(type=_type, system_id="allow_list_test", object_id="view")
+            # 事务提交后才递增版本号
+            mocked_bump.assert_not_called()
+            mocked_on_commit.call_args[0][0]()
+        mocked_bump.assert_called_once_with(auth_api_allow_list_index.name)
+
+        with mock.patch.object(AllowListIndex.version, "get", return_value="2"):
+            self.assertTrue(AuthAPIAllowListConfig.is_allowed(_type, "allow_list_test", "view"))
+
+    def test_recheck_version_in_lock(self):
+        """等锁期间其他线程已重新加载时，不重复加载"""
+        load_func = mock.Mock(return_value=[(("t", "s1"), "a1")])
+        index = AllowListIndex("test", load_func, wildcard=ALLOW_ANY)
+
+        def reload_by_other_thread():
+            index._version = "1"
+            index._loaded_at = time.monotonic()
+
+        with mock.patch.object(AllowListIndex.version, "get", return_value="1"), mock.patch.object(
+            index, "_lock"
+        ) as mocked_lock:
+            mocked_lock.__enter__.side_effect = reload_by_other_thread
+            index.list_object_ids(("t", "s1"))
+        load_func.assert_not_called()
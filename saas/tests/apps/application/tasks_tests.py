@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from backend.apps.application.models import Application
+from backend.apps.application.tasks import ApplicationStatusReconciler
+from backend.biz.application import ApplicationIDStatusDict
+from backend.service.constants import ApplicationStatus
+
+
+@override_settings(
+    APPLICATION_STATUS_CHECK_PAGE_SIZE=3,
+    APPLICATION_STATUS_CHECK_CHUNK_SIZE=2,
+    APPLICATION_STATUS_CHECK_INTERVAL_RATIO=0.1,
+    APPLICATION_STATUS_CHECK_MIN_INTERVAL=60,
+    APPLICATION_STATUS_CHECK_MAX_INTERVAL=3600,
+)
+class TestApplicationStatusReconciler(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        # (创建时长, 距上次检查时长), sn1创建10小时, 检查间隔为1小时(最大间隔), 30分钟前刚检查过
+        for i, (age, checked) in enumerate(
+            [(timedelta(hours=1), None), (timedelta(hours=10), timedelta(minutes=30)), (timedelta(hours=10), None)]
+            + [(timedelta(minutes=5), None)] * 2
+        ):
+            application = Application.objects.create(sn=f"sn{i}", type="grant_action", applicant="admin", _data="{}")
+            Application.objects.filter(id=application.id).update(
+                created_time=now - age, last_checked_time=now - checked if checked else None
+            )
+        Application.objects.create(sn="passed", applicant="admin", _data="{}", status=ApplicationStatus.PASS.value)
+
+        self.biz = mock.patch.object(ApplicationStatusReconciler, "biz").start()
+        self.addCleanup(mock.patch.stopall)
+
+        # sn0审批通过, sn3被拒绝, 其余审批中
+        status = {"sn0": ApplicationStatus.PASS.value, "sn3": ApplicationStatus.REJECT.value}
+        self.biz.query_application_approval_status.side_effect = lambda applications: ApplicationIDStatusDict(
+            data={a.id: status.get(a.sn, ApplicationStatus.PENDING.value) for a in applications}
+        )
+
+    def _queried_sns(self):
+        return sorted(a.sn for c in self.biz.query_application_approval_status.call_args_list for a in c[0][0])
+
+    def test_run(self):
+        stats = ApplicationStatusReconciler().run()
+
+        self.assertEqual(self._queried_sns(), ["sn0", "sn2", "sn3", "sn4"])
+        self.assertTrue(all(len(c[0][0]) <= 2 for c in self.biz.query_application_approval_status.call_args_list))
+        self.assertEqual(
+            sorted((c[0][0].sn, c[0][1]) for c in self.biz.handle_application_result.call_args_list),
+            [("sn0", ApplicationStatus.PASS.value), ("sn3", ApplicationStatus.REJECT.value)],
+        )
+        self.assertEqual(
+            {k: stats[k] for k in ["pending", "checked", "changed", "failed"]},
+            {"pending": 5, "checked": 4, "changed": 2, "failed": 0},
+        )
+
+        # 刚检查过的单据, 下次不再检查
+        self.biz.query_application_approval_status.reset_mock()
+        ApplicationStatusReconciler().run()
+        self.assertEqual(self._queried_sns(), [])
+
+    def test_query_fail(self):
+        self.biz.query_application_approval_status.side_effect = Exception("itsm error")
+
+        stats = ApplicationStatusReconciler().run()
+
+        self.assertEqual((stats["checked"], stats["failed"]), (0, 4))
+        self.assertFalse(Application.objects.filter(last_checked_time__isnull=False).exclude(sn="sn1").exists())
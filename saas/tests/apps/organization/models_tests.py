@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from backend.apps.organization.models import Department, DepartmentMember, User
+
+
+class TestDepartmentMembers(TestCase):
+    def setUp(self):
+        root = Department.objects.create(id=1, name="root", order=1, member_count=1, recursive_member_count=3)
+        child = Department.objects.create(id=2, name="child", parent=root, order=2, member_count=1)
+        Department.objects.create(id=3, name="leaf", parent=child, order=3, member_count=1)
+        Department.objects.create(id=4, name="other", order=4, member_count=1)
+
+        User.objects.bulk_create([User(id=i, username=f"user{i}") for i in range(1, 5)])
+        DepartmentMember.objects.bulk_create(
+            [DepartmentMember(department_id=i, user_id=i) for i in range(1, 5)]
+            # 同一用户加入多个子孙部门只返回一次
+            + [DepartmentMember(department_id=3, user_id=2)]
+        )
+
+    def test_members(self):
+        root = Department.objects.get(id=1)
+        self.assertEqual([u.username for u in root.members], ["user1"])
+
+    def test_recursive_members(self):
+        """递归成员只需一条SQL"""
+        root = Department.objects.get(id=1)
+        with CaptureQueriesContext(connection) as ctx:
+            usernames = sorted(u.username for u in root.recursive_members)
+
+        self.assertEqual(usernames, ["user1", "user2", "user3"])
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+    def test_empty(self):
+        self.assertEqual(Department.objects.get(id=2).recursive_members, [])
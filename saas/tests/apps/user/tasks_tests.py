@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from backend.apps.group.models import Group
+from backend.apps.organization.constants import StaffStatus
+from backend.apps.organization.models import User
+from backend.apps.policy.models import Policy
+from backend.apps.template.models import PermTemplatePolicyAuthorized
+from backend.apps.user.tasks import ExpiredPolicyCleanup, ExpireRemindCheckpoint, UserExpireRemind
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    USER_EXPIRE_REMIND_BATCH_SIZE=2,
+    USER_EXPIRE_REMIND_MAX_CONCURRENCY=2,
+)
+class TestUserExpireRemind(TestCase):
+    def setUp(self):
+        cache.clear()
+        User.objects.bulk_create([User(id=i, username=f"user{i}", display_name=f"user{i}") for i in range(1, 6)])
+
+        self.remind = UserExpireRemind(0, ExpireRemindCheckpoint("20210101"))
+        self.group_biz = mock.patch.object(UserExpireRemind, "group_biz").start()
+        self.policy_biz = mock.patch.object(UserExpireRemind, "policy_biz").start()
+        self.send_mail = mock.patch("backend.apps.user.tasks.esb.send_mail").start()
+        mock.patch("backend.apps.user.tasks.render_to_string", return_value="").start()
+        self.addCleanup(mock.patch.stopall)
+
+        # user2没有即将过期的权限
+        group = Group.objects.create(name="group", description="")
+        self.group_svc = mock.patch.object(UserExpireRemind, "group_svc").start()
+        self.group_svc.list_exist_groups_before_expired_at.return_value = [group.id]
+        self.group_svc.list_paging_members_before_expired_at.return_value = (
+            4,
+            [SimpleNamespace(type="user", id=f"user{i}") for i in [1, 3, 4, 5]],
+        )
+        self.group_biz.list_subject_group_before_expired_at.side_effect = lambda s, e: [] if s.id == "user2" else [1]
+        self.policy_biz.list_expired.return_value = []
+
+    def _mailed_usernames(self):
+        return sorted(c[0][0] for c in self.send_mail.call_args_list)
+
+    def test_run(self):
+        self.remind.run()
+
+        self.assertEqual(self._mailed_usernames(), ["user1", "user3", "user4", "user5"])
+        self.assertEqual(self.remind.checkpoint.get_last_user_id(), 5)
+
+    def test_skip_users_without_permission(self):
+        """没有即将过期的用户组成员关系, 在SaaS DB里也没有权限的用户不请求后台"""
+        Policy.objects.create(subject_type="user", subject_id="user2", system_id="bk_cmdb", action_id="view")
+
+        self.remind.run()
+
+        queried = {c[0][0].id for c in self.group_biz.list_subject_group_before_expired_at.call_args_list}
+        self.assertEqual(queried, {"user1", "user3", "user4", "user5"})
+        self.assertEqual([c[0][0].id for c in self.policy_biz.list_expired.call_args_list], ["user2"])
+
+    def test_resume(self):
+        # 上次执行已处理完前两个用户, 并且已给user3发送了邮件
+        self.remind.checkpoint.set_last_user_id(2)
+        self.remind.checkpoint.add_mailed_username("user3")
+
+        self.remind.run()
+
+        self.assertEqual(self._mailed_usernames(), ["user4", "user5"])
+
+    def test_send_mail_fail(self):
+        self.send_mail.side_effect = lambda username, *args: 1 / 0 if username == "user4" else None
+
+        self.remind.run()
+
+        self.assertEqual(
+            self.remind.checkpoint.list_mailed_usernames([f"user{i}" for i in range(1, 6)]),
+            {"user1", "user3", "user5"},
+        )
+
+
+def _expired_policy(policy_id, system_id):
+    return SimpleNamespace(id=policy_id, system=SimpleNamespace(id=system_id))
+
+
+@override_settings(POLICY_CLEANUP_BATCH_SIZE=2, POLICY_CLEANUP_MAX_CONCURRENCY=2)
+class TestExpiredPolicyCleanup(TestCase):
+    def setUp(self):
+        User.objects.bulk_create([User(id=i, username=f"user{i}", display_name=f"user{i}") for i in range(1, 6)])
+        User.objects.filter(username="user5").update(staff_status=StaffStatus.OUT.value)
+        # user4没有任何权限, user5已离职
+        Policy.objects.bulk_create(
+            [
+                Policy(subject_type="user", subject_id=username, system_id="bk_cmdb", action_id="view")
+                for username in ["user1", "user2", "user5"]
+            ]
+        )
+        PermTemplatePolicyAuthorized.objects.create(
+            template_id=1, subject_type="user", subject_id="user3", system_id="bk_job", _data="{}"
+        )
+
+        self.query_biz = mock.patch.object(ExpiredPolicyCleanup, "policy_query_biz").start()
+        self.operation_biz = mock.patch.object(ExpiredPolicyCleanup, "policy_operation_biz").start()
+        self.log_audit = mock.patch("backend.apps.user.tasks.log_user_cleanup_policy_audit_events").start()
+        self.addCleanup(mock.patch.stopall)
+
+        expired = {
+            "user1": [_expired_policy(1, "bk_cmdb"), _expired_policy(2, "bk_job"), _expired_policy(3, "bk_cmdb")],
+            "user3": [_expired_policy(4, "bk_job")],
+        }
+        self.query_biz.list_expired.side_effect = lambda s, e: expired.get(s.id, [])
+
+    def _audited(self):
+        return sorted((d[0].username, d[1]) for c in self.log_audit.call_args_list for d in c[0][1])
+
+    def _deleted(self):
+        return sorted((c[0][0], c[0][1].id, sorted(c[0][2])) for c in self.operation_biz.delete_by_ids.call_args_list)
+
+    def test_run(self):
+        stats = ExpiredPolicyCleanup(0, "task").run()
+
+        queried = sorted(c[0][0].id for c in self.query_biz.list_expired.call_args_list)
+        self.assertEqual(queried, ["user1", "user2", "user3"])
+        self.assertEqual(
+            self._deleted(), [("bk_cmdb", "user1", [1, 3]), ("bk_job", "user1", [2]), ("bk_job", "user3", [4])]
+        )
+        # 每批删除成功的审计事件一起写入
+        self.assertEqual(self.log_audit.call_count, 2)
+        self.assertEqual(self._audited(), [("user1", "bk_cmdb"), ("user1", "bk_job"), ("user3", "bk_job")])
+        self.assertEqual(
+            {k: v for k, v in stats.items() if k != "elapsed"},
+            {"candidate_users": 3, "expired_users": 2, "expired_policies": 4, "failed_users": 0},
+        )
+
+    def test_dry_run(self):
+        stats = ExpiredPolicyCleanup(0, "task", dry_run=True).run()
+
+        self.operation_biz.delete_by_ids.assert_not_called()
+        self.log_audit.assert_not_called()
+        self.assertEqual(stats["expired_policies"], 4)
+
+    def test_delete_fail(self):
+        self.operation_biz.delete_by_ids.side_effect = (
+            lambda system_id, s, ids: 1 / 0 if system_id == "bk_job" else None
+        )
+
+        stats = ExpiredPolicyCleanup(0, "task").run()
+
+        self.assertEqual(self._audited(), [("user1", "bk_cmdb")])
+        self.assertEqual(stats["failed_users"], 2)
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from backend.audit.models import get_event_model
+from backend.audit.pagination import EventKeysetPaginator, previous_month
+
+MONTHS = ["201912", "202001"]
+
+
+class TestEventKeysetPaginator(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # SQLite不能在事务中建表, 需要在TestCase开启事务前创建审计表
+        for month in MONTHS:
+            get_event_model(month)
+        super().setUpClass()
+
+    def setUp(self):
+        now = timezone.now()
+        for month in MONTHS:
+            Event = get_event_model(month)
+            Event.objects.bulk_create(
+                [
+                    Event(
+                        source_type="web",
+                        type="group.create",
+                        username="admin",
+                        role_id=i % 2,
+                        object_type="group",
+                        object_id=f"{month}-{i}",
+                        object_name="test",
+                    )
+                    for i in range(5)
+                ]
+            )
+            # 每两个事件的创建时间相同, bulk_create时auto_now_add会覆盖created_time, 需要单独更新
+            for i, event in enumerate(Event.objects.all()):
+                Event.objects.filter(id=event.id).update(created_time=now - timedelta(seconds=i // 2))
+
+    def _get_queryset(self, month):
+        Event = get_event_model(month, create=False)
+        return Event.objects.all() if Event else None
+
+    def _paginate_all(self, paginator, month):
+        pages, cursor = [], ""
+        while True:
+            events, cursor = paginator.paginate(month, cursor)
+            pages.append([e.object_id for e in events])
+            if not cursor:
+                return pages
+
+    def test_paginate(self):
+        pages = self._paginate_all(EventKeysetPaginator(self._get_queryset, 2), "202001")
+
+        self.assertEqual([len(p) for p in pages], [2, 2, 1])
+        self.assertEqual(len({i for p in pages for i in p}), 5)
+        self.assertTrue(all(i.startswith("202001") for p in pages for i in p))
+
+    def test_paginate_cross_month(self):
+        pages = self._paginate_all(EventKeysetPaginator(self._get_queryset, 3, max_months=3), "202001")
+
+        self.assertEqual([len(p) for p in pages], [3, 3, 3, 1])
+        self.assertEqual([i[:6] for p in pages for i in p], ["202001"] * 5 + ["201912"] * 5)
+
+    def test_previous_month(self):
+        self.assertEqual(previous_month("202001"), "201912")
+        self.assertEqual(previous_month("202003"), "202002")
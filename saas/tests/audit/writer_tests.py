@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from unittest import mock
+
+from django.test import TestCase
+
+from backend.audit import models as audit_models
+from backend.audit.models import get_event_model
+from backend.audit.writer import AuditEventWriter, flush_redis_events
+
+
+def _new_event(object_id="1"):
+    return get_event_model()(
+        source_type="web",
+        type="group.create",
+        username="admin",
+        object_type="group",
+        object_id=object_id,
+        object_name="test",
+    )
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = []
+
+    def llen(self, key):
+        return len(self.data)
+
+    def rpush(self, key, *values):
+        self.data.extend(v.encode() for v in values)
+
+    def lrange(self, key, start, end):
+        return self.data[start : end + 1]
+
+    def ltrim(self, key, start, end):
+        self.data = self.data[start:]
+
+    def lock(self, name, timeout=None):
+        return mock.Mock(acquire=mock.Mock(return_value=True))
+
+
+class AuditTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # SQLite不能在事务中建表, 需要在TestCase开启事务前创建当月的审计表
+        get_event_model()
+        super().setUpClass()
+
+
+class TestGetEventModel(AuditTestCase):
+    def test_memoize_exists(self):
+        """表已存在时不再查询表名"""
+        audit_models._exist_table_names.clear()
+        Event = get_event_model()
+
+        with mock.patch.object(Event, "exists") as mocked:
+            get_event_model()
+
+        mocked.assert_not_called()
+
+
+class TestAuditEventWriter(AuditTestCase):
+    def test_sync(self):
+        with self.settings(AUDIT_EVENT_WRITE_MODE="sync"):
+            event = _new_event()
+            AuditEventWriter().write(event)
+
+        self.assertTrue(type(event).objects.filter(id=event.id).exists())
+
+    def test_write_many_sync(self):
+        """sync方式下一次批量写入, savepoint内只有一条INSERT"""
+        events = [_new_event(str(i)) for i in range(3)]
+        with self.settings(AUDIT_EVENT_WRITE_MODE="sync"), self.assertNumQueries(3):
+            AuditEventWriter().write_many(events)
+
+        self.assertEqual(type(events[0]).objects.filter(id__in=[e.id for e in events]).count(), 3)
+
+    def test_memory(self):
+        """后台线程批量写入"""
+        flushed = []
+        writer = AuditEventWriter()
+        with self.settings(AUDIT_EVENT_WRITE_MODE="memory", AUDIT_EVENT_FLUSH_INTERVAL=0.05), mock.patch(
+            "backend.audit.writer._bulk_create", side_effect=flushed.append
+        ):
+            for i in range(5):
+                writer.write(_new_event(str(i)))
+            writer.flush()
+
+        self.assertEqual(sorted(e.object_id for batch in flushed for e in batch), ["0", "1", "2", "3", "4"])
+        self.assertLess(len(flushed), 5)
+
+    def test_memory_queue_full(self):
+        """队列满时同步写入"""
+        writer = AuditEventWriter()
+        with self.settings(
+            AUDIT_EVENT_WRITE_MODE="memory", AUDIT_EVENT_QUEUE_MAXSIZE=1, AUDIT_EVENT_QUEUE_PUT_TIMEOUT=0
+        ), mock.patch.object(AuditEventWriter, "_run"):
+            writer.write(_new_event("0"))
+            event = _new_event("1")
+            writer.write(event)
+
+        self.assertTrue(type(event).objects.filter(id=event.id).exists())
+
+    def test_redis(self):
+        redis = FakeRedis()
+        with self.settings(AUDIT_EVENT_WRITE_MODE="redis"), mock.patch("backend.audit.writer.redis_region") as region:
+            region.backend.client = redis
+            events = [_new_event(str(i)) for i in range(3)]
+            for event in events:
+                AuditEventWriter().write(event)
+
+            self.assertEqual(len(redis.data), 3)
+            self.assertEqual(flush_redis_events(), 3)
+
+        self.assertEqual(redis.data, [])
+        Event = type(events[0])
+        self.assertEqual(
+            [(e.object_id, e.time) for e in Event.objects.filter(id__in=[e.id for e in events]).order_by("object_id")],
+            [(e.object_id, e.time) for e in events],
+        )
+
+    def test_redis_keep_events_when_write_fail(self):
+        """整批写入失败时保留在队列中, 下次重试"""
+        redis = FakeRedis()
+        with self.settings(AUDIT_EVENT_WRITE_MODE="redis"), mock.patch("backend.audit.writer.redis_region") as region:
+            region.backend.client = redis
+            for i in range(3):
+                AuditEventWriter().write(_new_event(str(i)))
+
+            with mock.patch("backend.audit.writer._bulk_create", side_effect=lambda events: events):
+                self.assertEqual(flush_redis_events(), 0)
+            self.assertEqual(len(redis.data), 3)
+
+            # 写入DB后, 移除前中断的, 重新写入时去重
+            with mock.patch.object(FakeRedis, "ltrim"):
+                self.assertEqual(flush_redis_events(max_batches=1), 3)
+            self.assertEqual(len(redis.data), 3)
+            self.assertEqual(flush_redis_events(), 3)
+            self.assertEqual(redis.data, [])
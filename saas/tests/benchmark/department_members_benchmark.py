@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+# 部门递归成员查询与授权范围校验的耗时基准，不在默认测试集里，需显式执行:
+#     pytest tests/benchmark/department_members_benchmark.py
+import time
+from collections import defaultdict
+from typing import Dict
+
+import pytest
+
+from backend.apps.organization.models import Department, DepartmentMember, User
+from backend.apps.role.models import Role
+from backend.biz.role import RoleSubjectScopeChecker
+from backend.service.constants import RoleType
+from backend.service.models import Subject
+
+# 每个部门的子部门数
+BRANCH = 10
+
+
+def _gen_org(department_count: int, user_count: int):
+    """按完全BRANCH叉树生成部门，直接计算出mptt的(lft, rght, level)后批量插入，用户平均分布在各个部门"""
+    children = defaultdict(list)
+    for i in range(2, department_count + 1):
+        children[(i - 2) // BRANCH + 1].append(i)
+
+    mptt_values: Dict[int, Dict[str, int]] = {}
+    counter = 0
+    # 迭代DFS，避免深度过大时递归
+    stack = [(1, 0, False)]
+    while stack:
+        node, level, visited = stack.pop()
+        counter += 1
+        if visited:
+            mptt_values[node]["rght"] = counter
+            continue
+        mptt_values[node] = {"lft": counter, "level": level}
+        stack.append((node, level, True))
+        stack.extend((child, level + 1, False) for child in reversed(children[node]))
+
+    Department.objects.bulk_create(
+        [
+            Department(
+                id=i,
+                name=f"dept{i}",
+                parent_id=(i - 2) // BRANCH + 1 if i > 1 else None,
+                order=i,
+                tree_id=1,
+                member_count=1,
+                recursive_member_count=user_count,
+                **mptt_values[i],
+            )
+            for i in range(1, department_count + 1)
+        ],
+    )
+    User.objects.bulk_create([User(id=i, username=f"user{i}") for i in range(1, user_count + 1)])
+    DepartmentMember.objects.bulk_create(
+        [DepartmentMember(department_id=i % department_count + 1, user_id=i) for i in range(1, user_count + 1)],
+    )
+
+
+def _legacy_recursive_members(dept: Department):
+    """原有实现: 分别查询出子孙部门ID和成员ID后拼接IN查询, 作为对比"""
+    ids = list(dept.get_descendants(include_self=True).values_list("id", flat=True))
+    user_ids = list(DepartmentMember.objects.filter(department_id__in=ids).values_list("user_id", flat=True))
+    return User.objects.filter(id__in=user_ids)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("department_count, user_count", [(1000, 10000), (50000, 500000)])
+def test_recursive_members(department_count, user_count):
+    _gen_org(department_count, user_count)
+    # 第二层部门，包含约1/BRANCH的部门与用户
+    dept = Department.objects.get(id=2)
+
+    st = time.perf_counter()
+    count = dept.recursive_members.count()
+    subquery_cost = time.perf_counter() - st
+
+    # 原有实现的IN参数个数与部门、用户数线性相关，量级大时会超出SQLite变量个数限制，只对比较小的量级
+    legacy_display = "skipped (IN parameters exceed the SQLite variable limit)"
+    if department_count <= 1000:
+        st = time.perf_counter()
+        assert _legacy_recursive_members(dept).count() == count
+        legacy_display = f"{(time.perf_counter() - st) * 1000:.1f} ms"
+
+    st = time.perf_counter()
+    subjects = [Subject(type="user", id=f"user{i}") for i in range(1, 1001)]
+    subjects += [Subject(type="department", id=str(i)) for i in range(1, 1001)]
+    checker = RoleSubjectScopeChecker(Role(id=1, type=RoleType.RATING_MANAGER.value))
+    checker.svc.list_subject_scope = lambda role_id: [Subject(type="department", id="2")]
+    checked = checker.check(subjects, raise_exception=False)
+    check_cost = time.perf_counter() - st
+
+    print(
+        f"\nrecursive_members() {department_count} departments x {user_count} users: "
+        f"subquery {subquery_cost * 1000:.1f} ms, legacy {legacy_display}; "
+        f"scope check 2000 subjects {check_cost * 1000:.1f} ms"
+    )
+
+    assert 0 < count < user_count
+    assert 0 < len(checked) < len(subjects)
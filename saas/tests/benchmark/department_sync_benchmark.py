@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+# 组织架构同步新增部门的耗时基准，对比逐个mptt插入与批量写入后一次性重建树，不在默认测试集里，需显式执行:
+#     pytest tests/benchmark/department_sync_benchmark.py
+import time
+from unittest import mock
+
+import pytest
+from django.db import connection
+from django.db.models import QuerySet
+from django.test.utils import override_settings
+
+from backend.apps.organization.models import Department
+from backend.biz.org_sync.department import DBDepartmentSyncService
+
+# 每个部门的子部门数
+BRANCH = 10
+
+
+def _gen_departments(count: int):
+    return [
+        {
+            "id": i,
+            "name": f"dept{i}",
+            "category_id": 1,
+            "parent": (i - 2) // BRANCH + 1 if i > 1 else None,
+            "order": i,
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+_bulk_create = QuerySet.bulk_create
+
+
+def _limited_bulk_create(self, objs, batch_size=None, **kwargs):
+    """Django 2.2 不会按数据库的限制调整指定的batch_size，SQLite单条INSERT最多500行"""
+    if connection.vendor == "sqlite":
+        batch_size = min(batch_size or 500, 500)
+    return _bulk_create(self, objs, batch_size=batch_size, **kwargs)
+
+
+def _sync(departments, bulk_threshold: int) -> float:
+    Department.objects.all().delete()
+    with mock.patch(
+        "backend.biz.org_sync.department.usermgr.list_department", return_value=departments
+    ), mock.patch.object(QuerySet, "bulk_create", _limited_bulk_create):
+        with override_settings(ORG_SYNC_DEPARTMENT_BULK_THRESHOLD=bulk_threshold):
+            st = time.perf_counter()
+            DBDepartmentSyncService().sync_to_db()
+            return time.perf_counter() - st
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("count", [1000, 5000, 20000])
+def test_created_departments(count):
+    departments = _gen_departments(count)
+
+    bulk_cost = _sync(departments, bulk_threshold=1)
+    bulk_tree = list(Department.objects.order_by("id").values_list("tree_id", "lft", "rght", "level"))
+
+    mptt_cost = _sync(departments, bulk_threshold=count + 1)
+    mptt_tree = list(Department.objects.order_by("id").values_list("tree_id", "lft", "rght", "level"))
+
+    print(f"\nsync {count} created departments: bulk rebuild {bulk_cost:.2f} s, mptt insert {mptt_cost:.2f} s")
+
+    assert bulk_tree == mptt_tree
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+# 大JSON文本字段各压缩编码的存储与编解码耗时基准，不在默认测试集里，需显式执行:
+#     pytest -s tests/benchmark/json_text_compress_benchmark.py
+import json
+import time
+
+import pytest
+
+from backend.util.compress import compress_text, decompress_text, text_codecs
+from backend.util.json import json_dumps
+
+SYSTEM_ID = "bk_benchmark"
+
+
+def _gen_policy_resources(instance_count: int):
+    """策略的资源实例, 每个实例带有拓扑路径"""
+    return [
+        {
+            "system_id": SYSTEM_ID,
+            "type": "host",
+            "name": "主机",
+            "name_en": "Host",
+            "selection_mode": "instance",
+            "condition": [
+                {
+                    "id": "condition",
+                    "instances": [
+                        {
+                            "type": "host",
+                            "name": "主机",
+                            "name_en": "Host",
+                            "path": [
+                                [
+                                    {"type": "biz", "id": f"{i % 10}", "name": f"业务{i % 10}", "system_id": SYSTEM_ID},
+                                    {"type": "set", "id": f"{i % 100}", "name": f"集群{i % 100}", "system_id": ""},
+                                    {"type": "host", "id": f"{i}", "name": f"10.0.{i // 256}.{i % 256}"},
+                                ]
+                                for i in range(instance_count)
+                            ],
+                        }
+                    ],
+                    "attributes": [{"id": "os", "name": "操作系统", "values": [{"id": "linux", "name": "Linux"}]}],
+                }
+            ],
+        }
+    ]
+
+
+def _gen_auth_scope(action_count: int, instance_count: int):
+    """分级管理员的授权范围, 多个操作共用相同的资源范围"""
+    return [
+        {
+            "system_id": SYSTEM_ID,
+            "actions": [
+                {"id": f"action{i}", "related_resource_types": _gen_policy_resources(instance_count)}
+                for i in range(action_count)
+            ],
+        }
+    ]
+
+
+DOCUMENTS = {
+    "policy(10 instances)": json_dumps(_gen_policy_resources(10)),
+    "policy(1000 instances)": json_dumps(_gen_policy_resources(1000)),
+    "role scope(50 actions)": json_dumps(_gen_auth_scope(50, 20)),
+}
+
+
+def _timeit(func, rounds: int) -> float:
+    st = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - st) / rounds
+
+
+@pytest.mark.parametrize("name", list(DOCUMENTS))
+def test_json_text_compress(name):
+    text = DOCUMENTS[name]
+    rounds = 200
+    raw_mb = len(text.encode("utf-8")) / 1024 / 1024
+    parse_cost = _timeit(lambda: json.loads(text), rounds)
+
+    print(f"\n{name}: raw {len(text)} chars, json.loads {raw_mb / parse_cost:.1f} MB/s")
+    for codec in text_codecs:
+        compressed = compress_text(text, codec)
+        encode_cost = _timeit(lambda: compress_text(text, codec), rounds)
+        decode_cost = _timeit(lambda: decompress_text(compressed), rounds)
+        print(
+            f"  {codec:<10} {len(compressed):>8} chars ({len(compressed) / len(text):.1%}), "
+            f"encode {raw_mb / encode_cost:.1f} MB/s, decode {raw_mb / decode_cost:.1f} MB/s"
+        )
+
+        assert decompress_text(compressed) == text
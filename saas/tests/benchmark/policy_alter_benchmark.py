@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+# PolicyOperationService.alter() 更新策略的耗时基准，不在默认测试集里，需显式执行:
+#     pytest tests/benchmark/policy_alter_benchmark.py
+import time
+from unittest import mock
+
+import pytest
+
+from backend.apps.policy.models import Policy as PolicyModel
+from backend.service.models import Policy, Subject
+from backend.service.policy.operation import PolicyOperationService
+from backend.util.json import json_dumps
+
+SYSTEM_ID = "bk_benchmark"
+
+
+def _gen_resources(action_index: int, instance_count: int = 10):
+    return [
+        {
+            "system_id": SYSTEM_ID,
+            "type": "host",
+            "condition": [
+                {
+                    "id": f"condition{action_index}",
+                    "instances": [
+                        {
+                            "type": "host",
+                            "path": [
+                                [{"type": "host", "id": f"host{i}", "name": f"host{i}", "system_id": SYSTEM_ID}]
+                                for i in range(instance_count)
+                            ],
+                        }
+                    ],
+                    "attributes": [],
+                }
+            ],
+        }
+    ]
+
+
+def _prepare(subject: Subject, count: int):
+    PolicyModel.objects.bulk_create(
+        [
+            PolicyModel(
+                subject_type=subject.type,
+                subject_id=subject.id,
+                system_id=SYSTEM_ID,
+                action_id=f"action{i}",
+                _resources=json_dumps(_gen_resources(i, 1)),
+                _environment="{}",
+                policy_id=i + 1,
+            )
+            for i in range(count)
+        ],
+        batch_size=500,
+    )
+    return [
+        Policy(action_id=f"action{i}", related_resource_types=_gen_resources(i), policy_id=i + 1, expired_at=0)
+        for i in range(count)
+    ]
+
+
+def _legacy_update_db_policies(self, system_id, subject, policies):
+    """逐条更新，作为对比"""
+    policy_dict = {p.action_id: p for p in policies}
+    db_policies = PolicyModel.objects.filter(
+        subject_id=subject.id, subject_type=subject.type, system_id=system_id
+    ).only("id", "action_id")
+    for p in db_policies:
+        update_policy = policy_dict.get(p.action_id)
+        if not update_policy:
+            continue
+        PolicyModel.objects.filter(id=p.id).update(
+            _resources=json_dumps([rt.dict() for rt in update_policy.related_resource_types])
+        )
+
+
+def _assert_updated(subject: Subject, count: int):
+    resources = {
+        p.action_id: p.resources
+        for p in PolicyModel.objects.filter(subject_id=subject.id, system_id=SYSTEM_ID).only("action_id", "_resources")
+    }
+    assert len(resources) == count
+    for i in (0, count - 1):
+        assert resources[f"action{i}"] == _gen_resources(i)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("count", [10, 100, 1000])
+def test_alter_update_policies(count):
+    svc = PolicyOperationService()
+    subject = Subject(type="user", id=f"benchmark{count}")
+    policies = _prepare(subject, count)
+
+    with mock.patch("backend.service.policy.operation.iam.alter_policies"):
+        st = time.perf_counter()
+        svc.alter(SYSTEM_ID, subject, update_policies=policies)
+        bulk_cost = time.perf_counter() - st
+        _assert_updated(subject, count)
+
+        with mock.patch.object(PolicyOperationService, "_update_db_policies", _legacy_update_db_policies):
+            st = time.perf_counter()
+            svc.alter(SYSTEM_ID, subject, update_policies=policies)
+            legacy_cost = time.perf_counter() - st
+
+    print(f"\nalter() update {count} policies: bulk {bulk_cost * 1000:.1f} ms, per-row {legacy_cost * 1000:.1f} ms")
+    _assert_updated(subject, count)
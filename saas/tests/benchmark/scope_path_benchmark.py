@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+# 分级管理员授权范围路径匹配的耗时基准，不在默认测试集里，需显式执行:
+#     pytest tests/benchmark/scope_path_benchmark.py
+import time
+
+import pytest
+
+from backend.apps.role.models import Role
+from backend.biz.policy import PathNodeBeanList, PolicyBean
+from backend.biz.role import RoleAuthorizationScopeChecker
+from backend.service.constants import RoleType
+
+SYSTEM_ID = "bk_benchmark"
+ACTION_ID = "view_host"
+
+
+def _gen_path(biz: int, set_: int = None):
+    path = [{"system_id": SYSTEM_ID, "type": "biz", "id": f"biz{biz}", "name": f"biz{biz}"}]
+    if set_ is not None:
+        path.append({"system_id": SYSTEM_ID, "type": "set", "id": f"set{set_}", "name": f"set{set_}"})
+    return path
+
+
+def _gen_scope(count: int):
+    policy = PolicyBean.parse_obj(
+        {
+            "action_id": ACTION_ID,
+            "related_resource_types": [
+                {
+                    "system_id": SYSTEM_ID,
+                    "type": "host",
+                    "condition": [
+                        {
+                            "id": "scope",
+                            "instances": [{"type": "biz", "path": [_gen_path(i) for i in range(count)]}],
+                            "attributes": [],
+                        }
+                    ],
+                }
+            ],
+        }
+    )
+    return {SYSTEM_ID: {ACTION_ID: policy.dict()}}
+
+
+def _legacy_remove_path_outside_scope(scope, paths):
+    """逐个路径字符串前缀匹配, 作为对比"""
+    policy_scope = PolicyBean.parse_obj(scope[SYSTEM_ID][ACTION_ID])
+    for rrt in policy_scope.related_resource_types:
+        scope_str_paths = [path_list.to_path_string() for path_list in rrt.iter_path_list(ignore_attribute=True)]
+        inside_paths = []
+        for path in paths:
+            tp = PathNodeBeanList(path).to_path_string()
+            if any(tp.startswith(sp) for sp in scope_str_paths):
+                inside_paths.append(path)
+        paths = inside_paths
+    return paths
+
+
+@pytest.mark.parametrize("count", [100, 1000, 10000])
+def test_remove_path_outside_scope(count):
+    scope = _gen_scope(count)
+    # 一半的路径在范围内
+    paths = (
+        PolicyBean.parse_obj(
+            {
+                "action_id": ACTION_ID,
+                "related_resource_types": [
+                    {
+                        "system_id": SYSTEM_ID,
+                        "type": "host",
+                        "condition": [
+                            {
+                                "id": "paths",
+                                "instances": [
+                                    {"type": "set", "path": [_gen_path(i * 2, i) for i in range(count)]},
+                                ],
+                                "attributes": [],
+                            }
+                        ],
+                    }
+                ],
+            }
+        )
+        .related_resource_types[0]
+        .condition[0]
+        .instances[0]
+        .path
+    )
+
+    checker = RoleAuthorizationScopeChecker(Role(id=1, type=RoleType.RATING_MANAGER.value))
+    checker.__dict__["system_action_scope"] = scope
+
+    st = time.perf_counter()
+    trie_result = checker.remove_path_outside_scope(SYSTEM_ID, ACTION_ID, paths)
+    trie_cost = time.perf_counter() - st
+
+    # 原有的实现是O(路径数 * 范围数), 10k时需要执行较长时间
+    st = time.perf_counter()
+    legacy_result = _legacy_remove_path_outside_scope(scope, paths)
+    legacy_cost = time.perf_counter() - st
+    assert legacy_result == trie_result
+
+    print(
+        f"\nremove_path_outside_scope() {count} paths x {count} scopes: "
+        f"trie {trie_cost * 1000:.1f} ms, startswith {legacy_cost * 1000:.1f} ms"
+    )
+
+    assert len(trie_result) == (count + 1) // 2
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from unittest import mock
+
+from django.test import TestCase
+
+from backend.apps.organization.models import Department
+from backend.biz.org_sync.department import DBDepartmentSyncService
+from backend.biz.org_sync.util import calculate_mptt_fields
+
+# 两棵树，子部门先于父部门返回
+DEPARTMENTS = [
+    {"id": 4, "name": "d4", "category_id": 1, "parent": 2, "order": 4},
+    {"id": 1, "name": "d1", "category_id": 1, "parent": None, "order": 1},
+    {"id": 2, "name": "d2", "category_id": 1, "parent": 1, "order": 2},
+    {"id": 3, "name": "d3", "category_id": 1, "parent": 1, "order": 3},
+    {"id": 5, "name": "d5", "category_id": 1, "parent": 4, "order": 5},
+    {"id": 6, "name": "d6", "category_id": 1, "parent": None, "order": 6},
+]
+
+# d4移动到d6下，删除d3，新增d7
+CHANGED_DEPARTMENTS = [
+    {"id": 1, "name": "d1", "category_id": 1, "parent": None, "order": 1},
+    {"id": 2, "name": "d2", "category_id": 1, "parent": 1, "order": 2},
+    {"id": 4, "name": "d4", "category_id": 1, "parent": 6, "order": 4},
+    {"id": 5, "name": "d5", "category_id": 1, "parent": 4, "order": 5},
+    {"id": 6, "name": "d6", "category_id": 1, "parent": None, "order": 6},
+    {"id": 7, "name": "d7", "category_id": 1, "parent": 2, "order": 7},
+]
+
+
+class TestDBDepartmentSyncService(TestCase):
+    def _sync(self, departments, bulk_threshold):
+        with mock.patch("backend.biz.org_sync.department.usermgr.list_department", return_value=departments):
+            with self.settings(ORG_SYNC_DEPARTMENT_BULK_THRESHOLD=bulk_threshold):
+                service = DBDepartmentSyncService()
+                service.sync_to_db()
+        return service.bulk_rebuild
+
+    def _tree(self):
+        return sorted(Department.objects.values_list("id", "parent_id", "tree_id", "lft", "rght", "level"))
+
+    def _sync_all(self, bulk_threshold):
+        Department.objects.all().delete()
+        self._sync(DEPARTMENTS, bulk_threshold)
+        created_tree = self._tree()
+        self._sync(CHANGED_DEPARTMENTS, bulk_threshold)
+        return created_tree, self._tree()
+
+    def test_bulk_rebuild_same_as_mptt(self):
+        """批量重建的树与逐个mptt变更的树一致"""
+        mptt_trees = self._sync_all(bulk_threshold=100)
+        bulk_trees = self._sync_all(bulk_threshold=1)
+
+        self.assertEqual(mptt_trees, bulk_trees)
+        self.assertEqual(
+            list(Department.objects.get(id=6).get_descendants().values_list("id", flat=True).order_by("lft")), [4, 5]
+        )
+
+    def test_bulk_threshold(self):
+        self.assertFalse(self._sync(DEPARTMENTS, bulk_threshold=len(DEPARTMENTS) + 1))
+        # d4变更parent，新增d7
+        self.assertTrue(self._sync(CHANGED_DEPARTMENTS, bulk_threshold=2))
+
+
+class TestCalculateMPTTFields(TestCase):
+    def test_calculate(self):
+        fields = calculate_mptt_fields([(1, None), (2, 1), (3, 2), (4, 1), (5, None)])
+        self.assertEqual(fields, {1: (1, 1, 8, 0), 2: (1, 2, 5, 1), 3: (1, 3, 4, 2), 4: (1, 6, 7, 1), 5: (2, 1, 2, 0)})
+
+    def test_cycle(self):
+        with self.assertRaises(Exception):
+            calculate_mptt_fields([(1, None), (2, 3), (3, 2)])
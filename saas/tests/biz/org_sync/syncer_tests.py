@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import datetime
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from backend.apps.organization.constants import SyncDataType, SyncTaskStatus, SyncType
+from backend.apps.organization.models import Department, DepartmentMember, SyncRecord, User
+from backend.biz.org_sync.department import DBDepartmentSyncExactInfo
+from backend.biz.org_sync.syncer import Syncer
+from backend.common.error_codes import CodeException, error_codes
+from backend.component.util import ChunkExecutionSummary, ChunkResult
+
+
+class TestSyncIncremental(TestCase):
+    def setUp(self):
+        self.watermark = timezone.now() - datetime.timedelta(minutes=10)
+        self.syncer = Syncer()
+        self.syncer.set_watermarks(self.watermark)
+
+        Department.objects.create(id=1, name="root", order=1)
+        User.objects.create(id=1, username="exist", display_name="old", staff_status="IN")
+
+    @mock.patch(
+        "backend.biz.org_sync.syncer.iam.create_subjects_by_auto_paging", return_value=ChunkExecutionSummary([])
+    )
+    @mock.patch("backend.biz.org_sync.syncer.usermgr.list_updated_department")
+    @mock.patch("backend.biz.org_sync.syncer.usermgr.list_updated_profile")
+    def test_sync_incremental(self, list_updated_profile, list_updated_department, create_subjects):
+        list_updated_profile.return_value = [
+            {"id": 1, "username": "exist", "display_name": "new", "staff_status": "IN", "category_id": 1},
+            {"id": 2, "username": "created", "display_name": "", "staff_status": "IN", "category_id": 1},
+        ]
+        # 子部门先于父部门返回，也需要能按拓扑顺序新增
+        list_updated_department.return_value = [
+            {"id": 3, "name": "leaf", "category_id": 1, "parent": 2, "order": 3},
+            {"id": 2, "name": "child", "category_id": 1, "parent": 1, "order": 2},
+        ]
+
+        with self.settings(ORG_SYNC_INCREMENTAL_BATCH_SIZE=1):
+            self.syncer.sync_incremental()
+
+        self.assertEqual(list_updated_profile.call_args[0][0], self.watermark)
+        self.assertEqual(User.objects.get(id=1).display_name, "new")
+        self.assertEqual(User.objects.get(id=2).display_name, "created")
+        self.assertEqual(Department.objects.get(id=3).ancestor_ids, [1, 2])
+        self.assertEqual(Department.objects.get(id=1).child_count, 1)
+
+        # 只有新增的用户和部门需要同步到IAM后台
+        created = [s["id"] for c in create_subjects.call_args_list for s in c[0][0]]
+        self.assertEqual(sorted(created), ["2", "3", "created"])
+
+        # 高水位推进到本次查询的结束时间
+        end_time = list_updated_profile.call_args[0][1]
+        self.assertEqual(self.syncer.get_watermark(SyncDataType.User.value), end_time)
+        self.assertEqual(self.syncer.get_watermark(SyncDataType.Department.value), end_time)
+
+    @mock.patch(
+        "backend.biz.org_sync.syncer.iam.create_subjects_by_auto_paging", return_value=ChunkExecutionSummary([])
+    )
+    @mock.patch("backend.biz.org_sync.syncer.usermgr.list_updated_department")
+    @mock.patch("backend.biz.org_sync.syncer.usermgr.list_updated_profile", mock.Mock(return_value=[]))
+    def test_sync_departments_exact_info(self, list_updated_department, create_subjects):
+        """只重新计算受影响部门的冗余数据，结果与全量计算一致"""
+        root = Department.objects.get(id=1)
+        child = Department.objects.create(id=2, name="child", parent=root, order=2)
+        Department.objects.create(id=3, name="leaf", parent=child, order=3)
+        Department.objects.create(id=4, name="other", order=4)
+        DepartmentMember.objects.bulk_create(
+            [DepartmentMember(department_id=d, user_id=u) for d, u in [(1, 1), (2, 1), (3, 2), (3, 3), (4, 4)]]
+        )
+        DBDepartmentSyncExactInfo().sync_to_db()
+
+        # child改名并移动到other下，新增部门5
+        list_updated_department.return_value = [
+            {"id": 2, "name": "renamed", "category_id": 1, "parent": 4, "order": 2},
+            {"id": 5, "name": "new", "category_id": 1, "parent": 1, "order": 5},
+        ]
+        self.syncer.sync_incremental()
+
+        fields = ("id", "ancestors", "child_count", "member_count", "recursive_member_count")
+        incremental = list(Department.objects.order_by("id").values_list(*fields))
+        DBDepartmentSyncExactInfo().sync_to_db()
+        self.assertEqual(incremental, list(Department.objects.order_by("id").values_list(*fields)))
+        self.assertEqual(Department.objects.get(id=3).parse_ancestors()[-1], {"id": 2, "name": "renamed"})
+        self.assertEqual(Department.objects.get(id=4).recursive_member_count, 4)
+
+    @mock.patch("backend.biz.org_sync.syncer.usermgr.list_updated_department", mock.Mock(return_value=[]))
+    @mock.patch("backend.biz.org_sync.syncer.iam.create_subjects_by_auto_paging")
+    @mock.patch("backend.biz.org_sync.syncer.usermgr.list_updated_profile")
+    def test_create_subjects_failed(self, list_updated_profile, create_subjects):
+        """新增的用户推送失败时清除高水位，下次以全量同步重新推送"""
+        list_updated_profile.return_value = [
+            {"id": 2, "username": "created", "display_name": "", "staff_status": "IN", "category_id": 1},
+        ]
+        error = error_codes.REMOTE_REQUEST_ERROR
+        create_subjects.return_value = ChunkExecutionSummary([ChunkResult([{"id": "created"}], 1, error)])
+
+        with self.assertRaises(CodeException):
+            self.syncer.sync_incremental()
+
+        self.assertTrue(User.objects.filter(username="created").exists())
+        self.assertIsNone(self.syncer.get_watermark(SyncDataType.User.value))
+        self.assertTrue(self.syncer.need_full_sync())
+
+    def test_need_full_sync(self):
+        # 没有成功的全量同步记录
+        self.assertTrue(self.syncer.need_full_sync())
+
+        record = SyncRecord.objects.create(type=SyncType.Full.value, status=SyncTaskStatus.Succeed.value)
+        self.assertFalse(self.syncer.need_full_sync())
+
+        SyncRecord.objects.filter(id=record.id).update(created_time=timezone.now() - datetime.timedelta(days=2))
+        self.assertTrue(self.syncer.need_full_sync())
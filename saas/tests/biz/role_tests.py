@@ -8,10 +8,17 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
+from unittest import mock
+
 from django.test import TestCase
 
+from backend.apps.organization.models import Department, DepartmentMember, User
+from backend.apps.role.models import Role
 from backend.biz.policy import InstanceBean
-from backend.biz.role import ActionScopeDiffer
+from backend.biz.role import ActionScopeDiffer, RoleSubjectScopeChecker
+from backend.common.error_codes import APIException
+from backend.service.constants import RoleType
+from backend.service.models import Subject
 
 
 class TestInstanceDiff(TestCase):
@@ -60,3 +67,57 @@ class TestInstanceDiff(TestCase):
         ]
 
         self.assertFalse(ActionScopeDiffer(None, None)._diff_instances(template_instances, scope_instances))
+
+    def test_any_id(self):
+        template_instances = [
+            InstanceBean(type="", path=[[{"type": "biz", "id": "biz1"}, {"type": "set", "id": "set1"}]]),
+            InstanceBean(type="", path=[[{"type": "biz", "id": "biz1"}, {"type": "module", "id": "module1"}]]),
+        ]
+
+        scope_instances = [
+            InstanceBean(type="", path=[[{"type": "biz", "id": "biz1"}, {"type": "set", "id": "*"}]]),
+        ]
+
+        differ = ActionScopeDiffer(None, None)
+        self.assertTrue(differ._diff_instances(template_instances[:1], scope_instances))
+        self.assertFalse(differ._diff_instances(template_instances, scope_instances))
+
+
+class TestRoleSubjectScopeChecker(TestCase):
+    def setUp(self):
+        root = Department.objects.create(id=1, name="root", order=1)
+        child = Department.objects.create(id=2, name="child", parent=root, order=2)
+        Department.objects.create(id=3, name="leaf", parent=child, order=3)
+        Department.objects.create(id=4, name="other", order=4)
+
+        User.objects.create(id=1, username="in_scope")
+        User.objects.create(id=2, username="out_scope")
+        DepartmentMember.objects.bulk_create(
+            [DepartmentMember(department_id=3, user_id=1), DepartmentMember(department_id=4, user_id=2)]
+        )
+
+        self.checker = RoleSubjectScopeChecker(Role(id=1, type=RoleType.RATING_MANAGER.value))
+        self.subjects = [
+            Subject(type="department", id="3"),
+            Subject(type="department", id="4"),
+            Subject(type="user", id="in_scope"),
+            Subject(type="user", id="out_scope"),
+        ]
+
+    def _check(self, scopes, raise_exception=False):
+        with mock.patch.object(self.checker.svc, "list_subject_scope", return_value=scopes):
+            return self.checker.check(self.subjects, raise_exception=raise_exception)
+
+    def test_descendant_in_scope(self):
+        """子孙部门及其成员都在祖先部门的授权范围内"""
+        subjects = self._check([Subject(type="department", id="2")])
+        self.assertEqual([(s.type, s.id) for s in subjects], [("department", "3"), ("user", "in_scope")])
+
+    def test_without_department_scope(self):
+        """仅有用户授权范围时，其他部门与用户都不满足"""
+        subjects = self._check([Subject(type="user", id="out_scope")])
+        self.assertEqual([(s.type, s.id) for s in subjects], [("user", "out_scope")])
+
+    def test_raise_exception(self):
+        with self.assertRaises(APIException):
+            self._check([Subject(type="department", id="1")], raise_exception=True)
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from backend.apps.template.models import PermTemplate, PermTemplatePolicyAuthorized
+from backend.biz.policy import PathNodeBean, PolicyBeanList
+from backend.biz.template import ChainList, ChainNodeList, ChainPathMatcher, TemplatePolicyCloneBiz
+from backend.service.models import ChainNode
+
+
+def _chain(*ids):
+    return ChainNodeList([ChainNode(system_id="bk_cmdb", id=i) for i in ids])
+
+
+class TestChainList(TestCase):
+    def test_match_prefix(self):
+        target = ChainList([_chain("biz", "set", "module", "host"), _chain("host")])
+        source = ChainList([_chain("biz", "set"), _chain("biz", "set", "module", "host", "process"), _chain("cloud")])
+
+        prefix = target.match_prefix(source)
+
+        self.assertEqual(
+            [c.to_key() for c in prefix.chains],
+            [_chain("biz", "set", "module", "host").to_key()],
+        )
+
+    def test_match_prefix_none(self):
+        target = ChainList([_chain("host")])
+        source = ChainList([_chain("biz", "set")])
+
+        self.assertIsNone(target.match_prefix(source))
+
+
+def _action(*rrt_chains):
+    """每个资源类型的实例视图只有单个节点的链路"""
+    return SimpleNamespace(
+        related_resource_types=[
+            SimpleNamespace(
+                instance_selections=[
+                    SimpleNamespace(resource_type_chain=[ChainNode(system_id="bk_cmdb", id=i)]) for i in chains
+                ]
+            )
+            for chains in rrt_chains
+        ]
+    )
+
+
+class TestActionInstanceSelectionChainPrefix(TestCase):
+    def test_multi_resource_types(self):
+        source_action = _action(["biz", "host"])
+        chain_list = TemplatePolicyCloneBiz()._gen_action_instance_selection_chain_prefix_list(
+            _action(["biz"], ["biz", "host"]), source_action
+        )
+        self.assertEqual([c.to_key() for c in chain_list.chains], [_chain("biz").to_key()])
+
+    def test_empty_intersection(self):
+        """多个资源类型的前缀交集为空后, 不能被后续资源类型的前缀重置"""
+        source_action = _action(["biz", "host"])
+        self.assertIsNone(
+            TemplatePolicyCloneBiz()._gen_action_instance_selection_chain_prefix_list(
+                _action(["biz"], ["host"], ["biz"]), source_action
+            )
+        )
+
+
+def _path(*types, system_id="bk_cmdb"):
+    return [PathNodeBean(system_id=system_id, type=t, id=f"{t}1", name=t) for t in types]
+
+
+class TestChainPathMatcher(TestCase):
+    def test_is_match_path(self):
+        chain_list = ChainList([_chain("biz", "set", "module"), _chain("host")])
+        matcher = ChainPathMatcher(chain_list)
+
+        paths = [
+            _path("biz"),
+            _path("biz", "set", "module"),
+            _path("biz", "set", "module", "host"),
+            _path("set"),
+            _path("host"),
+            _path("biz", system_id="bk_job"),
+            _path("biz", "set", system_id=""),
+            _path("set", system_id=""),
+        ]
+        for path in paths:
+            self.assertEqual(
+                matcher.is_match_path(path), any(chain.is_match_path(path) for chain in chain_list.chains)
+            )
+
+
+def _authorized_data(action_id, *host_ids):
+    path = [[{"system_id": "bk_cmdb", "type": "host", "id": i, "name": i}] for i in host_ids]
+    return {
+        "actions": [
+            {
+                "id": action_id,
+                "related_resource_types": [
+                    {
+                        "system_id": "bk_cmdb",
+                        "type": "host",
+                        "condition": [{"id": "c", "instances": [{"type": "host", "path": path}], "attributes": []}],
+                    }
+                ],
+                "policy_id": 0,
+                "expired_at": 0,
+            }
+        ]
+    }
+
+
+@override_settings(TEMPLATE_CLONE_POLICY_CHUNK_SIZE=2)
+class TestTemplatePolicyClone(TestCase):
+    def setUp(self):
+        self.template = PermTemplate.objects.create(name="t", system_id="bk_cmdb", _action_ids='["view_host"]')
+        # 用户组3没有源操作的权限
+        for group_id, data in [
+            (1, _authorized_data("view_host", "h1", "h1")),
+            (2, _authorized_data("view_host", "h2")),
+            (3, _authorized_data("edit_host", "h3")),
+            (4, _authorized_data("view_host", "h4")),
+        ]:
+            PermTemplatePolicyAuthorized.objects.create(
+                template_id=self.template.id,
+                subject_type="group",
+                subject_id=str(group_id),
+                system_id="bk_cmdb",
+                data=data,
+            )
+
+        biz = TemplatePolicyCloneBiz()
+        action = SimpleNamespace(
+            id="edit_host", related_resource_types=[SimpleNamespace(system_id="bk_cmdb", id="host")]
+        )
+        mock.patch.object(
+            TemplatePolicyCloneBiz, "action_svc"
+        ).start().new_action_list.return_value.get.return_value = action
+        mock.patch.object(
+            biz,
+            "_gen_action_clone_config_dict",
+            return_value={"edit_host": {"view_host": ChainList([_chain("host")])}},
+        ).start()
+        checker = mock.patch("backend.biz.template.RoleAuthorizationScopeChecker").start()
+        checker.return_value.remove_path_outside_scope.side_effect = lambda system_id, action_id, paths: paths
+        self.fill = mock.patch.object(PolicyBeanList, "fill_empty_fields").start()
+        self.addCleanup(mock.patch.stopall)
+        self.biz = biz
+
+    def test_iter(self):
+        group_policies = self.biz.iter_template_groups_clone_policy(
+            self.template, ["1", "2", "3", "4"], "edit_host", "view_host", None
+        )
+
+        self.fill.assert_not_called()
+        results = {
+            one.group_id: [
+                node.id
+                for path_list in one.policy.related_resource_types[0].iter_path_list()
+                for node in path_list.nodes
+            ]
+            for one in group_policies
+        }
+
+        # 相同的路径去重
+        self.assertEqual(results, {1: ["h1"], 2: ["h2"], 4: ["h4"]})
+        # 每批填充一次名称
+        self.assertEqual(self.fill.call_count, 2)
+
+    def test_generate(self):
+        group_policies = self.biz.generate_template_groups_clone_policy(
+            self.template, ["1", "3"], "edit_host", "view_host", None
+        )
+
+        self.assertEqual([(one.group_id, one.policy.action_id) for one in group_policies], [(1, "edit_host")])
+
+    def test_source_action_not_in_template(self):
+        self.assertEqual(
+            list(self.biz.iter_template_groups_clone_policy(self.template, ["1"], "edit_host", "delete_host", None)),
+            [],
+        )
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from backend.apps.organization.models import Department
+from backend.apps.policy.models import Policy
+from backend.util.compress import is_compressed_text
+from backend.util.json import json_dumps, json_loads
+
+RESOURCES = json_dumps([{"system_id": "bk_cmdb", "type": "host", "condition": []}] * 20)
+
+
+def _raw_resources(policy_id: int) -> str:
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT resources FROM policy_policy WHERE id = %s", [policy_id])
+        return cursor.fetchone()[0]
+
+
+def _create_policy(resources: str) -> Policy:
+    return Policy.objects.create(
+        subject_type="user", subject_id="admin", system_id="bk_cmdb", action_id="view", _resources=resources
+    )
+
+
+@override_settings(JSON_TEXT_COMPRESS_ENABLED=True, JSON_TEXT_COMPRESS_MIN_LENGTH=100)
+class TestCompressedJSONTextField(TestCase):
+    def test_compress(self):
+        policy = _create_policy(RESOURCES)
+
+        self.assertTrue(is_compressed_text(_raw_resources(policy.id)))
+        self.assertEqual(Policy.objects.get(id=policy.id)._resources, RESOURCES)
+        self.assertEqual(list(Policy.objects.filter(id=policy.id).values_list("_resources", flat=True)), [RESOURCES])
+
+    def test_short_text(self):
+        """短文本不压缩"""
+        policy = _create_policy("[]")
+
+        self.assertEqual(_raw_resources(policy.id), "[]")
+        self.assertEqual(Policy.objects.get(id=policy.id).resources, [])
+
+    def test_legacy(self):
+        """兼容未压缩的历史数据"""
+        with override_settings(JSON_TEXT_COMPRESS_ENABLED=False):
+            policy = _create_policy(RESOURCES)
+
+        self.assertEqual(_raw_resources(policy.id), RESOURCES)
+        self.assertEqual(Policy.objects.get(id=policy.id)._resources, RESOURCES)
+
+
+@override_settings(JSON_TEXT_COMPRESS_ENABLED=False, JSON_TEXT_COMPRESS_MIN_LENGTH=100)
+class TestCompressJSONTextFieldsCommand(TestCase):
+    def setUp(self):
+        self.policies = [_create_policy(RESOURCES) for _ in range(3)]
+
+    def _call(self, *args):
+        call_command("compress_json_text_fields", "--field", "policy", "--batch-size", "2", *args, stdout=StringIO())
+
+    def test_compress_and_rollback(self):
+        with override_settings(JSON_TEXT_COMPRESS_ENABLED=True):
+            self._call("--start-id", str(self.policies[0].id))
+
+        self.assertEqual(
+            [is_compressed_text(_raw_resources(p.id)) for p in self.policies],
+            [False, True, True],
+        )
+        self.assertEqual({p._resources for p in Policy.objects.all()}, {RESOURCES})
+
+        self._call("--decompress")
+        self.assertEqual({_raw_resources(p.id) for p in self.policies}, {RESOURCES})
+
+    def test_refuse_compress_when_disabled(self):
+        """未开启压缩时(还有进程未升级)不能压缩已有数据"""
+        with self.assertRaises(CommandError):
+            self._call()
+
+        self.assertEqual({_raw_resources(p.id) for p in self.policies}, {RESOURCES})
+
+    def test_dry_run(self):
+        self._call("--dry-run")
+
+        self.assertEqual({_raw_resources(p.id) for p in self.policies}, {RESOURCES})
+
+
+class TestJSONProperty(TestCase):
+    def test_memoized(self):
+        policy = Policy(_resources=RESOURCES)
+
+        with mock.patch("backend.common.models.json_loads", wraps=json_loads) as mocked:
+            self.assertIs(policy.resources, policy.resources)
+        self.assertEqual(mocked.call_count, 1)
+
+    def test_set(self):
+        policy = Policy(_resources=RESOURCES)
+        policy.resources
+
+        policy.resources = [{"system_id": "bk_job"}]
+        self.assertEqual(policy._resources, json_dumps([{"system_id": "bk_job"}]))
+        self.assertEqual(policy.resources, [{"system_id": "bk_job"}])
+
+    def test_init(self):
+        policy = Policy(resources=[{"system_id": "bk_job"}])
+        self.assertEqual(policy._resources, json_dumps([{"system_id": "bk_job"}]))
+
+    def test_field_changed(self):
+        """直接修改字段后重新解析"""
+        policy = Policy(_resources=RESOURCES)
+        policy.resources
+
+        policy._resources = "[]"
+        self.assertEqual(policy.resources, [])
+
+    def test_default(self):
+        department = Department(id=1, name="test", ancestors="")
+        self.assertEqual(department.parse_ancestors(), [])
+
+        department.ancestors = "invalid"
+        self.assertEqual(department.parse_ancestors(), [])
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import json
+from types import SimpleNamespace
+
+from django.test import TestCase
+from django.utils import translation
+
+from backend.common.error_codes import CodeException, error_codes
+from backend.common.local import local
+from backend.common.renderers import streaming_list_response
+
+
+class TestStreamingListResponse(TestCase):
+    def _content(self, response):
+        return json.loads(b"".join(response.streaming_content).decode("utf-8"))
+
+    def test_render(self):
+        with translation.override("en"):
+            response = streaming_list_response(iter([{"name": "主机", "name_en": "host"}, {"id": 1}]))
+
+        self.assertEqual(
+            self._content(response),
+            {"result": True, "code": 0, "message": "OK", "data": [{"name": "host"}, {"id": 1}]},
+        )
+
+    def test_empty(self):
+        self.assertEqual(self._content(streaming_list_response(iter([])))["data"], [])
+
+    def _iter_items(self, error, count):
+        for i in range(count):
+            yield {"id": i}
+        raise error
+
+    def test_raise_before_first_item(self):
+        with self.assertRaises(CodeException):
+            streaming_list_response(self._iter_items(error_codes.INVALID_ARGS.format("test"), 0))
+
+    def test_error_after_first_item(self):
+        response = streaming_list_response(self._iter_items(error_codes.REMOTE_REQUEST_ERROR, 2))
+
+        content = self._content(response)
+        self.assertFalse(content["result"])
+        self.assertEqual(content["code"], error_codes.REMOTE_REQUEST_ERROR.code)
+        self.assertEqual(content["data"], [{"id": 0}, {"id": 1}])
+
+    def test_unknown_error_after_first_item(self):
+        response = streaming_list_response(self._iter_items(ValueError("test"), 1))
+
+        content = self._content(response)
+        self.assertFalse(content["result"])
+        self.assertEqual(content["code"], error_codes.COMMON_ERROR.code)
+
+    def test_keep_request_in_local(self):
+        request = SimpleNamespace(request_id="test")
+        local.request = request
+
+        def iter_request_ids():
+            for _ in range(2):
+                yield {"request_id": local.request_id}
+
+        response = streaming_list_response(iter_request_ids())
+        local.release()
+
+        self.assertEqual(self._content(response)["data"], [{"request_id": "test"}, {"request_id": "test"}])
+        self.assertIsNone(local.request)
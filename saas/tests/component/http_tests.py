@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from email.message import Message
+from unittest import mock
+
+import requests
+from django.test import TestCase
+
+from backend.component.http import PooledHTTPAdapter, PooledSessionManager
+
+
+class TestPooledSessionManager(TestCase):
+    def test_same_host_share_session(self):
+        """同一Host共享Session"""
+        manager = PooledSessionManager()
+        session = manager.get("http://iam.example.com/api/v1/web/systems")
+        self.assertIs(session, manager.get("http://iam.example.com/api/v1/web/actions"))
+
+    def test_diff_host_isolate_session(self):
+        """不同Host或协议使用独立的Session"""
+        manager = PooledSessionManager()
+        session = manager.get("http://iam.example.com/api/v1/web/systems")
+        self.assertIsNot(session, manager.get("http://usermgr.example.com/api/v2/profiles"))
+        self.assertIsNot(session, manager.get("https://iam.example.com/api/v1/web/systems"))
+
+    def test_host_maxsize(self):
+        """Host可单独配置连接池大小"""
+        manager = PooledSessionManager()
+        with self.settings(COMPONENT_HTTP_POOL_HOST_MAXSIZE={"itsm.example.com": 50}):
+            adapter = manager.get("http://itsm.example.com/api/c/compapi/").get_adapter("http://itsm.example.com")
+        self.assertIsInstance(adapter, PooledHTTPAdapter)
+        self.assertEqual(adapter._pool_maxsize, 50)
+
+    def test_reject_response_cookies(self):
+        """共享Session不保存响应中的Cookie, 避免串到下一次请求"""
+        manager = PooledSessionManager()
+        session = manager.get("http://iam.example.com/api/v1/web/systems")
+
+        def send(request, **kwargs):
+            msg = Message()
+            msg["Set-Cookie"] = "bk_token=user_a_token; Path=/"
+            response = requests.Response()
+            response.status_code = 200
+            response._content = b"{}"
+            response.url = request.url
+            response.request = request
+            response.raw = mock.Mock(_original_response=mock.Mock(msg=msg))
+            return response
+
+        adapter = session.get_adapter("http://iam.example.com")
+        with mock.patch.object(adapter, "send", side_effect=send) as mock_send:
+            session.get("http://iam.example.com/api/v1/web/systems")
+            self.assertEqual(len(session.cookies), 0)
+
+            session.get("http://iam.example.com/api/v1/web/actions", cookies={"bk_token": "user_b_token"})
+            self.assertEqual(mock_send.call_args[0][0].headers["Cookie"], "bk_token=user_b_token")
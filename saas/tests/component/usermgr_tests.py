@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import datetime
+from unittest import mock
+
+from django.test import TestCase
+
+from backend.component import usermgr
+
+
+class TestListByUpdateTime(TestCase):
+    def test_chunk_fuzzy_lookups(self):
+        start = datetime.datetime(2021, 1, 1, 0, 0, 30)
+        end = start + datetime.timedelta(minutes=usermgr.USERMGR_UPDATE_TIME_LOOKUP_MINUTES)
+
+        with mock.patch("backend.component.usermgr._call_esb_api", return_value=[{"id": 1}]) as mocked:
+            data = usermgr.list_updated_profile(start, end)
+
+        # 包括起止时间所在的分钟，超过单次请求的分钟数时分多次请求
+        lookups = [c[1]["data"]["fuzzy_lookups"].split(",") for c in mocked.call_args_list]
+        self.assertEqual([len(i) for i in lookups], [usermgr.USERMGR_UPDATE_TIME_LOOKUP_MINUTES, 1])
+        self.assertEqual(lookups[0][0], "2021-01-01 00:00")
+        self.assertEqual(data, [{"id": 1}, {"id": 1}])
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import threading
+
+from django.test import TestCase, override_settings
+
+from backend.common.error_codes import CodeException, error_codes
+from backend.component.util import (
+    execute_all_data_by_chunks,
+    execute_all_data_by_paging,
+    iter_all_data_by_paging,
+    list_all_data_by_paging,
+)
+
+
+def _paging_func(data):
+    calls = []
+
+    def paging_func(page, page_size):
+        calls.append(page)
+        return len(data), data[(page - 1) * page_size : page * page_size]
+
+    return paging_func, calls
+
+
+class TestIterAllDataByPaging(TestCase):
+    def test_all_pages(self):
+        """并发预取的数据顺序与串行分页一致"""
+        paging_func, calls = _paging_func(list(range(95)))
+
+        self.assertEqual(list(iter_all_data_by_paging(paging_func, 10, max_workers=4)), list(range(95)))
+        self.assertEqual(sorted(calls), list(range(1, 11)))
+
+    def test_list_all(self):
+        paging_func, _ = _paging_func(list(range(20)))
+        self.assertEqual(list_all_data_by_paging(paging_func, 10), list(range(20)))
+
+    def test_single_page(self):
+        paging_func, calls = _paging_func(list(range(5)))
+        self.assertEqual(list(iter_all_data_by_paging(paging_func, 10)), list(range(5)))
+        self.assertEqual(calls, [1])
+
+    def test_page_not_full(self):
+        """分页过程中数据减少，某页不满时提前结束"""
+        data = list(range(30))
+
+        def paging_func(page, page_size):
+            results = data[(page - 1) * page_size : page * page_size]
+            return 30, results[:5] if page == 2 else results
+
+        self.assertEqual(list(iter_all_data_by_paging(paging_func, 10, max_workers=1)), list(range(15)))
+
+
+@override_settings(COMPONENT_CHUNK_RETRY_BACKOFF=0)
+class TestExecuteAllDataByChunks(TestCase):
+    def test_all_chunks(self):
+        executed = []
+        lock = threading.Lock()
+
+        def chunk_func(chunk):
+            with lock:
+                executed.extend(chunk)
+
+        summary = execute_all_data_by_chunks(chunk_func, list(range(25)), chunk_size=10, max_workers=3)
+
+        self.assertEqual(sorted(executed), list(range(25)))
+        self.assertEqual([len(r.data) for r in summary.results], [10, 10, 5])
+        self.assertEqual(summary.failed_data, [])
+
+    def test_split_on_retry(self):
+        """分块过大失败时，对半拆分后重试成功"""
+
+        def chunk_func(chunk):
+            if len(chunk) > 5:
+                raise error_codes.REMOTE_REQUEST_ERROR.format("too large")
+
+        summary = execute_all_data_by_chunks(chunk_func, list(range(10)), chunk_size=10, max_workers=1)
+
+        self.assertEqual([(r.data, r.attempts) for r in summary.results], [([0, 1, 2, 3, 4], 2), ([5, 6, 7, 8, 9], 2)])
+        self.assertEqual(summary.failed_results, [])
+
+    def test_isolate_failed_data(self):
+        """重试后仍失败的数据被隔离在更小的分块里，可用于重放"""
+
+        def chunk_func(chunk):
+            if 3 in chunk:
+                raise error_codes.REMOTE_REQUEST_ERROR.format("bad item")
+
+        summary = execute_all_data_by_chunks(chunk_func, list(range(8)), chunk_size=4, max_workers=2, max_retries=2)
+
+        self.assertEqual(summary.failed_data, [3])
+        self.assertEqual(sorted(i for r in summary.results if r.success for i in r.data), [0, 1, 2, 4, 5, 6, 7])
+
+        with self.settings(COMPONENT_CHUNK_MAX_RETRIES=2):
+            self.assertEqual(execute_all_data_by_paging(chunk_func, list(range(8)), 4).failed_data, [3])
+        with self.assertRaises(CodeException):
+            summary.raise_first_error()
+
+    def test_not_retry_non_transient_error(self):
+        """IAM后台返回码非0等非临时错误不重试"""
+        calls = []
+
+        def chunk_func(chunk):
+            calls.append(chunk)
+            raise error_codes.IAM_REQUEST_ERROR.format("invalid subject", 1901400)
+
+        summary = execute_all_data_by_chunks(chunk_func, list(range(8)), chunk_size=4, max_workers=1, max_retries=2)
+
+        self.assertEqual(calls, [[0, 1, 2, 3], [4, 5, 6, 7]])
+        self.assertEqual([r.attempts for r in summary.failed_results], [1, 1])
+        self.assertEqual(summary.failed_data, list(range(8)))
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from datetime import timedelta
+from typing import Any, List
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from backend.common.error_codes import CodeException
+from backend.long_task.constants import TaskStatus
+from backend.long_task.models import TaskChunk, TaskDetail
+from backend.long_task.task import ChunkTask, StepTask, TaskFactory, register_handler
+
+executed_items: List[Any] = []
+fail_items: List[Any] = []
+
+
+@register_handler("test_chunk")
+class ChunkTestTask(StepTask):
+    chunk_size = 3
+    parallelism = 2
+    break_ = True
+
+    def __init__(self, count):
+        self.count = count
+
+    def get_params(self) -> List[Any]:
+        return list(range(self.count))
+
+    def run(self, item: Any):
+        if item in fail_items:
+            raise ValueError(item)
+        executed_items.append(item)
+
+    def on_success(self):
+        pass
+
+
+def _run_inline(id):
+    ChunkTask().run(id)
+
+
+class TestChunkTask(TestCase):
+    def setUp(self):
+        executed_items.clear()
+        fail_items.clear()
+
+    def _execute(self, task):
+        with mock.patch.object(ChunkTask, "delay", side_effect=_run_inline):
+            TaskFactory().run(task.id)
+        return TaskDetail.objects.get(id=task.id)
+
+    def test_execute_by_chunk(self):
+        task = self._execute(TaskDetail.create("test_chunk", [7]))
+
+        self.assertEqual(task.status, TaskStatus.SUCCESS.value)
+        self.assertEqual(sorted(executed_items), list(range(7)))
+        self.assertEqual(TaskChunk.objects.filter(task_id=task.id).count(), 3)
+        self.assertEqual([r["index"] for r in task.results], list(range(7)))
+
+    def test_resume_from_failed_chunk(self):
+        fail_items.append(4)
+        task = TaskDetail.create("test_chunk", [7])
+        with self.assertRaises(ValueError):
+            self._execute(task)
+        ChunkTask().on_failure(None, "", [task.id], {}, None)
+
+        task = TaskDetail.objects.get(id=task.id)
+        self.assertEqual(task.status, TaskStatus.FAILURE.value)
+        self.assertEqual(executed_items, [0, 1, 2, 3])
+
+        # 重新执行, 从失败的参数开始
+        fail_items.clear()
+        executed_items.clear()
+        task.resume()
+        task = self._execute(task)
+
+        self.assertEqual(task.status, TaskStatus.SUCCESS.value)
+        self.assertEqual(sorted(executed_items), [4, 5, 6])
+        self.assertEqual([r["status"] for r in task.results], [TaskStatus.SUCCESS.value] * 7)
+
+    def test_resume_failed_items_without_break(self):
+        """失败不中断任务时, 其他参数继续执行, 任务失败, 重新执行时只执行失败的参数"""
+        fail_items.extend([1, 4])
+        task = TaskDetail.create("test_chunk", [7])
+        with mock.patch.object(ChunkTestTask, "break_", False), mock.patch.object(
+            ChunkTestTask, "on_success"
+        ) as on_success:
+            task = self._execute(task)
+
+            self.assertEqual(task.status, TaskStatus.FAILURE.value)
+            self.assertEqual(sorted(executed_items), [0, 2, 3, 5, 6])
+            on_success.assert_not_called()
+
+            fail_items.clear()
+            executed_items.clear()
+            task.resume()
+            task = self._execute(task)
+
+        self.assertEqual(task.status, TaskStatus.SUCCESS.value)
+        self.assertEqual(sorted(executed_items), [1, 4])
+        on_success.assert_called_once()
+        self.assertEqual([r["status"] for r in task.results], [TaskStatus.SUCCESS.value] * 7)
+
+    def _start_without_chunk_task(self, task):
+        """只发起任务, ChunkTask不执行, 模拟worker在执行分块时异常退出"""
+        with mock.patch.object(ChunkTask, "delay"):
+            TaskFactory().run(task.id)
+        return ChunkTask()._claim_chunk(task.id)
+
+    def _make_stale(self, task, **chunk_filters):
+        stale_time = timezone.now() - timedelta(hours=1)
+        TaskDetail.objects.filter(id=task.id).update(updated_time=stale_time)
+        TaskChunk.objects.filter(task_id=task.id, **chunk_filters).update(updated_time=stale_time)
+
+    def test_claim_stale_chunk(self):
+        task = TaskDetail.create("test_chunk", [7])
+        chunk = self._start_without_chunk_task(task)
+        self.assertEqual(chunk.index, 0)
+
+        # 运行中的分块不会被重复领取
+        self.assertEqual(ChunkTask()._claim_chunk(task.id).index, 1)
+
+        # 超时的分块会被重新领取
+        self._make_stale(task, index=0)
+        with self.settings(LONG_TASK_STALE_TIMEOUT=60):
+            self.assertEqual(ChunkTask()._claim_chunk(task.id).index, 0)
+
+    def test_resume_stale_running_task(self):
+        task = TaskDetail.create("test_chunk", [7])
+        self._start_without_chunk_task(task)
+
+        # 正常运行中的任务不能重新执行
+        task = TaskDetail.objects.get(id=task.id)
+        self.assertFalse(task.is_stale())
+        with self.assertRaises(CodeException):
+            task.resume()
+
+        self._make_stale(task)
+        with self.settings(LONG_TASK_STALE_TIMEOUT=60):
+            task = TaskDetail.objects.get(id=task.id)
+            self.assertTrue(task.is_stale())
+            task.resume()
+            task = self._execute(task)
+
+        self.assertEqual(task.status, TaskStatus.SUCCESS.value)
+        self.assertEqual(sorted(executed_items), list(range(7)))
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import json
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from backend.apps.organization.models import Department, DepartmentMember, User
+from backend.common.error_codes import CodeException, error_codes
+from backend.service.group import GroupMemberExpiredAt, GroupService
+
+
+def _create_department(id, name, parent=None):
+    ancestors = []
+    if parent:
+        ancestors = parent.parse_ancestors() + [{"id": parent.id, "name": parent.name}]
+    return Department.objects.create(id=id, name=name, parent=parent, order=id, ancestors=json.dumps(ancestors))
+
+
+class TestListUserDepartmentGroup(TestCase):
+    def setUp(self):
+        root = _create_department(1, "root")
+        child = _create_department(2, "child", root)
+        _create_department(3, "leaf1", child)
+        _create_department(4, "leaf2", child)
+
+        user = User.objects.create(id=1, username="department_group_test")
+        DepartmentMember.objects.bulk_create(
+            [DepartmentMember(department_id=3, user_id=user.id), DepartmentMember(department_id=4, user_id=user.id)]
+        )
+
+    def test_list_user_department_group(self):
+        """祖先部门去重后只查询一次"""
+
+        def get_subject_relation(_type, id):
+            return [{"pk": int(id), "type": "group", "id": id, "policy_expired_at": 0, "created_at": ""}]
+
+        with mock.patch("backend.service.group.iam.get_subject_relation", side_effect=get_subject_relation) as mocked:
+            relations = GroupService()._list_user_department_group("department_group_test")
+
+        self.assertEqual(sorted(c[0][1] for c in mocked.call_args_list), ["1", "2", "3", "4"])
+        self.assertEqual(
+            [(r.department_id, r.department_name) for r in relations],
+            [(1, "root"), (2, "child"), (3, "leaf1"), (4, "leaf2")],
+        )
+
+
+class TestUpdateGroupsMembersExpiredAt(TestCase):
+    def test_update_subject_groups_expired_at(self):
+        """每个用户组一次请求"""
+        subject = GroupMemberExpiredAt(type="user", id="admin", policy_expired_at=100)
+        with mock.patch("backend.service.group.iam.update_subject_members_expired_at") as mocked:
+            GroupService().update_subject_groups_expired_at(subject, [1, 2, 3])
+
+        self.assertEqual(
+            sorted((c[0][1], c[0][2]) for c in mocked.call_args_list),
+            [(str(i), [{"type": "user", "id": "admin", "policy_expired_at": 100}]) for i in [1, 2, 3]],
+        )
+
+    def test_chunk_members(self):
+        """单个用户组的成员过多时分块请求"""
+        members = [GroupMemberExpiredAt(type="user", id=str(i), policy_expired_at=100) for i in range(1500)]
+        with mock.patch("backend.service.group.iam.update_subject_members_expired_at") as mocked:
+            GroupService().update_groups_members_expired_at({1: members, 2: members[:1]})
+
+        self.assertEqual(
+            sorted((c[0][1], len(c[0][2])) for c in mocked.call_args_list), [("1", 500), ("1", 1000), ("2", 1)]
+        )
+
+    @override_settings(COMPONENT_CHUNK_RETRY_BACKOFF=0)
+    def test_retry_and_raise(self):
+        """临时错误重试, 最终失败时抛出异常"""
+        members = [GroupMemberExpiredAt(type="user", id="admin", policy_expired_at=100)]
+        with mock.patch(
+            "backend.service.group.iam.update_subject_members_expired_at",
+            side_effect=[error_codes.REMOTE_REQUEST_ERROR, None],
+        ) as mocked:
+            GroupService().update_groups_members_expired_at({1: members})
+        self.assertEqual(mocked.call_count, 2)
+
+        with mock.patch(
+            "backend.service.group.iam.update_subject_members_expired_at",
+            side_effect=error_codes.IAM_REQUEST_ERROR.format("invalid"),
+        ), self.assertRaises(CodeException):
+            GroupService().update_groups_members_expired_at({1: members})
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from unittest import mock
+
+from django.test import TestCase
+
+from backend.apps.policy.models import Policy as PolicyModel
+from backend.service.models import Policy, Subject
+from backend.service.policy.operation import PolicyOperationService
+from backend.util.json import json_dumps
+
+SYSTEM_ID = "bk_operation_test"
+
+
+def _gen_resources(host_id: str):
+    return [
+        {
+            "system_id": SYSTEM_ID,
+            "type": "host",
+            "condition": [
+                {
+                    "id": "condition",
+                    "instances": [
+                        {
+                            "type": "host",
+                            "path": [[{"type": "host", "id": host_id, "name": host_id, "system_id": SYSTEM_ID}]],
+                        }
+                    ],
+                    "attributes": [],
+                }
+            ],
+        }
+    ]
+
+
+class TestPolicyOperationUpdate(TestCase):
+    def setUp(self):
+        self.subject = Subject(type="user", id="operation_test")
+        PolicyModel.objects.bulk_create(
+            [
+                PolicyModel(
+                    subject_type=subject.type,
+                    subject_id=subject.id,
+                    system_id=SYSTEM_ID,
+                    action_id=f"action{i}",
+                    _resources=json_dumps(_gen_resources("old")),
+                    _environment="{}",
+                    policy_id=i + 1,
+                )
+                for subject in [self.subject, Subject(type="user", id="operation_other")]
+                for i in range(3)
+            ]
+        )
+
+    def test_bulk_update(self):
+        """分批批量更新，只更新指定subject的指定策略"""
+        policies = [
+            Policy(
+                action_id=f"action{i}", related_resource_types=_gen_resources(f"new{i}"), policy_id=i + 1, expired_at=0
+            )
+            for i in range(2)
+        ]
+
+        with mock.patch("backend.service.policy.operation.iam.alter_policies") as mocked_alter, self.settings(
+            POLICY_BULK_UPDATE_BATCH_SIZE=1
+        ):
+            PolicyOperationService().alter(SYSTEM_ID, self.subject, update_policies=policies)
+        mocked_alter.assert_called_once()
+
+        resources = {
+            (p.subject_id, p.action_id): p.resources
+            for p in PolicyModel.objects.filter(system_id=SYSTEM_ID).only("subject_id", "action_id", "_resources")
+        }
+        self.assertEqual(resources[("operation_test", "action0")], _gen_resources("new0"))
+        self.assertEqual(resources[("operation_test", "action1")], _gen_resources("new1"))
+        self.assertEqual(resources[("operation_test", "action2")], _gen_resources("old"))
+        for i in range(3):
+            self.assertEqual(resources[("operation_other", f"action{i}")], _gen_resources("old"))
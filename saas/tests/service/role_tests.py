@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from unittest import mock
+
+from django.test import TestCase
+
+from backend.apps.role.models import RoleScope
+from backend.service import role
+from backend.service.models import Subject
+from backend.service.role import AuthScopeAction, AuthScopeSystem, RoleInfo, RoleScopeCache, RoleService
+
+
+class TestRoleScopeCache(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(role, "role_scope_cache", RoleScopeCache())
+        self.cache = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        # 迁移初始化的超级管理员授权范围可能与新建角色的ID冲突
+        RoleScope.objects.all().delete()
+
+        self.svc = RoleService()
+        info = RoleInfo(
+            name="test",
+            description="",
+            members=["admin"],
+            subject_scopes=[Subject(type="user", id="admin")],
+            authorization_scopes=[
+                AuthScopeSystem(system_id="bk_cmdb", actions=[AuthScopeAction(id="view", related_resource_types=[])])
+            ],
+        )
+        self.role = self.svc.create(info, "admin")
+
+    def test_cache_hit(self):
+        scopes = self.svc.list_auth_scope(self.role.id)
+        scopes.append(AuthScopeSystem(system_id="bk_job", actions=[]))
+
+        # 返回的列表修改不影响缓存, 第二次不再解析
+        with mock.patch.object(self.cache, "_parse") as mocked:
+            self.assertEqual([s.system_id for s in self.svc.list_auth_scope(self.role.id)], ["bk_cmdb"])
+            self.assertEqual(set(self.svc.get_auth_scope_system_actions(self.role.id)["bk_cmdb"]), {"view"})
+        mocked.assert_not_called()
+        self.assertEqual(self.cache.stats()["hits"], 2)
+
+    def test_update_invalidate(self):
+        self.svc.list_auth_scope(self.role.id)
+        self.svc.list_subject_scope(self.role.id)
+
+        self.svc.update_role_auth_scope(
+            self.role.id,
+            [AuthScopeSystem(system_id="bk_job", actions=[AuthScopeAction(id="run", related_resource_types=[])])],
+        )
+        self.svc._update_role_subject_scope(self.role.id, [Subject(type="user", id="test")])
+
+        self.assertEqual(list(self.svc.get_auth_scope_system_actions(self.role.id)), ["bk_job"])
+        self.assertEqual(self.svc.list_subject_scope(self.role.id), [Subject(type="user", id="test")])
+
+    def test_no_scope(self):
+        self.assertEqual(self.svc.list_auth_scope(0), [])
+        self.assertEqual(self.svc.get_auth_scope_system_actions(0), {})
@@ -15,3 +15,6 @@ DATABASES = {"default": {"ENGINE": "django.db.backends.sqlite3", "NAME": os.path
 
 # 添加判断是否强制认证角色中间件
 MIDDLEWARE += ("tests.test_util.middlewares.ForceRoleAuthenticationMiddleware",)
+
+# 审计事件同步写入, 便于测试中断言
+AUDIT_EVENT_WRITE_MODE = "sync"
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from unittest import mock
+
+from django.test import TestCase
+
+from backend.util.cache import LocalLRUCache, RedisVersion, cache_on_system_model_version, system_model_version
+
+
+class TestCacheOnSystemModelVersion(TestCase):
+    def setUp(self):
+        self.calls = []
+
+        @cache_on_system_model_version(expiration_time=60)
+        def list_model(system_id, fields="id"):
+            self.calls.append((system_id, fields))
+            return [system_id, fields, len(self.calls)]
+
+        self.list_model = list_model
+
+    def test_cache_same_version(self):
+        """版本号不变则使用缓存"""
+        with mock.patch.object(system_model_version, "get", return_value="1"):
+            first = self.list_model("bk_cmdb_cache_test", fields="id")
+            second = self.list_model("bk_cmdb_cache_test", "id")
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.calls), 1)
+
+    def test_reload_after_bump(self):
+        """版本号变更后重新获取"""
+        with mock.patch.object(system_model_version, "get", return_value="1"):
+            self.list_model("bk_job_cache_test")
+        with mock.patch.object(system_model_version, "get", return_value="2"):
+            result = self.list_model("bk_job_cache_test")
+        self.assertEqual(result[2], 2)
+        self.assertEqual(len(self.calls), 2)
+
+
+class TestRedisVersion(TestCase):
+    def test_local_cache(self):
+        """版本号在进程内缓存, 本进程递增版本号后立即重新读取"""
+        version = RedisVersion("bk_iam:test_version", local_ttl=60)
+        client = mock.Mock()
+        client.get.return_value = "1"
+        with mock.patch("backend.util.cache.redis_region") as redis_region:
+            redis_region.backend.client = client
+            self.assertEqual(version.get("test"), "1")
+            self.assertEqual(version.get("test"), "1")
+            self.assertEqual(client.get.call_count, 1)
+
+            client.get.return_value = "2"
+            version.bump("test")
+            self.assertEqual(version.get("test"), "2")
+            self.assertEqual(client.get.call_count, 2)
+
+
+class TestLocalLRUCache(TestCase):
+    def test_lru_evict(self):
+        """超过最大数量时淘汰最久未使用的"""
+        cache = LocalLRUCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("c"), 3)
+
+    def test_expired(self):
+        """过期后不再命中"""
+        cache = LocalLRUCache(maxsize=2, ttl=0)
+        cache.set("a", 1)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats(), {"hits": 0, "misses": 1, "size": 0})
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from django.test import TestCase
+
+from backend.util.compress import compress_text, decompress_text, is_compressed_text, text_codecs
+from backend.util.json import json_dumps
+
+
+class TestCompressText(TestCase):
+    def setUp(self):
+        self.text = json_dumps([{"system_id": "bk_cmdb", "type": "host", "name": "主机"}] * 50)
+
+    def test_codecs(self):
+        for codec in text_codecs:
+            compressed = compress_text(self.text, codec)
+
+            self.assertTrue(is_compressed_text(compressed))
+            self.assertLess(len(compressed), len(self.text))
+            self.assertEqual(decompress_text(compressed), self.text)
+
+    def test_legacy_text(self):
+        """未压缩的历史数据原样返回"""
+        for text in [self.text, '{"a":1}', "[]", ""]:
+            self.assertFalse(is_compressed_text(text))
+            self.assertEqual(decompress_text(text), text)
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import threading
+import time
+
+from django.test import TestCase
+from django.utils import translation
+
+from backend.util.concurrency import iter_concurrently, map_concurrently
+
+
+class TestMapConcurrently(TestCase):
+    def test_keep_order(self):
+        """结果顺序与输入一致"""
+        result = map_concurrently(lambda x: x * 2, [3, 1, 2], max_workers=3)
+        self.assertEqual(result, [6, 2, 4])
+
+    def test_raise_first_error(self):
+        """与串行一致，抛出按顺序的第一个异常"""
+
+        def func(x):
+            if x == 1:
+                time.sleep(0.05)
+                raise ValueError("first")
+            if x == 2:
+                raise KeyError("second")
+            return x
+
+        with self.assertRaises(ValueError):
+            map_concurrently(func, [0, 1, 2], max_workers=3)
+
+    def test_key_max_workers(self):
+        """同一个key的并发数受限"""
+        lock = threading.Lock()
+        running = {"a": 0, "b": 0}
+        max_running = {"a": 0, "b": 0}
+
+        def func(item):
+            key = item[0]
+            with lock:
+                running[key] += 1
+                max_running[key] = max(max_running[key], running[key])
+            time.sleep(0.02)
+            with lock:
+                running[key] -= 1
+
+        items = [("a", i) for i in range(6)] + [("b", i) for i in range(2)]
+        map_concurrently(func, items, max_workers=8, key_func=lambda item: item[0], key_max_workers=2)
+        self.assertLessEqual(max_running["a"], 2)
+
+    def test_slow_key_not_block_others(self):
+        """某个key较慢时，不占用其他key的执行线程"""
+        finished = []
+
+        def func(item):
+            if item[0] == "slow":
+                time.sleep(0.1)
+            finished.append(item)
+
+        items = [("slow", i) for i in range(4)] + [("fast", i) for i in range(4)]
+        start = time.time()
+        map_concurrently(func, items, max_workers=3, key_func=lambda item: item[0], key_max_workers=1)
+        self.assertEqual(finished[:4], [("fast", i) for i in range(4)])
+        self.assertGreaterEqual(time.time() - start, 0.4)
+
+    def test_nested_serial(self):
+        """嵌套调用时内层在工作线程内串行执行"""
+
+        def outer(x):
+            return set(map_concurrently(lambda y: threading.get_ident(), range(3), max_workers=3))
+
+        for thread_ids in map_concurrently(outer, range(2), max_workers=2):
+            self.assertEqual(len(thread_ids), 1)
+
+    def test_propagate_language(self):
+        """语言传递到工作线程"""
+        with translation.override("en"):
+            result = map_concurrently(lambda x: translation.get_language(), [1, 2], max_workers=2)
+        self.assertEqual(result, ["en", "en"])
+
+
+class TestIterConcurrently(TestCase):
+    def test_keep_order(self):
+        """逐个产出的结果顺序与输入一致"""
+
+        def func(x):
+            time.sleep(0.01 * (3 - x))
+            return x * 2
+
+        self.assertEqual(list(iter_concurrently(func, range(4), max_workers=3)), [0, 2, 4, 6])
+
+    def test_bounded_prefetch(self):
+        """消费方未取走结果时，最多预先执行max_workers个"""
+        started = []
+
+        def func(x):
+            started.append(x)
+            return x
+
+        results = iter_concurrently(func, range(10), max_workers=2)
+        self.assertEqual(next(results), 0)
+        time.sleep(0.05)
+        self.assertLessEqual(len(started), 3)
+        results.close()
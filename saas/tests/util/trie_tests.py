@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-权限中心(BlueKing-IAM) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from django.test import TestCase
+
+from backend.util.trie import PrefixTrie
+
+
+class TestPrefixTrie(TestCase):
+    def setUp(self):
+        self.trie = PrefixTrie()
+        self.trie.add(("biz", "1"), 0)
+        self.trie.add(("biz", "2", "set"), 1)
+        self.trie.add(("biz", "2", "set", "3"), 2)
+
+    def test_add(self):
+        self.assertEqual(len(self.trie), 3)
+        self.assertFalse(self.trie.add(("biz", "1"), 3))
+        self.assertEqual(len(self.trie), 3)
+        self.assertIn(("biz", "1"), self.trie)
+        self.assertNotIn(("biz",), self.trie)
+
+    def test_has_prefix_of(self):
+        self.assertTrue(self.trie.has_prefix_of(("biz", "1")))
+        self.assertTrue(self.trie.has_prefix_of(("biz", "1", "set", "4")))
+        self.assertTrue(self.trie.has_prefix_of(("biz", "2", "set", "5")))
+        self.assertFalse(self.trie.has_prefix_of(("biz", "2", "module", "5")))
+        self.assertFalse(self.trie.has_prefix_of(("biz",)))
+        self.assertTrue(PrefixTrie([()]).has_prefix_of(("biz", "1")))
+
+    def test_iter_values(self):
+        self.assertEqual(list(self.trie.iter_prefix_values(("biz", "2", "set", "3", "host"))), [1, 2])
+        self.assertEqual(sorted(self.trie.iter_extension_values(("biz", "2"))), [1, 2])
+        self.assertEqual(list(self.trie.iter_extension_values(("biz", "3"))), [])